@@ -0,0 +1,101 @@
+"""Benchmark: bit-packed Boolean engine vs. the Simulator on the gene-expression model
+
+Repeats the DiSH-SOAP poster benchmark (dishsoap/poster-results/bench-gene-expressions.ipynb),
+which runs one sync run of the gene-expression model for 1, 2, 4, ... steps with
+scenario 16 and output mode 2, using both the Simulator and the BooleanSimulator.
+Checks that both write identical trace files, and prints the timings next to the
+poster results (DiSH on ARM-A9 and Intel i5-8600K, and the DiSH-SOAP hardware).
+
+Usage (from the dish/ directory):
+
+    python benchmarks/bench_boolean.py [--max-steps N] [--runs N] [--repeat N]
+"""
+import os
+import sys
+import csv
+import argparse
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dish.simulator import Simulator
+from dish.boolean import BooleanSimulator
+
+
+POSTER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        '..', '..', 'dishsoap', 'poster-results')
+DEF_MODEL = os.path.join(POSTER_DIR, 'gene_expression.xlsx')
+POSTER_SUMMARY = os.path.join(POSTER_DIR, 'gene-exp-summary.csv')
+
+# scenario and output mode used for the poster results
+SCENARIO = 16
+OUT_MODE = 2
+
+
+def read_poster_times(summary_file):
+    """Read the poster timings (seconds) for each number of steps"""
+
+    times = dict()
+    if not os.path.exists(summary_file):
+        return times
+    with open(summary_file) as csv_file:
+        for row in csv.DictReader(csv_file, skipinitialspace=True):
+            times[int(row['steps'])] = {
+                    'arm' : float(row['dish_time']),
+                    'intel' : float(row['dish_intel_time']),
+                    'dishsoap' : float(row['fastdish_time']),
+                    }
+    return times
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('model_file', nargs='?', default=DEF_MODEL)
+    parser.add_argument('--max-steps', type=int, default=4096, help='largest number of steps')
+    parser.add_argument('--runs', type=int, default=1, help='number of runs (the poster used 1)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timing repeats')
+    args = parser.parse_args()
+
+    model = Simulator(args.model_file)
+    boolean_model = BooleanSimulator(model)
+    poster_times = read_poster_times(POSTER_SUMMARY) if args.runs == 1 else dict()
+
+    out_dir = tempfile.mkdtemp()
+    simulator_file = os.path.join(out_dir, 'simulator.txt')
+    boolean_file = os.path.join(out_dir, 'boolean.txt')
+
+    print('Model: {}, runs: {}'.format(os.path.basename(args.model_file), args.runs))
+    print('{:>7} {:>11} {:>11} {:>11} {:>11} {:>11} {:>9}'.format(
+            'steps', 'ARM (s)', 'Intel (s)', 'DiSH-SOAP', 'Simulator', 'Boolean', 'speedup'))
+
+    steps = 1
+    while steps <= args.max_steps:
+
+        def run_simulator():
+            model.run_simulation('sync', args.runs, steps, simulator_file, SCENARIO, OUT_MODE)
+
+        def run_boolean():
+            boolean_model.run_simulation('sync', args.runs, steps, boolean_file, SCENARIO, OUT_MODE)
+
+        simulator_time = min(timeit.repeat(run_simulator, number=1, repeat=args.repeat))
+        boolean_time = min(timeit.repeat(run_boolean, number=1, repeat=args.repeat))
+
+        with open(simulator_file) as simulator_out, open(boolean_file) as boolean_out:
+            if simulator_out.read() != boolean_out.read():
+                raise AssertionError('Trace files differ for {} steps'.format(steps))
+
+        poster = poster_times.get(steps, dict())
+        print('{:>7} {:>11} {:>11} {:>11} {:>11.3e} {:>11.3e} {:>8.1f}x'.format(
+                steps,
+                '{:.3e}'.format(poster['arm']) if 'arm' in poster else '-',
+                '{:.3e}'.format(poster['intel']) if 'intel' in poster else '-',
+                '{:.3e}'.format(poster['dishsoap']) if 'dishsoap' in poster else '-',
+                simulator_time, boolean_time, simulator_time/boolean_time))
+
+        steps *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Microbenchmark: compiled regulation functions vs. the rule string interpreter
+
+Evaluates the positive and negative regulation functions of every element in a
+model for a set of random model states, once with Element.eval_reg (parsing the
+rule strings) and once with the compiled rules used by the simulator, checks
+that both give identical scores, and reports the speedup.
+
+Usage (from the dish/ directory):
+
+    python benchmarks/bench_rules.py [model_file] [--states N] [--repeat N]
+"""
+import os
+import sys
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dish.simulator import Simulator
+
+
+DEF_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        '..', 'examples', 'example_model_Tcell.xlsx')
+
+
+def random_states(model, num_states):
+    """Generate random value indices for all elements in the model"""
+
+    elements = model.get_elements()
+    return [{name: random.randrange(element.get_levels()) for name, element in elements.items()}
+            for _ in range(num_states)]
+
+
+def load_state(model, state):
+    """Set element values in the model state, read by both eval_reg and the compiled rules"""
+
+    elements = model.get_elements()
+    for name, value_index in state.items():
+        elements[name].set_value_index(value_index)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('model_file', nargs='?', default=DEF_MODEL)
+    parser.add_argument('--states', type=int, default=50, help='number of random model states')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timing repeats')
+    args = parser.parse_args()
+
+    random.seed(0)
+    model = Simulator(args.model_file)
+    elements = model.get_elements()
+
+    # elements with influence set regulation functions (not truth tables)
+    rule_elements = [element for element in elements.values() if type(element.get_act()) is str
+            and (element.get_act() != '' or element.get_inh() != '')]
+
+    states = random_states(model, args.states)
+
+    # check that compiled rules and the interpreter give identical scores
+    for state in states:
+        load_state(model, state)
+        for element in rule_elements:
+            for reg_rule, func in [(element.get_act(), element.get_act_func()),
+                    (element.get_inh(), element.get_inh_func())]:
+                interpreted = element.eval_reg(reg_rule, 0)
+                compiled = func(dict(), 0)
+                if interpreted != compiled or type(interpreted) != type(compiled):
+                    raise AssertionError('Score mismatch for {} rule {}: {} != {}'.format(
+                            element.get_name(), reg_rule, interpreted, compiled))
+
+    def run_interpreted():
+        for element in rule_elements:
+            element.eval_reg(element.get_act(), 0)
+            element.eval_reg(element.get_inh(), 0)
+
+    def run_compiled():
+        for element in rule_elements:
+            element.get_act_func()(dict(), 0)
+            element.get_inh_func()(dict(), 0)
+
+    load_state(model, states[-1])
+    number = max(1, 20000 // max(1, len(rule_elements)))
+    interpreted_time = min(timeit.repeat(run_interpreted, number=number, repeat=args.repeat))
+    compiled_time = min(timeit.repeat(run_compiled, number=number, repeat=args.repeat))
+
+    evaluations = 2*len(rule_elements)*number
+    print('Model: {}'.format(os.path.basename(args.model_file)))
+    print('Elements with regulation functions: {}'.format(len(rule_elements)))
+    print('Scores checked: {} states, all identical'.format(len(states)))
+    print('Interpreted: {:8.3f} us per rule evaluation'.format(1e6*interpreted_time/evaluations))
+    print('Compiled:    {:8.3f} us per rule evaluation'.format(1e6*compiled_time/evaluations))
+    print('Speedup:     {:8.1f}x'.format(interpreted_time/compiled_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Benchmark suite: model loading and simulation time of every scheme
+
+Times Simulator model loading and run_simulation for each simulation scheme on
+the bundled T-cell and gene expression models, over a sweep of the number of
+steps and runs, and writes the timings to a JSON file. Random initial values
+and simulations are seeded, so every benchmark simulates the same runs.
+The compare command reports the change of each timing from a stored baseline
+(the minimum over the repeats), and exits with status 1 if any is slower by more
+than the threshold.
+
+Usage (from the dish/ directory):
+
+    python benchmarks/bench_schemes.py run [--models ...] [--schemes ...] [--steps ...] [--runs ...]
+            [--repeat N] [--output results.json]
+    python benchmarks/bench_schemes.py compare baseline.json results.json [--threshold 0.2]
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from dish.simulator import Simulator
+from dish.cache import package_version
+from dish.cli import SCHEMES
+
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+DEF_MODELS = [os.path.join(EXAMPLES, 'example_model_Tcell.xlsx'),
+        os.path.join(EXAMPLES, 'example_model_gene_expression.csv')]
+
+DEF_STEPS = [100, 1000]
+
+DEF_RUNS = [1, 10]
+
+# output mode of the event traces of ra simulations, replayed by the fixed_updates scheme
+EVENT_TRACES_MODE = 7
+
+
+def environment():
+    """Return a description of the machine and software the benchmarks ran on"""
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit' : commit,
+        'dish' : package_version(),
+        'python' : platform.python_version(),
+        'numpy' : np.__version__,
+        'platform' : platform.platform(),
+        'processor' : platform.processor() or platform.machine(),
+        'cpus' : os.cpu_count(),
+        }
+
+
+def summarize(times):
+    """Return the timings of the repeats of one benchmark and their statistics"""
+
+    return {
+        'times' : times,
+        'min' : min(times),
+        'median' : statistics.median(times),
+        'mean' : statistics.mean(times),
+        'stdev' : statistics.stdev(times) if len(times) > 1 else 0.0,
+        }
+
+
+def time_load(model_file, repeat):
+    """Time reading the model file, return the timings and the last model loaded"""
+
+    times = list()
+    for _ in range(repeat):
+        # same random initial values in every load
+        random.seed(0)
+        start = time.perf_counter()
+        model = Simulator(model_file)
+        times.append(time.perf_counter() - start)
+    return times, model
+
+
+def time_simulation(model, scheme, steps, runs, repeat, out_mode, temp_dir):
+    """Time run_simulation on copies of the loaded model, return the timings"""
+
+    output_file = os.path.join(temp_dir, 'traces.txt')
+    event_traces = None
+    if scheme == 'fixed_updates':
+        # replay the element updates of an ra simulation (not timed)
+        event_traces = os.path.join(temp_dir, 'event_traces.txt')
+        copy.deepcopy(model).run_simulation('ra', runs, steps, event_traces, outMode=EVENT_TRACES_MODE, seed=0)
+
+    times = list()
+    for _ in range(repeat):
+        # element delay state is kept between simulations of a model, so every repeat starts from the loaded model
+        run_model = copy.deepcopy(model)
+        start = time.perf_counter()
+        run_model.run_simulation(scheme, runs, steps, output_file, outMode=out_mode, eventTraces=event_traces, seed=0)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_benchmarks(args):
+
+    results = list()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for model_file in args.models:
+            model_name = os.path.splitext(os.path.basename(model_file))[0]
+
+            times, model = time_load(model_file, args.repeat)
+            results.append(dict({'model' : model_name, 'benchmark' : 'load', 'steps' : None, 'runs' : None},
+                    **summarize(times)))
+            print('{:<36} {:<16} {:>7} {:>5} {:10.4f} s'.format(model_name, 'load', '', '', min(times)))
+
+            for scheme in args.schemes:
+                for steps in args.steps:
+                    for runs in args.runs:
+                        times = time_simulation(model, scheme, steps, runs, args.repeat, args.out_mode, temp_dir)
+                        result = dict({'model' : model_name, 'benchmark' : scheme, 'steps' : steps, 'runs' : runs},
+                                **summarize(times))
+                        result['steps_per_second'] = steps*runs/result['min']
+                        results.append(result)
+                        print('{:<36} {:<16} {:>7} {:>5} {:10.4f} s'.format(model_name, scheme, steps, runs, min(times)))
+
+    output = {
+        'environment' : environment(),
+        'settings' : {'repeat' : args.repeat, 'outMode' : args.out_mode},
+        'results' : results,
+        }
+    with open(args.output, 'w') as output_file:
+        json.dump(output, output_file, indent=2)
+    print('Results written to {}'.format(args.output))
+
+
+def compare_results(args):
+
+    with open(args.baseline) as input_file:
+        baseline = json.load(input_file)
+    with open(args.results) as input_file:
+        current = json.load(input_file)
+
+    for key in ['processor', 'cpus', 'python', 'numpy']:
+        if baseline['environment'].get(key) != current['environment'].get(key):
+            print('Warning: different {} in the baseline ({}) and results ({})'.format(
+                    key, baseline['environment'].get(key), current['environment'].get(key)))
+
+    def benchmark_key(result):
+        return (result['model'], result['benchmark'], result['steps'], result['runs'])
+
+    baseline_results = {benchmark_key(result) : result for result in baseline['results']}
+
+    regressions = list()
+    print('{:<36} {:<16} {:>7} {:>5} {:>10} {:>10} {:>8}'.format(
+            'model', 'benchmark', 'steps', 'runs', 'baseline', 'current', 'change'))
+    for result in current['results']:
+        key = benchmark_key(result)
+        if key not in baseline_results:
+            continue
+        before = baseline_results[key]['min']
+        after = result['min']
+        change = after/before - 1
+        # timings shorter than min_time are too noisy to compare
+        regression = change > args.threshold and max(before, after) >= args.min_time
+        if regression:
+            regressions.append(key)
+        print('{:<36} {:<16} {:>7} {:>5} {:10.4f} {:10.4f} {:+7.1%}{}'.format(
+                key[0], key[1], '' if key[2] is None else key[2], '' if key[3] is None else key[3],
+                before, after, change, '  REGRESSION' if regression else ''))
+
+    missing = [key for key in baseline_results if key not in {benchmark_key(result) for result in current['results']}]
+    if missing:
+        print('{} benchmarks of the baseline are not in the results'.format(len(missing)))
+
+    if regressions:
+        print('{} regressions slower than the baseline by more than {:.0%}'.format(len(regressions), args.threshold))
+        return 1
+    print('No regressions')
+    return 0
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--models', nargs='+', default=DEF_MODELS, help='model files')
+    run_parser.add_argument('--schemes', nargs='+', default=SCHEMES, choices=SCHEMES, help='simulation schemes')
+    run_parser.add_argument('--steps', nargs='+', type=int, default=DEF_STEPS, help='numbers of steps')
+    run_parser.add_argument('--runs', nargs='+', type=int, default=DEF_RUNS, help='numbers of runs')
+    run_parser.add_argument('--repeat', type=int, default=3, help='number of timing repeats')
+    run_parser.add_argument('--out-mode', type=int, default=1, help='output mode of the simulations')
+    run_parser.add_argument('--output', default='benchmark_results.json', help='JSON results file')
+
+    compare_parser = commands.add_parser('compare', help='compare results to a baseline')
+    compare_parser.add_argument('baseline', help='JSON results file of the baseline')
+    compare_parser.add_argument('results', help='JSON results file to compare')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+            help='relative slowdown reported as a regression (default: 0.2)')
+    compare_parser.add_argument('--min-time', type=float, default=0.05,
+            help='timings in seconds below which slowdowns are not reported (default: 0.05)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_benchmarks(args)
+    else:
+        sys.exit(compare_results(args))
+
+
+if __name__ == '__main__':
+    main()
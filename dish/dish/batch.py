@@ -0,0 +1,469 @@
+"""Vectorized simulation of many runs at once for the synchronous schemes
+
+The BatchSimulator reuses the elements, regulation functions, and scenario data
+parsed by a Simulator, and keeps the values of all runs in one array with a row
+for each run and a column for each element. Every step updates all runs together
+with array operations instead of calling Element.update_next for each element
+of each run, and writes output files in the same format as Simulator.run_simulation.
+"""
+import numpy as np
+
+from dish.rules import compile_rule_array
+from dish.traces import write_run, write_run_table, write_summary
+
+
+class BatchSimulator(object):
+    """Run the sync, rand_sync, and rand_sync_gauss schemes for all runs at once
+
+    Example:
+        model = Simulator('model.xlsx')
+        BatchSimulator(model).run_simulation('sync', 500, 100, 'traces.txt', outMode=3)
+
+    Each run follows the same update rules as Simulator.run_simulation, but the
+    delay counters of each element start from zero in every run, while the Simulator
+    keeps them from the end of one run to the start of the next. So models with
+    state-transition, spontaneous, or balancing delays can only be simulated one run
+    at a time, with the same results as the Simulator. Random initial values and random
+    delays are drawn for each run independently, so their runs differ from the Simulator.
+    Truth tables with propagation or regulation delays are not supported.
+    """
+
+    def __init__(self, model):
+        """Inputs:
+            model : Simulator object with the parsed model
+        """
+
+        self.__model = model
+        self.__getElement = model.get_elements()
+        self.__names = list(self.__getElement.keys())
+        self.__column = {name : col for col, name in enumerate(self.__names)}
+
+        # level values of each element, indexed by value index
+        self.__level_values = [
+                np.linspace(0, 1, element.get_levels()) for element in self.__getElement.values()]
+
+        self.__updates = list()
+        for name in model.get_update_list():
+            element = self.__getElement[name]
+            if type(element.get_act()) is np.ndarray:
+                update = _TableUpdate(element, self.__column)
+            else:
+                update = _ElementUpdate(element, self.__column, self.__level_values)
+            self.__updates.append(update)
+
+        # number of steps of element values needed by propagation delays
+        self.__history_length = max(
+                [update.max_propagation_delay() for update in self.__updates] + [0]) + 1
+
+    def run_simulation(self,
+            simtype,
+            runs,
+            simStep,
+            outName,
+            scenario=0,
+            outMode=1,
+            normalize=False,
+            seed=None
+            ):
+        """Run a simulation with the same inputs and output files as Simulator.run_simulation.
+        Sync simulations without random initial values write the same output files as the Simulator
+        (models with delay counters, see Element.has_delay_counters, must have only one run)
+
+        Inputs:
+            simtype : simulation scheme ('sync', 'rand_sync', or 'rand_sync_gauss')
+            runs : number of simulation runs
+            simStep : number of simulation steps
+            outName : name of output file
+            scenario : index of initial value column (zero-indexed)
+            outMode : specify output mode (1: all runs and summary, 2: transpose format, 3: summary only)
+            normalize : whether to output values normalized to the range [0,1]
+            seed : seed for the random initial values and random delays
+        """
+
+        if simtype not in ['sync', 'rand_sync', 'rand_sync_gauss']:
+            raise ValueError(
+                    'Invalid simulation scheme for batch simulation, must be sync, rand_sync, or rand_sync_gauss')
+        if outMode not in [1, 2, 3]:
+            raise ValueError('Invalid output mode for batch simulation, must be 1, 2, or 3')
+        if runs > 1:
+            delayed = self.__model.delay_counter_elements()
+            if delayed:
+                raise ValueError('Batch simulation of more than one run is not supported for models with '
+                        'state-transition, spontaneous, or balancing delays, which the Simulator keeps from one run '
+                        'to the next: {}'.format(', '.join(delayed)))
+
+        rng = np.random.default_rng(seed)
+
+        names = self.__names
+        initial = self.__model.get_initial()
+        switch_step = self.__model.get_switch_step()
+        switch_value = self.__model.get_switch_value()
+
+        # initial value indices, as set by Simulator.set_initial
+        initial_index = list()
+        for name in names:
+            val = initial[name].get(scenario)
+            if val is None:
+                raise ValueError('Scenario {} does not exist in model '
+                        '(note scenario is zero-indexed, 0 is the first scenario)'.format(scenario))
+            initial_index.append(val)
+        initial_index = np.array(initial_index, dtype=int)
+
+        state = np.tile(initial_index, (runs, 1))
+        # the Simulator only randomizes initial values in each run for these schemes
+        # (not for rand_sync_gauss)
+        if simtype in ['sync', 'rand_sync']:
+            for name in self.__model.get_random_initial()[scenario]:
+                col = self.__column[name]
+                state[:, col] = rng.integers(self.__getElement[name].get_levels(), size=runs)
+
+        # element value toggles at each step for this scenario
+        toggles = dict()
+        for name in names:
+            if name in switch_step:
+                for toggle_step, toggle_val in zip(
+                        switch_step[name][scenario], switch_value[name][scenario]):
+                    toggles.setdefault(toggle_step, []).append((self.__column[name], toggle_val))
+
+        # freq_sum and square_sum keep a running sum of the value of each element,
+        # and of the value squares, across runs (row for each step, column for each element)
+        dtype = float if normalize else int
+        freq_sum = np.zeros((simStep+1, len(names)), dtype=dtype)
+        square_sum = np.zeros((simStep+1, len(names)), dtype=dtype)
+        initial_value = self.output_values(initial_index, normalize)
+        freq_sum[0] = initial_value * runs
+        square_sum[0] = initial_value*initial_value * runs
+
+        # store every step of every run only when writing all runs
+        if outMode in [1, 2]:
+            traces = np.zeros((simStep+1, runs, len(names)), dtype=dtype)
+        else:
+            traces = None
+
+        history = _History(self.__history_length, self.output_values(state, normalize))
+        if traces is not None:
+            traces[0] = history.get_step(0)
+
+        for update in self.__updates:
+            update.reset(runs, simtype, rng)
+
+        for step in range(1, simStep+1):
+            # calculate all next values from the current values, then update all elements
+            next_state = state.copy()
+            for update in self.__updates:
+                next_state[:, update.column] = update.next_index(state, history, step)
+            state = next_state
+
+            values = self.output_values(state, normalize)
+            freq_sum[step] = values.sum(axis=0)
+            square_sum[step] = (values*values).sum(axis=0)
+
+            for col, toggle_val in toggles.get(step, []):
+                # set element value to the toggle value in every run
+                state[:, col] = toggle_val
+                toggle_value = self.output_values(toggle_val, normalize, col)
+                values[:, col] = toggle_value
+                freq_sum[step, col] = toggle_value * runs
+                square_sum[step, col] = toggle_value*toggle_value * runs
+
+            history.append(step, values)
+            if traces is not None:
+                traces[step] = values
+
+        out_levels = {name : 2 if normalize else element.get_levels()
+                for name, element in self.__getElement.items()}
+
+        with open(outName, 'w') as output_file:
+            if traces is not None:
+                for run in range(runs):
+                    run_traces = {name : traces[:, run, col].tolist()
+                            for col, name in enumerate(names)}
+                    if outMode == 1:
+                        write_run(output_file, run, names, out_levels, run_traces)
+                    else:
+                        write_run_table(output_file, run, names, run_traces, simStep)
+
+            if outMode != 2:
+                write_summary(output_file, names, out_levels,
+                        {name : freq_sum[:, col].tolist() for col, name in enumerate(names)},
+                        {name : square_sum[:, col].tolist() for col, name in enumerate(names)},
+                        last_run=runs-1 if outMode == 3 else None)
+
+    def output_values(self, index, normalize, col=None):
+        """Convert value indices to the values stored in traces and summaries
+        (level values if normalize is True, otherwise the indices themselves)
+        """
+        if not normalize:
+            return index
+        if col is not None:
+            return self.__level_values[col][index]
+        return np.stack([self.__level_values[col][index[..., col]]
+                for col in range(len(self.__names))], axis=-1)
+
+
+class _History(object):
+    """Element values of the most recent steps of each run, used for propagation delays"""
+
+    def __init__(self, length, initial):
+        self.__length = length
+        self.__initial = initial
+        self.__values = np.zeros((length,) + initial.shape, dtype=initial.dtype)
+        self.__rows = np.arange(initial.shape[0])
+
+    def get_step(self, step):
+        return self.__initial if step == 0 else self.__values[step % self.__length]
+
+    def append(self, step, values):
+        self.__values[step % self.__length] = values
+
+    def get(self, col, steps):
+        """Get the value of an element in each run at the step given for that run"""
+        return np.where(steps == 0, self.__initial[:, col],
+                self.__values[steps % self.__length, self.__rows, col])
+
+
+class _TableUpdate(object):
+    """Next values of an element with a truth table in all runs"""
+
+    def __init__(self, element, column):
+        prop_delays, reg_delays = element.get_table_delays()
+        if any(int(delay) != 0 for delay in prop_delays) or np.any(reg_delays != 0):
+            raise ValueError('Truth table delays are not supported in batch simulation: '
+                    + element.get_name())
+        self.column = column[element.get_name()]
+        self.__table = element.get_act()
+        self.__reg_columns = [column[name] for name in element.get_name_list()]
+
+    def max_propagation_delay(self):
+        return 0
+
+    def reset(self, runs, simtype, rng):
+        pass
+
+    def next_index(self, state, history, step):
+        return self.__table[tuple(state[:, col] for col in self.__reg_columns)]
+
+
+class _ElementUpdate(object):
+    """Next values of an element with regulation functions in all runs,
+    following Element.evaluate for each run
+    """
+
+    def __init__(self, element, column, level_values):
+        self.__name = element.get_name()
+        self.column = column[self.__name]
+        self.__levels = element.get_levels()
+        self.__max_value_index = self.__levels-1
+        self.__act = element.get_act()
+        self.__inh = element.get_inh()
+        self.__delays = np.array(element.get_delays(), dtype=int)
+        self.__spont = element.get_spont()
+        self.__balance = element.get_balancing()
+        self.__noise = element.get_noise()
+        self.__delta = element.get_delta()
+        self.__increment = element.get_increment()
+        self.__act_rule = element.get_act_rule()
+        self.__inh_rule = element.get_inh_rule()
+        self.__column = column
+        self.__level_values = level_values
+
+        self.__max_propagation_delay = max(
+                _max_propagation_delay(self.__act_rule), _max_propagation_delay(self.__inh_rule))
+        if self.__max_propagation_delay > 0:
+            self.__max_propagation_delay += self.__delta
+
+        # length of the buffer of past regulation scores, as in Element
+        delays = list(element.get_delays())
+        if self.__spont != '':
+            delays += [self.__spont]
+        if self.__balance != '':
+            delays += [int(self.__balance[1])]
+        self.__buffer_length = max(delays)+1
+
+    def max_propagation_delay(self):
+        return self.__max_propagation_delay
+
+    def reset(self, runs, simtype, rng):
+        """Clear delay counters and stored regulation scores at the start of a simulation"""
+        self.__simtype = simtype
+        self.__rng = rng
+        # propagation delays in the rules are randomized with the simulation random generator
+        self.__act_func = compile_rule_array(self.__act_rule, self.__column, self.__level_values,
+                self.__name, self.__levels, self.__delta, rng)
+        self.__inh_func = compile_rule_array(self.__inh_rule, self.__column, self.__level_values,
+                self.__name, self.__levels, self.__delta, rng)
+        self.__runs = runs
+        self.__rows = np.arange(runs)
+        self.__curr_delays = np.zeros((runs, len(self.__delays)), dtype=int)
+        self.__curr_spont_delay = np.zeros(runs, dtype=int)
+        self.__curr_balancing_delay = np.zeros(runs, dtype=int)
+        # past regulation scores, newest first
+        self.__reg_score = np.zeros((runs, self.__buffer_length), dtype=int)
+        self.__num_scores = 0
+
+    def random_delays(self, delay, size):
+        """Randomize delays for the random-delay sync schemes, as in Element.evaluate"""
+        rng = self.__rng
+        if self.__simtype == 'rand_sync_gauss':
+            new_delay = np.rint(rng.normal(delay, self.__delta, size)).astype(int)
+        else:
+            new_delay = rng.integers(delay-self.__delta, delay+self.__delta, size=size, endpoint=True)
+        new_delay[new_delay < 0] = 0
+        return new_delay
+
+    def count_scores(self, score, window):
+        """Count the past regulation scores equal to score in the last window steps of each run,
+        counting none if fewer than window scores are stored or the window is 0
+        """
+        in_window = np.arange(self.__buffer_length) < window[:, None]
+        count = np.sum((self.__reg_score == score) & in_window, axis=1)
+        return np.where((window > 0) & (self.__num_scores >= window), count, 0)
+
+    def next_index(self, state, history, step):
+
+        runs = self.__runs
+        rows = self.__rows
+        max_value_index = self.__max_value_index
+        noise = self.__noise
+
+        y_act = self.__act_func(state, history, step)
+        y_inh = self.__inh_func(state, history, step)
+
+        X_curr_index = state[:, self.column]
+
+        if self.__simtype in ['rand_sync', 'rand_sync_gauss']:
+            # randomized delays for spontaneous behavior
+            if self.__spont != '' and self.__spont != 0:
+                D_spont = self.random_delays(int(self.__spont), runs)
+            else:
+                D_spont = self.__spont
+            # randomized delays for balancing behavior
+            if len(self.__balance) == 2 and self.__balance[0] != 0:
+                balancing = self.__balance[0]
+                D_balancing = self.random_delays(int(self.__balance[1]), runs)
+            else:
+                balancing = ''
+                D_balancing = 0
+            D = np.where(self.__delays != 0,
+                    self.random_delays(self.__delays, (runs, len(self.__delays))), 0)
+        else:
+            D_spont = self.__spont
+            if len(self.__balance) == 2:
+                balancing = self.__balance[0]
+                D_balancing = int(self.__balance[1])
+            else:
+                balancing = ''
+                D_balancing = 0
+            D = np.broadcast_to(self.__delays, (runs, len(self.__delays)))
+
+        # delays list index for an increase (X) and a decrease (-X) from the current value
+        increase_index = X_curr_index
+        decrease_index = (-X_curr_index) % len(self.__delays)
+        D_increase = D[rows, increase_index]
+        D_decrease = D[rows, decrease_index]
+        curr_increase = self.__curr_delays[rows, increase_index]
+        curr_decrease = self.__curr_delays[rows, decrease_index]
+
+        # default is to increment by 1, otherwise increment linearly proportional to
+        # the difference between regulation scores
+        increment = 1
+        spont_increment = 1
+        balance_increment = 1
+        if self.__increment != 0:
+            if y_inh is None:
+                reg_score = y_act
+            elif y_act is None:
+                reg_score = y_inh
+            else:
+                reg_score = np.abs(y_act - y_inh)
+            increment = np.ceil(float(self.__increment)*reg_score*max_value_index).astype(int)
+            spont_increment = max_value_index
+            balance_increment = max_value_index
+
+        # runs that increase, decrease, or use spontaneous or balancing behavior
+        if self.__act and not self.__inh:
+            increase = y_act > 0
+            decrease = np.zeros(runs, dtype=bool)
+            spont = ~increase
+            spont_sign = -1
+            balance = decrease
+        elif not self.__act and self.__inh:
+            decrease = y_inh > 0
+            increase = np.zeros(runs, dtype=bool)
+            spont = ~decrease
+            spont_sign = 1
+            balance = increase
+        else:
+            increase = y_act > y_inh
+            decrease = y_act < y_inh
+            balance = ~increase & ~decrease
+            spont = np.zeros(runs, dtype=bool)
+            spont_sign = 0
+
+        X_next_index = X_curr_index.copy()
+
+        # state transition delays
+        increase_ready = ((self.count_scores(1, D_increase) >= D_increase - noise)
+                & (curr_increase >= D_increase))
+        decrease_ready = ((self.count_scores(-1, np.where(X_curr_index > 0, D_decrease, 0))
+                >= D_decrease - noise) & (curr_decrease >= D_decrease))
+
+        increase_now = increase & increase_ready
+        decrease_now = decrease & decrease_ready
+        X_next_index = np.where(increase_now, X_curr_index + increment, X_next_index)
+        X_next_index = np.where(decrease_now, X_curr_index - increment, X_next_index)
+
+        # increment the delay for holding runs and reset the delay for changing runs
+        self.__curr_delays[rows, increase_index] = np.where(increase_now, 0,
+                np.where(increase, curr_increase + 1, curr_increase))
+        curr_decrease = self.__curr_delays[rows, decrease_index]
+        self.__curr_delays[rows, decrease_index] = np.where(decrease_now, 0,
+                np.where(decrease, curr_decrease + 1, curr_decrease))
+
+        # spontaneous behavior
+        if self.__spont != '' and np.any(spont):
+            spont_window = np.broadcast_to(D_spont, (runs,))
+            spont_now = spont & ((self.count_scores(0, spont_window) >= spont_window - noise)
+                    & (self.__curr_spont_delay >= spont_window))
+            X_next_index = np.where(spont_now, X_curr_index + spont_sign*spont_increment, X_next_index)
+            self.__curr_spont_delay = np.where(spont_now, 0,
+                    np.where(spont, self.__curr_spont_delay + 1, self.__curr_spont_delay))
+
+        # balancing behavior when regulation scores are equal
+        if balancing != '' and np.any(balance):
+            if balancing in ['decrease', 'negative']:
+                balance_sign = -1
+            elif balancing in ['increase', 'positive']:
+                balance_sign = 1
+            else:
+                raise ValueError('Invalid balancing value ' + str(balancing))
+            balance_window = np.broadcast_to(D_balancing, (runs,))
+            balance_now = balance & ((self.count_scores(0, balance_window) >= balance_window - noise)
+                    & (self.__curr_balancing_delay >= balance_window))
+            X_next_index = np.where(balance_now, X_curr_index + balance_sign*balance_increment, X_next_index)
+            self.__curr_balancing_delay = np.where(balance_now, 0,
+                    np.where(balance, self.__curr_balancing_delay + 1, self.__curr_balancing_delay))
+
+        # store the regulation score of this step
+        self.__reg_score[:, 1:] = self.__reg_score[:, :-1]
+        self.__reg_score[:, 0] = np.where(increase, 1, np.where(decrease, -1, 0))
+        self.__num_scores = min(self.__num_scores+1, self.__buffer_length)
+
+        # keep the next value within bounds
+        return np.clip(X_next_index, 0, max_value_index)
+
+
+def _max_propagation_delay(rule):
+    """Largest propagation delay (A~ notation) in a parsed rule"""
+
+    if rule is None:
+        return 0
+    if hasattr(rule, 'delay'):
+        return rule.delay
+    delays = [0]
+    for field in rule:
+        if isinstance(field, tuple):
+            delays.append(_max_propagation_delay(field))
+        elif isinstance(field, list):
+            delays += [_max_propagation_delay(item) for item in field if isinstance(item, tuple)]
+    return max(delays)
@@ -0,0 +1,493 @@
+"""Bit-packed simulation of Boolean (two-level) models
+
+When every element in a model has two levels and no delays, each element value
+is a single bit and each regulation function reduces to bitwise AND, OR, and NOT.
+The BooleanSimulator packs the values of 64 runs into each uint64 word, in the
+same way that DiSH-SOAP packs a network state (see dishsoap/pynq_notebook/dishsoap.py),
+and updates all runs in a word with a few bitwise operations per element.
+"""
+from functools import reduce
+from operator import and_, or_
+
+import numpy as np
+
+from dish.rules import (
+        RegList, Initializer, NecessaryPair, And, Highest, Product, Not, Target, Delayed, Regulator)
+from dish.traces import write_run, write_run_table, write_summary
+
+
+# number of runs packed in each word
+WORD_SIZE = 64
+
+_ALL_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+# number of set bits in each byte value, used when numpy has no bitwise_count
+_BYTE_COUNTS = np.array([bin(x).count('1') for x in range(256)], dtype=np.int64)
+
+
+def boolean_model_errors(model):
+    """List the reasons a model can not be simulated by the BooleanSimulator
+    (an empty list if the model is supported)
+
+    Inputs:
+        model : Simulator object with the parsed model
+    """
+
+    errors = list()
+    update_list = model.get_update_list()
+
+    for name, element in model.get_elements().items():
+
+        if element.get_levels() != 2:
+            errors.append('{} has {} levels'.format(name, element.get_levels()))
+            continue
+
+        if name not in update_list:
+            continue
+
+        if any(delay != 0 for delay in element.get_delays()):
+            errors.append('{} has state transition delays'.format(name))
+        if element.get_noise() < 0:
+            errors.append('{} has negative noise'.format(name))
+
+        if type(element.get_act()) is np.ndarray:
+            prop_delays, reg_delays = element.get_table_delays()
+            if any(int(delay) != 0 for delay in prop_delays) or np.any(reg_delays != 0):
+                errors.append('{} has truth table delays'.format(name))
+            continue
+
+        if element.get_increment() < 0:
+            errors.append('{} has a negative increment'.format(name))
+
+        for rule in [element.get_act_rule(), element.get_inh_rule()]:
+            if rule is not None and rule.summation:
+                errors.append('{} has a summation regulation function'.format(name))
+            for node in _rule_nodes(rule):
+                if isinstance(node, Product):
+                    errors.append('{} has weighted regulators'.format(name))
+                elif isinstance(node, Delayed):
+                    errors.append('{} has propagation delays'.format(name))
+
+        if element.get_act() and element.get_inh():
+            balancing = element.get_balancing()
+            if len(balancing) == 2 and int(balancing[1]) != 0:
+                errors.append('{} has a balancing delay'.format(name))
+        elif element.get_spont() not in ['', 0]:
+            errors.append('{} has a spontaneous delay'.format(name))
+
+    return errors
+
+
+def is_boolean_model(model):
+    """Check whether a model can be simulated by the BooleanSimulator"""
+    return len(boolean_model_errors(model)) == 0
+
+
+class BooleanSimulator(object):
+    """Run the sync and ra schemes for Boolean models with bit-packed run states
+
+    Example:
+        model = Simulator('gene_expression.xlsx')
+        if is_boolean_model(model):
+            BooleanSimulator(model).run_simulation('sync', 640, 100, 'traces.txt')
+
+    Output files have the same format as Simulator.run_simulation. In the ra scheme,
+    the 64 runs packed in the same word update the same randomly chosen element
+    at each step, while runs in different words choose elements independently.
+    Runs in the same word that start from the same initial values therefore follow
+    the same trajectory, so for ra the number of independent runs is the number of
+    words (runs/64) unless initial values are randomized.
+    """
+
+    def __init__(self, model):
+        """Inputs:
+            model : Simulator object with the parsed model, all elements must have
+                two levels and no delays (see boolean_model_errors)
+        """
+
+        errors = boolean_model_errors(model)
+        if len(errors) > 0:
+            raise ValueError('Model is not supported by the Boolean simulator: ' + ', '.join(errors))
+
+        self.__model = model
+        self.__getElement = model.get_elements()
+        self.__names = list(self.__getElement.keys())
+        self.__row = {name : row for row, name in enumerate(self.__names)}
+
+        # next-value function of each element with regulators, by state row
+        self.__update_list = model.get_update_list()
+        self.__next_value = {
+                self.__row[name] : _compile_element(self.__getElement[name], self.__row)
+                for name in self.__update_list}
+
+        # rows of the elements in the same update group as each element (for ra)
+        group_update = model.get_group_update()
+        self.__group_rows = dict()
+        for name in self.__update_list:
+            if name in group_update:
+                self.__group_rows[self.__row[name]] = [
+                        self.__row[key] for key in group_update
+                        if group_update[key] == group_update[name]]
+            else:
+                self.__group_rows[self.__row[name]] = [self.__row[name]]
+
+        # element choices for ra, weighted by update rate if used in the model
+        self.__rate_selector = model.get_rate_selector()
+        if self.__rate_selector is not None:
+            self.__choices = np.array([self.__row[name] for name in self.__rate_selector.get_items()])
+        else:
+            self.__choices = np.array([self.__row[name] for name in self.__update_list])
+
+    def run_simulation(self,
+            simtype,
+            runs,
+            simStep,
+            outName,
+            scenario=0,
+            outMode=1,
+            normalize=False,
+            randomizeEachRun=False,
+            seed=None
+            ):
+        """Run a simulation with the same inputs and output files as Simulator.run_simulation
+
+        Inputs:
+            simtype : simulation scheme ('sync' or 'ra')
+            runs : number of simulation runs
+            simStep : number of simulation steps
+            outName : name of output file
+            scenario : index of initial value column (zero-indexed)
+            outMode : specify output mode (1: all runs and summary, 2: transpose format, 3: summary only)
+            normalize : whether to output values normalized to the range [0,1]
+            randomizeEachRun : for ra specify whether or not to randomize initial values at beginning of each new run
+            seed : seed for the random initial values and element choices
+        """
+
+        if simtype not in ['sync', 'ra']:
+            raise ValueError('Invalid simulation scheme for Boolean simulation, must be sync or ra')
+        if outMode not in [1, 2, 3]:
+            raise ValueError('Invalid output mode for Boolean simulation, must be 1, 2, or 3')
+
+        rng = np.random.default_rng(seed)
+
+        names = self.__names
+        initial = self.__model.get_initial()
+        switch_step = self.__model.get_switch_step()
+        switch_value = self.__model.get_switch_value()
+
+        num_words = (runs + WORD_SIZE - 1) // WORD_SIZE
+        # mask of the bits in each word that hold runs
+        run_mask = np.full(num_words, _ALL_ONES)
+        if runs % WORD_SIZE != 0:
+            run_mask[-1] = np.uint64((1 << (runs % WORD_SIZE)) - 1)
+
+        # initial values, as set by Simulator.set_initial
+        initial_index = list()
+        for name in names:
+            val = initial[name].get(scenario)
+            if val is None:
+                raise ValueError('Scenario {} does not exist in model '
+                        '(note scenario is zero-indexed, 0 is the first scenario)'.format(scenario))
+            initial_index.append(val)
+
+        # state has a row for each element, with the value of each run in one bit
+        state = np.array([run_mask if val else np.zeros(num_words, dtype=np.uint64)
+                for val in initial_index])
+        if simtype == 'sync' or randomizeEachRun:
+            for name in self.__model.get_random_initial()[scenario]:
+                state[self.__row[name]] = rng.integers(
+                        _ALL_ONES, size=num_words, dtype=np.uint64, endpoint=True) & run_mask
+
+        # element value toggles at each step for this scenario
+        toggles = dict()
+        for name in names:
+            if name in switch_step:
+                for toggle_step, toggle_val in zip(
+                        switch_step[name][scenario], switch_value[name][scenario]):
+                    toggles.setdefault(toggle_step, []).append((self.__row[name], toggle_val))
+
+        # for two levels, the value is the same as its square (and normalized value)
+        dtype = float if normalize else int
+        freq_sum = np.zeros((simStep+1, len(names)), dtype=dtype)
+        freq_sum[0] = np.array(initial_index) * runs
+
+        # store every step of every run only when writing all runs
+        if outMode in [1, 2]:
+            traces = np.zeros((simStep+1,) + state.shape, dtype=np.uint64)
+            traces[0] = state
+        else:
+            traces = None
+
+        for step in range(1, simStep+1):
+
+            if simtype == 'sync':
+                # calculate all next values from the current values, then update all elements
+                state = self.sync_update(state)
+            else:
+                if self.__rate_selector is not None:
+                    choices = self.__choices[self.__rate_selector.sample(rng, num_words)]
+                else:
+                    choices = rng.choice(self.__choices, size=num_words)
+                self.ra_update(state, choices)
+
+            freq_sum[step] = count_bits(state & run_mask)
+
+            for row, toggle_val in toggles.get(step, []):
+                # set element value to the toggle value in every run
+                state[row] = run_mask if toggle_val else 0
+                freq_sum[step, row] = toggle_val * runs
+
+            if traces is not None:
+                traces[step] = state
+
+        out_levels = {name : 2 for name in names}
+
+        with open(outName, 'w') as output_file:
+            if traces is not None:
+                run_values = unpack_runs(traces, runs).astype(dtype)
+                for run in range(runs):
+                    run_traces = {name : run_values[:, row, run].tolist()
+                            for row, name in enumerate(names)}
+                    if outMode == 1:
+                        write_run(output_file, run, names, out_levels, run_traces)
+                    else:
+                        write_run_table(output_file, run, names, run_traces, simStep)
+
+            if outMode != 2:
+                sums = {name : freq_sum[:, row].tolist() for row, name in enumerate(names)}
+                write_summary(output_file, names, out_levels, sums, sums,
+                        last_run=runs-1 if outMode == 3 else None)
+
+    def sync_update(self, state):
+        """Update all elements in all runs from the current state"""
+        next_state = state.copy()
+        for row, next_value in self.__next_value.items():
+            next_state[row] = next_value(state)
+        return next_state
+
+    def ra_update(self, state, choices):
+        """Update one element (and the other elements in its update group) in each word,
+        where choices has the row of the element chosen for each word
+        """
+        for row in np.unique(choices):
+            chosen = choices == row
+            group_rows = self.__group_rows[row]
+            # calculate the next values of the group before updating any of them
+            next_values = [np.where(chosen, self.__next_value[group_row](state), state[group_row])
+                    for group_row in group_rows]
+            for group_row, next_value in zip(group_rows, next_values):
+                state[group_row] = next_value
+
+
+def count_bits(words):
+    """Count the set bits in each row of a 2D array of uint64 words"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _BYTE_COUNTS[words.view(np.uint8)].sum(axis=-1)
+
+
+def unpack_runs(words, runs):
+    """Unpack the bits of uint64 words along the last axis into the values of each run"""
+    bits = (words[..., None] >> np.arange(WORD_SIZE, dtype=np.uint64)) & np.uint64(1)
+    return bits.reshape(words.shape[:-1] + (-1,))[..., :runs]
+
+
+def _rule_nodes(rule):
+    """Iterate over all nodes of a parsed rule"""
+
+    if rule is None:
+        return
+    yield rule
+    if isinstance(rule, RegList):
+        for item in rule.items:
+            yield from _rule_nodes(item)
+    elif isinstance(rule, Initializer):
+        yield from _rule_nodes(rule.rule)
+    elif isinstance(rule, NecessaryPair):
+        yield from _rule_nodes(rule.necessary)
+        yield from _rule_nodes(rule.enhance)
+    elif isinstance(rule, And):
+        for group in rule.rules:
+            yield from _rule_nodes(group)
+
+
+def _compile_element(element, row):
+    """Compile the next-value function of a Boolean element, following Element.evaluate
+    for two levels and no delays
+    """
+
+    X = row[element.get_name()]
+
+    if type(element.get_act()) is np.ndarray:
+        return _compile_table(element, row)
+
+    act = _compile_rule(element.get_act_rule(), row, X)
+    inh = _compile_rule(element.get_inh_rule(), row, X)
+
+    if act is not None and inh is None:
+        # increase if activation > 0, otherwise spontaneously decay or hold
+        if element.get_spont() == '':
+            return lambda state: act(state) | state[X]
+        return act
+    elif act is None and inh is not None:
+        # decrease if inhibition > 0, otherwise spontaneously increase or hold
+        if element.get_spont() == '':
+            return lambda state: state[X] & ~inh(state)
+        return lambda state: ~inh(state)
+
+    # increase if activation > inhibition, decrease if activation < inhibition,
+    # otherwise use the balancing behavior
+    balancing = element.get_balancing()
+    balancing = balancing[0] if len(balancing) == 2 else ''
+    if balancing in ['decrease', 'negative']:
+        def next_value(state):
+            return act(state) & ~inh(state)
+    elif balancing in ['increase', 'positive']:
+        def next_value(state):
+            return act(state) | ~inh(state)
+    elif balancing == '':
+        def next_value(state):
+            y_act = act(state)
+            y_inh = inh(state)
+            return (y_act & ~y_inh) | (~(y_act ^ y_inh) & state[X])
+    else:
+        raise ValueError('Invalid balancing value ' + str(balancing))
+    return next_value
+
+
+def _compile_table(element, row):
+    """Compile a two-level truth table into an OR of the rows where the next value is 1"""
+
+    table = element.get_act()
+    reg_rows = [row[name] for name in element.get_name_list()]
+    minterms = [index for index in np.ndindex(table.shape) if table[index] == 1]
+
+    def next_value(state):
+        result = np.zeros_like(state[0])
+        for index in minterms:
+            term = np.full_like(state[0], _ALL_ONES)
+            for reg_row, val in zip(reg_rows, index):
+                term &= state[reg_row] if val else ~state[reg_row]
+            result |= term
+        return result
+
+    return next_value
+
+
+def _compile_rule(rule, row, X):
+    """Compile a parsed rule into a function of the packed state returning the
+    score of every run in one bit (the same as compile_rule for 0/1 values)
+    """
+
+    if rule is None:
+        return None
+
+    def compile_group(group):
+        # returns a function giving the list of scores in a group
+        funcs = compile_items(group.items)
+
+        def eval_group(state):
+            y_sum, _ = eval_items(funcs, state)
+            return y_sum
+
+        return eval_group
+
+    def compile_items(items):
+        funcs = list()
+        for item in items:
+            if isinstance(item, Initializer):
+                funcs.append((compile_group(item.rule), None, None))
+            elif isinstance(item, NecessaryPair):
+                funcs.append((None, (compile_group(item.necessary), compile_group(item.enhance)), None))
+            else:
+                funcs.append((None, None, compile_item(item)))
+        return funcs
+
+    def eval_items(funcs, state):
+        # necessary pair scores accumulate across all pairs in the same list,
+        # the score is 0 if all necessary scores are 0, otherwise max(min(necessary), max(enhance))
+        y_init = list()
+        y_sum = list()
+        any_necessary = None
+        for init_func, pair_funcs, item_func in funcs:
+            if init_func is not None:
+                y_init += init_func(state)
+            elif pair_funcs is not None:
+                necessary = pair_funcs[0](state)
+                enhance = pair_funcs[1](state)
+                if any_necessary is None:
+                    any_necessary = np.zeros_like(state[0])
+                    all_necessary = np.full_like(state[0], _ALL_ONES)
+                    any_enhance = np.zeros_like(state[0])
+                for y in necessary:
+                    any_necessary = any_necessary | y
+                    all_necessary = all_necessary & y
+                for y in enhance:
+                    any_enhance = any_enhance | y
+                y_sum.append(any_necessary & (all_necessary | any_enhance))
+            else:
+                y_sum.append(item_func(state))
+        return y_sum, y_init
+
+    def compile_item(item):
+
+        if isinstance(item, Regulator):
+            reg_row = row[item.name]
+            return lambda state: state[reg_row]
+
+        elif isinstance(item, (Not, Highest)):
+            reg_row = row[item.name]
+            if isinstance(item, Not) or item.negate:
+                return lambda state: ~state[reg_row]
+            return lambda state: state[reg_row]
+
+        elif isinstance(item, Target):
+            reg_row = row[item.name]
+            if item.target == 1:
+                return lambda state: state[reg_row]
+            elif item.target == 0:
+                return lambda state: ~state[reg_row]
+            return lambda state: np.zeros_like(state[reg_row])
+
+        elif isinstance(item, And):
+            if not any(isinstance(x, NecessaryPair) for group in item.rules for x in group.items):
+                # AND of every item in the groups
+                return _reduce_funcs(and_, [compile_item(x) for group in item.rules for x in group.items])
+
+            group_funcs = [compile_group(group) for group in item.rules]
+
+            def eval_and(state):
+                return reduce(and_, [y for group_func in group_funcs for y in group_func(state)])
+
+            return eval_and
+
+        else:
+            raise ValueError('Invalid regulation function for Boolean simulation: ' + str(item))
+
+    if not any(isinstance(item, (Initializer, NecessaryPair)) for item in rule.items):
+        # OR of all items
+        return _reduce_funcs(or_, [compile_item(item) for item in rule.items])
+
+    funcs = compile_items(rule.items)
+
+    def eval_rule(state):
+        y_sum, y_init = eval_items(funcs, state)
+        score = reduce(or_, y_sum, np.zeros_like(state[0]))
+        if len(y_init) > 0:
+            # if the regulated element is 0, an initializer must be 1 for a nonzero score
+            score = reduce(or_, y_init) | (state[X] & score)
+        return score
+
+    return eval_rule
+
+
+def _reduce_funcs(operator, funcs):
+    """Combine the results of functions of the state with a bitwise operator"""
+
+    if len(funcs) == 1:
+        return funcs[0]
+
+    def eval_reduce(state):
+        return reduce(operator, [func(state) for func in funcs])
+
+    return eval_reduce
@@ -0,0 +1,312 @@
+"""On-disk cache of parsed models
+
+Reading a model spreadsheet with pandas takes much longer than short simulations,
+so Simulator can store the parsed model in a cache directory and load it from
+there when the same model file is loaded again, without reading the spreadsheet.
+Entries are keyed by a hash of the model file content, the package version, and
+the source of the package modules (which define the parsed objects), so that a changed
+model file or simulator parses the model again. When the cache has more than
+max_entries entries (or max_bytes bytes), the least recently used are removed.
+
+Loading a pickle can run any code, so each entry starts with an HMAC of the pickled
+data, keyed with a random key stored in the user config directory (outside the cache
+directory), and entries are only unpickled if the HMAC matches. Files that other users
+or programs write to the cache directory are ignored and removed.
+"""
+import os
+import re
+import hmac
+import pickle
+import hashlib
+import logging
+import tempfile
+
+
+# default maximum number of cached models
+MAX_ENTRIES = 64
+
+# version of the format of the cache entries
+CACHE_VERSION = 2
+
+# size of the HMAC key and of the HMAC at the start of each entry, in bytes
+KEY_SIZE = 32
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+# hash of the source files and package version, computed once
+_source_digest = None
+_package_version = None
+
+# installed package metadata directory, and version in the project file of a source checkout
+_DIST_INFO = re.compile(r'dish-([^-]+)\.dist-info')
+_PROJECT_VERSION = re.compile(r'^version\s*=\s*"([^"]+)"', re.MULTILINE)
+
+
+def default_cache_dir():
+    """Return the cache directory set in the DISH_CACHE_DIR environment variable,
+    or dish in the user cache directory (XDG_CACHE_HOME or ~/.cache)
+    """
+
+    directory = os.environ.get('DISH_CACHE_DIR')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dish')
+
+
+def default_key_file():
+    """Return the file of the key used to sign the cache entries, set in the DISH_CACHE_KEY environment variable,
+    or cache.key in the dish user config directory (XDG_CONFIG_HOME or ~/.config)
+    """
+
+    key_file = os.environ.get('DISH_CACHE_KEY')
+    if key_file:
+        return key_file
+    base = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'dish', 'cache.key')
+
+
+def read_key(key_file):
+    """Return the key in key_file, creating the file with a new random key (readable by the user only)
+    if it does not exist
+    """
+
+    try:
+        with open(key_file, 'rb') as input_file:
+            key = input_file.read()
+    except FileNotFoundError:
+        directory = os.path.dirname(os.path.abspath(key_file))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # write to a temporary file first (created with mode 0600), so that other processes never read a partial key
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as key_output:
+                key_output.write(os.urandom(KEY_SIZE))
+            os.replace(temp_path, key_file)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        with open(key_file, 'rb') as input_file:
+            key = input_file.read()
+    if len(key) < KEY_SIZE:
+        raise ValueError('Model cache key must have at least {} bytes: {}'.format(KEY_SIZE, key_file))
+    return key
+
+
+def package_version():
+    """Return the installed version of the dish package, or 'unknown' if it is not installed
+    """
+
+    global _package_version
+    if _package_version is None:
+        _package_version = _find_package_version()
+    return _package_version
+
+
+def _find_package_version():
+    # importing importlib.metadata and searching sys.path for the package takes longer than loading
+    # a cached model, so first look for the metadata next to the package (where pip installs it),
+    # or the project file of a source checkout
+    parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        names = os.listdir(parent)
+    except OSError:
+        names = list()
+    for name in names:
+        match = _DIST_INFO.fullmatch(name)
+        if match:
+            return match.group(1)
+    if 'pyproject.toml' in names:
+        with open(os.path.join(parent, 'pyproject.toml')) as project_file:
+            match = _PROJECT_VERSION.search(project_file.read())
+        if match:
+            return match.group(1)
+
+    from importlib import metadata
+    try:
+        return metadata.version('dish')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def source_digest():
+    """Return a hash of the source of all modules of the package, which define the cached objects
+    (e.g., Element in simulator.py, ScoreWindow in history.py, WeightedChoice in rng.py),
+    so that entries from a different (e.g., locally edited) simulator are not used
+    """
+
+    global _source_digest
+    if _source_digest is None:
+        digest = hashlib.sha256()
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(package_dir)):
+            if name.endswith('.py'):
+                digest.update(name.encode() + b'\0')
+                with open(os.path.join(package_dir, name), 'rb') as source_file:
+                    digest.update(source_file.read())
+        _source_digest = digest.hexdigest()
+    return _source_digest
+
+
+class ModelCache(object):
+    """Directory of parsed models, keyed by the content of the model files
+
+    Example:
+        cache = ModelCache('~/dish_cache', max_entries=16)
+        model = Simulator(model_file, modelCache=cache)
+    """
+
+    def __init__(self, directory=None, max_entries=MAX_ENTRIES, max_bytes=None, key_file=None):
+        """Inputs:
+            directory : cache directory (by default, from default_cache_dir), created when storing the first entry
+            max_entries : maximum number of cached models
+            max_bytes : maximum total size of the cached models in bytes (None for no limit)
+            key_file : file of the key used to sign the entries (by default, from default_key_file),
+                created with a random key when the cache is first used
+        """
+
+        if directory is None:
+            directory = default_cache_dir()
+        if int(max_entries) != max_entries or max_entries < 1:
+            raise ValueError('Maximum number of cache entries must be a positive integer: {}'.format(max_entries))
+
+        self.__directory = os.path.expanduser(directory)
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__key_file = os.path.expanduser(key_file if key_file is not None else default_key_file())
+        # key read from the key file when the cache is first used
+        self.__key = None
+
+    def get_directory(self):
+        return self.__directory
+
+    def get_key_file(self):
+        return self.__key_file
+
+    def sign(self, data):
+        """Return the HMAC of data (bytes) with the key of this cache
+        """
+
+        if self.__key is None:
+            self.__key = read_key(self.__key_file)
+        return hmac.new(self.__key, data, hashlib.sha256).digest()
+
+    def key(self, model_file):
+        """Return the cache key of a model file, a hash of the file content,
+        the package version, and the simulator source
+        """
+
+        digest = hashlib.sha256()
+        with open(model_file, 'rb') as input_file:
+            for block in iter(lambda: input_file.read(1 << 20), b''):
+                digest.update(block)
+        digest.update('{}\n{}\n{}'.format(CACHE_VERSION, package_version(), source_digest()).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        """Return the path of the cache entry with this key
+        """
+
+        return os.path.join(self.__directory, key + '.pickle')
+
+    def load(self, key):
+        """Return the data stored with this key, or None if it is not in the cache
+        """
+
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                content = cache_file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as error:
+            logging.warning('Could not read model cache entry {}: {}'.format(path, error))
+            return None
+
+        try:
+            digest = self.sign(content[DIGEST_SIZE:])
+        except (OSError, ValueError) as error:
+            logging.warning('Model cache is not used, the cache key cannot be read: {}'.format(error))
+            return None
+        try:
+            # only unpickle entries written with the key of this cache
+            if not hmac.compare_digest(content[:DIGEST_SIZE], digest):
+                raise ValueError('the entry is not signed with the cache key {}'.format(self.__key_file))
+            data = pickle.loads(content[DIGEST_SIZE:])
+        except Exception as error:
+            # entries that cannot be read are parsed again and replaced
+            logging.warning('Removing unreadable model cache entry {}: {}'.format(path, error))
+            self.remove(path)
+            return None
+
+        # mark the entry as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def store(self, key, data):
+        """Store data with this key, and remove the least recently used entries over the limits.
+        Errors writing the cache are logged and otherwise ignored
+        """
+
+        try:
+            content = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            digest = self.sign(content)
+            os.makedirs(self.__directory, exist_ok=True)
+            # write to a temporary file first, so that other processes never read a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.__directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as cache_file:
+                    cache_file.write(digest)
+                    cache_file.write(content)
+                os.replace(temp_path, self.path(key))
+            except BaseException:
+                self.remove(temp_path)
+                raise
+        except (OSError, ValueError) as error:
+            logging.warning('Could not store the model in the cache {}: {}'.format(self.__directory, error))
+            return
+        self.evict()
+
+    def entries(self):
+        """Return the (last use time, size, path) of each entry, most recently used first
+        """
+
+        entries = list()
+        try:
+            names = os.listdir(self.__directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if name.endswith('.pickle'):
+                path = os.path.join(self.__directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries, reverse=True)
+
+    def evict(self):
+        """Remove the least recently used entries over the maximum number of entries or total size
+        """
+
+        total_bytes = 0
+        for count, (_, size, path) in enumerate(self.entries()):
+            total_bytes += size
+            if count >= self.__max_entries or (self.__max_bytes is not None and total_bytes > self.__max_bytes):
+                self.remove(path)
+
+    def clear(self):
+        """Remove all entries
+        """
+
+        for _, _, path in self.entries():
+            self.remove(path)
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,116 @@
+"""Command-line entry point of the simulator
+
+    dish-sim model.xlsx sync 100 1000 traces.txt --scenario 1 --out-mode 3 --seed 42
+
+Short simulations of cached models are dominated by the time to start the program,
+so modules that are slow to import (the simulator itself, pandas, concurrent.futures)
+are only imported when a code path needs them. With --timing, the time to import the
+simulator, load the model, and simulate is written to stderr, with a warning when
+the import and model loading take longer than STARTUP_BUDGET. With --progress, the
+runs and steps completed, steps per second, and estimated time remaining are written
+to stderr while the simulation runs.
+"""
+import sys
+import time
+import argparse
+
+
+# simulation schemes of Simulator.run_simulation
+SCHEMES = ['ra', 'round', 'sync', 'ra_multi', 'sync_multi', 'rand_sync', 'rand_sync_gauss', 'fixed_updates']
+
+# target time in seconds to import the simulator and load a cached model
+STARTUP_BUDGET = 0.2
+
+
+def positive_float(text):
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError('must be a positive number: {}'.format(text))
+    return value
+
+
+def format_progress(progress):
+    """Return a line describing a progress report of Simulator.run_simulation
+    """
+
+    if progress['done']:
+        remaining = 'done in {:.1f} s'.format(progress['seconds'])
+    elif progress['eta'] is None:
+        remaining = 'starting'
+    else:
+        remaining = '{:.0f} s remaining'.format(progress['eta'])
+    return '{} runs of {} completed, {} of {} steps ({:.0%}), {:.0f} steps/s, {}'.format(
+        progress['runs_completed'], progress['runs'], progress['steps_completed'], progress['total_steps'],
+        progress['fraction'], progress['steps_per_second'], remaining)
+
+
+def print_progress(progress):
+    print(format_progress(progress), file=sys.stderr, flush=True)
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError('must be a positive integer: {}'.format(text))
+    return value
+
+
+def get_parser():
+    """Return the argument parser of the dish-sim command
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='dish-sim',
+        description='Simulate a DiSH model and write the element traces to an output file')
+    parser.add_argument('model', help='model file (.xlsx, .csv, .tsv)')
+    parser.add_argument('scheme', choices=SCHEMES, help='simulation scheme')
+    parser.add_argument('runs', type=positive_int, help='number of runs')
+    parser.add_argument('steps', type=positive_int, help='number of steps in each run')
+    parser.add_argument('output', help='output file')
+    parser.add_argument('--scenario', type=int, default=0, help='scenario (initial values) column (default: 0)')
+    parser.add_argument('--out-mode', type=int, default=1, choices=[1, 2, 3, 4],
+        help='output mode (default: 1, all runs and summaries)')
+    parser.add_argument('--seed', type=int, default=None, help='random number seed')
+    parser.add_argument('--workers', type=positive_int, default=1, help='number of worker processes (default: 1)')
+    parser.add_argument('--normalize', action='store_true', help='normalize element values to [0, 1]')
+    parser.add_argument('--no-cache', action='store_true',
+        help='always read the model file instead of the parsed model cache')
+    parser.add_argument('--timing', action='store_true',
+        help='write the import, model loading, and simulation times to stderr')
+    parser.add_argument('--progress', type=positive_float, nargs='?', const=1.0, default=None, metavar='SECONDS',
+        help='write the progress of the simulation to stderr every SECONDS seconds (default: 1)')
+    return parser
+
+
+def main(argv=None):
+    """Run a simulation with the command-line arguments argv (by default, sys.argv)
+    """
+
+    parser = get_parser()
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    from dish.simulator import Simulator
+    imported = time.perf_counter()
+
+    try:
+        model = Simulator(args.model, modelCache=None if args.no_cache else True)
+        loaded = time.perf_counter()
+        model.run_simulation(args.scheme, args.runs, args.steps, args.output,
+            scenario=args.scenario, outMode=args.out_mode, normalize=args.normalize,
+            workers=args.workers, seed=args.seed,
+            progress=print_progress if args.progress else None, progressInterval=args.progress or 1.0)
+    except (OSError, ValueError) as error:
+        parser.exit(1, '{}: error: {}\n'.format(parser.prog, error))
+    simulated = time.perf_counter()
+
+    if args.timing:
+        print('import {:.1f} ms, load {:.1f} ms, simulate {:.1f} ms'.format(
+            1000*(imported - start), 1000*(loaded - imported), 1000*(simulated - loaded)), file=sys.stderr)
+        if loaded - start > STARTUP_BUDGET:
+            print('startup took longer than the budget of {:.0f} ms'.format(1000*STARTUP_BUDGET), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
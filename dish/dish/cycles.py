@@ -0,0 +1,143 @@
+"""Cycle detection and transition caching for deterministic simulation runs
+
+CycleDetector finds cycles (attractors) of sync runs, so that Simulator can fill
+in the steps that repeat a cycle instead of simulating them. TransitionCache keeps
+the element values after recently seen states, so that runs of models without
+delays can skip evaluating the elements when the same values come up again.
+"""
+from collections import OrderedDict
+
+
+# maximum number of steps of a run kept to find cycles (longer histories are cleared)
+CYCLE_HISTORY_STEPS = 65536
+
+
+class CycleDetector(object):
+    """Finds cycles (attractors) of deterministic sync runs from the state after each step:
+    the element values of the recent steps that are read through propagation delays,
+    and the delay counters and regulation scores of the elements.
+    When the state repeats, every following step repeats the steps since its previous occurrence,
+    until a toggle changes an element value. A fixed point is a cycle with period 1.
+    The delay state is only compared for steps with element values that occurred before,
+    so a cycle is found when its element values repeat for the second time.
+    """
+
+    def __init__(self, model, steps):
+        """Inputs:
+            model : Simulator object
+            steps : number of recent steps of element values in the state (from Simulator.cycle_steps)
+        """
+
+        self.__model = model
+        self.__state = model.get_state()
+        self.__steps = steps
+        self.reset()
+
+    def reset(self):
+        """Look for a new cycle starting from the current state (e.g., at the start of a run)
+        """
+
+        # element value indices at each step since the reset
+        self.__values = [tuple(self.__state)]
+        # steps and delay states with each recent element values
+        self.__history = dict()
+
+    def check(self, step, toggled=False):
+        """Check the state after step (toggled if element values were toggled in this step).
+        Returns the period if the state occurred at an earlier step, or None
+        """
+
+        if toggled:
+            # toggles are not repeated, so earlier steps cannot be part of a cycle
+            self.reset()
+            return None
+
+        if len(self.__values) > CYCLE_HISTORY_STEPS:
+            self.__values = self.__values[-self.__steps:]
+            self.__history = dict()
+
+        self.__values.append(tuple(self.__state))
+        key = tuple(self.__values[-self.__steps:])
+        entries = self.__history.get(key)
+        if entries is None:
+            self.__history[key] = [(step, None)]
+            return None
+
+        # only get the delay state for repeated element values, as it takes longer
+        delay_state = self.__model.delay_state()
+        for previous_step, previous_delay_state in entries:
+            if previous_delay_state == delay_state:
+                return step - previous_step
+        entries.append((step, delay_state))
+        return None
+
+    def cycle_values(self, period):
+        """Element value indices at each step of a cycle with period steps, ending at the last step checked
+        """
+
+        return self.__values[-period:]
+
+
+class TransitionCache(object):
+    """Bounded least-recently-used cache of deterministic state transitions,
+    from the element value indices before a step to the value indices after the step.
+    Value indices are packed into bytes when all elements have at most 256 levels,
+    which are smaller than tuples to store and faster to hash.
+    """
+
+    def __init__(self, maxsize, levels):
+        """Inputs:
+            maxsize : maximum number of transitions kept, the least recently used are removed first
+            levels : number of levels of each element in the state
+        """
+
+        self.__maxsize = maxsize
+        self.__pack = bytes if max(levels, default=1) <= 256 else tuple
+        self.__transitions = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    def __len__(self):
+        return len(self.__transitions)
+
+    def get_maxsize(self):
+        return self.__maxsize
+
+    def get_hits(self):
+        return self.__hits
+
+    def get_misses(self):
+        return self.__misses
+
+    def add_counts(self, hits, misses):
+        """Add hit and miss counts, e.g., from the copies of the cache in worker processes
+        """
+
+        self.__hits += hits
+        self.__misses += misses
+
+    def pack(self, state):
+        """Return the key for a list of element value indices
+        """
+
+        return self.__pack(state)
+
+    def get(self, key):
+        """Return the packed value indices after the state with this key, or None if not in the cache
+        """
+
+        successor = self.__transitions.get(key)
+        if successor is None:
+            self.__misses += 1
+            return None
+        self.__transitions.move_to_end(key)
+        self.__hits += 1
+        return successor
+
+    def store(self, key, state):
+        """Store the element value indices after the state with this key
+        """
+
+        self.__transitions[key] = self.__pack(state)
+        if len(self.__transitions) > self.__maxsize:
+            self.__transitions.popitem(last=False)
@@ -0,0 +1,130 @@
+"""Bounded histories of element values and regulation scores
+
+StepHistory keeps the values of an element at the first and most recent steps of
+a run, in place of the values of every step, for propagation delays in streaming
+simulations. ScoreWindow keeps running counts of the recent regulation scores of
+an element, to check state-transition, spontaneous, and balancing delays.
+"""
+
+
+class StepHistory(object):
+    """Values of an element at the first step and the most recent steps of a run,
+    used in place of the list of all values in memo for propagation delays in streaming mode.
+    Supports the list operations used on memo entries (len, indexing, and += [value]),
+    where len is the number of steps stored so far.
+    """
+
+    def __init__(self, initial, length):
+        """Inputs:
+            initial : value at step 0
+            length : number of recent steps kept (at least the longest propagation delay)
+        """
+
+        self.__length = length
+        self.__first = initial
+        self.__values = [initial]*length
+        self.__total = 1
+
+    def __len__(self):
+        return self.__total
+
+    def __position(self, step):
+        if step < 0:
+            step += self.__total
+        if step < 0 or step >= self.__total or (step > 0 and step < self.__total-self.__length):
+            raise IndexError('Step {} is not stored in the recent history'.format(step))
+        return step
+
+    def __getitem__(self, step):
+        step = self.__position(step)
+        if step == 0:
+            return self.__first
+        return self.__values[step % self.__length]
+
+    def __setitem__(self, step, value):
+        step = self.__position(step)
+        if step == 0:
+            self.__first = value
+        self.__values[step % self.__length] = value
+
+    def append(self, value):
+        self.__values[self.__total % self.__length] = value
+        self.__total += 1
+
+    def __iadd__(self, values):
+        for value in values:
+            self.append(value)
+        return self
+
+
+class ScoreWindow(object):
+    """History of the most recent regulation scores (1, 0, or -1) of an element,
+    used to check state-transition, spontaneous, and balancing delays.
+    Stores running counts of each score in a ring buffer,
+    so the number of times a score occurs in the last D scores is a difference of two counts,
+    without building arrays of the recent scores at each update.
+    """
+
+    def __init__(self, maxlen):
+        """Inputs:
+            maxlen : number of recent scores kept (the longest window that can be counted)
+        """
+
+        self.__maxlen = maxlen
+        # the ring buffer has one more slot than maxlen, to also keep the counts
+        # from before the oldest score in the window
+        self.__size = maxlen+1
+        # total number of scores appended
+        self.__total = 0
+        self.__last = None
+        # running counts of each score after each append, indexed by (total % size)
+        self.__counts = {score : [0]*self.__size for score in [1, 0, -1]}
+
+    def __len__(self):
+        """Number of recent scores kept, as for a deque with maxlen
+        """
+
+        return min(self.__total, self.__maxlen)
+
+    def last(self):
+        """Most recent score
+        """
+
+        if self.__total == 0:
+            raise IndexError('No regulation scores in the window')
+        return self.__last
+
+    def append(self, score, repeat=1):
+        """Add a score to the history, repeat times
+        """
+
+        # repeating more than maxlen times only fills the window with this score,
+        # which gives the same counts as repeating maxlen times
+        for _ in range(min(repeat, self.__maxlen)):
+            previous = self.__total % self.__size
+            self.__total += 1
+            current = self.__total % self.__size
+            for value, counts in self.__counts.items():
+                counts[current] = counts[previous] + (1 if value == score else 0)
+        self.__last = score
+
+    def count(self, score, window):
+        """Number of times score occurs in the last window scores,
+        or 0 if the window is empty or longer than the history
+        """
+
+        if window <= 0 or window > min(self.__total, self.__maxlen):
+            return 0
+        counts = self.__counts[score]
+        return counts[self.__total % self.__size] - counts[(self.__total-window) % self.__size]
+
+    def scores(self):
+        """Recent scores in the window, from oldest to newest
+        """
+
+        recent = list()
+        for total in range(self.__total-len(self)+1, self.__total+1):
+            for score, counts in self.__counts.items():
+                if counts[total % self.__size] != counts[(total-1) % self.__size]:
+                    recent.append(score)
+        return tuple(recent)
@@ -0,0 +1,379 @@
+"""Simulation job manifests and a local job scheduler
+
+A manifest (TOML or JSON) lists simulation jobs, each with a model file, scheme,
+number of runs and steps, output file, and other options of Simulator.run_simulation.
+Options in [defaults] apply to all jobs, and options given as lists are expanded
+into one job for each combination of values:
+
+    workers = 4
+    log = "results/log.json"
+
+    [defaults]
+    runs = 100
+    steps = 1000
+    outMode = 3
+
+    [[jobs]]
+    model = ["models/tcell.xlsx", "models/tcell_ko.xlsx"]
+    scheme = ["ra", "sync"]
+    scenario = [0, 1]
+    output = "results/{model_name}_{scheme}_{scenario}.txt"
+
+The output file name can include any job option in braces, and {model_name}
+(the model file name without extension). Relative paths are relative to the manifest.
+
+Jobs run in a pool of worker processes. Each model file is read once (through the
+parsed model cache), and every job simulates its own copy of the parsed model
+(random initial values are drawn when the model is read, so they are the same in
+all jobs on the model file, unless randomizeEachRun is set). Jobs without a seed
+get a seed drawn from the random numbers of their model, in job order, so that jobs
+on the same model are not correlated and do not depend on the number of workers;
+the seed of each job is written to the log.
+Jobs whose output file already exists are skipped, and outputs are written
+to a temporary file first so that the outputs of interrupted jobs are not mistaken
+for complete ones. The status and timing of each job are written to a JSON log,
+with the progress of running jobs (runs and steps completed, steps per second,
+estimated seconds remaining, and the time of the last update, to find stalled jobs).
+"""
+import os
+import sys
+import copy
+import json
+import time
+import itertools
+import traceback
+import argparse
+from dish.cli import SCHEMES
+
+
+# options of each job, other than the run_simulation keyword arguments
+JOB_KEYS = ['model', 'scheme', 'runs', 'steps', 'output', 'ruleTableSize']
+
+# run_simulation keyword arguments allowed in manifests
+RUN_OPTIONS = ['scenario', 'outMode', 'normalize', 'randomizeEachRun', 'eventTraces', 'workers',
+        'seed', 'streaming', 'chunkSteps', 'extend', 'cacheSize']
+
+# options that are file paths, relative to the manifest
+PATH_KEYS = ['model', 'output', 'eventTraces']
+
+# default seconds between updates of the progress of running jobs in the log
+PROGRESS_INTERVAL = 5.0
+
+# models of the jobs in worker processes, by (model file, rule table size)
+_job_models = dict()
+
+# progress of the jobs in worker processes, by job index, and seconds between progress reports
+_job_counts = None
+_job_progress_interval = PROGRESS_INTERVAL
+
+
+def load_manifest(manifest_file):
+    """Return the content of a TOML (.toml) or JSON manifest file
+    """
+
+    if os.path.splitext(manifest_file)[1].lower() == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            # Python < 3.11
+            import tomli as tomllib
+        with open(manifest_file, 'rb') as input_file:
+            return tomllib.load(input_file)
+    with open(manifest_file) as input_file:
+        return json.load(input_file)
+
+
+def expand_jobs(manifest, base_dir='.'):
+    """Return the list of jobs in a manifest, with the defaults added, lists of options expanded,
+    output file names formatted, and paths relative to base_dir
+
+    Inputs:
+        manifest : dictionary with a list of jobs and optional defaults, as from load_manifest
+        base_dir : directory of relative paths (the manifest directory)
+    """
+
+    if not isinstance(manifest.get('jobs'), list) or len(manifest['jobs']) == 0:
+        raise ValueError('Manifest must have a list of jobs')
+
+    defaults = manifest.get('defaults', dict())
+    jobs = list()
+    for entry_index, entry in enumerate(manifest['jobs']):
+        options = dict(defaults)
+        options.update(entry)
+
+        unknown = [key for key in options if key not in JOB_KEYS + RUN_OPTIONS]
+        if unknown:
+            raise ValueError('Unknown options in job {}: {}'.format(entry_index, ', '.join(unknown)))
+        missing = [key for key in ['model', 'scheme', 'runs', 'steps', 'output'] if key not in options]
+        if missing:
+            raise ValueError('Missing options in job {}: {}'.format(entry_index, ', '.join(missing)))
+
+        # one job for each combination of the values of options given as lists
+        keys = list(options.keys())
+        values = [value if isinstance(value, list) else [value] for value in options.values()]
+        for combination in itertools.product(*values):
+            job = dict(zip(keys, combination))
+            if job['scheme'] not in SCHEMES:
+                raise ValueError('Invalid simulation scheme in job {}: {}'.format(entry_index, job['scheme']))
+            fields = dict(job, model_name=os.path.splitext(os.path.basename(job['model']))[0])
+            try:
+                job['output'] = job['output'].format(**fields)
+            except (KeyError, IndexError) as error:
+                raise ValueError('Invalid output file name in job {}: {}'.format(entry_index, job['output'])) from error
+            for key in PATH_KEYS:
+                if key in job:
+                    job[key] = os.path.normpath(os.path.join(base_dir, os.path.expanduser(job[key])))
+            jobs.append(job)
+
+    outputs = set()
+    for job in jobs:
+        if job['output'] in outputs:
+            raise ValueError('More than one job writes the output file {}, '
+                    'include the options that differ in the output file name'.format(job['output']))
+        outputs.add(job['output'])
+
+    return jobs
+
+
+def run_manifest(manifest_file, workers=None, log_file=None, force=False, modelCache=True,
+        progress_interval=PROGRESS_INTERVAL):
+    """Run the jobs in a manifest file, and return the log of the jobs, as from run_jobs
+
+    Inputs:
+        manifest_file : TOML (.toml) or JSON manifest file
+        workers : number of jobs to run at the same time (by default, workers in the manifest, or 1)
+        log_file : JSON log file (by default, log in the manifest, or the manifest name with .log.json)
+        force : run jobs even if their output files exist
+        modelCache : as in Simulator, used to load the models
+        progress_interval : seconds between updates of the progress of running jobs in the log
+    """
+
+    manifest = load_manifest(manifest_file)
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    jobs = expand_jobs(manifest, base_dir)
+
+    if workers is None:
+        workers = manifest.get('workers', 1)
+    if log_file is None:
+        if 'log' in manifest:
+            log_file = os.path.join(base_dir, manifest['log'])
+        else:
+            log_file = os.path.splitext(os.path.abspath(manifest_file))[0] + '.log.json'
+
+    return run_jobs(jobs, workers, log_file, force, modelCache, manifest_file=os.path.abspath(manifest_file),
+            progress_interval=progress_interval)
+
+
+def run_jobs(jobs, workers=1, log_file=None, force=False, modelCache=True, manifest_file=None,
+        progress_interval=PROGRESS_INTERVAL):
+    """Run simulation jobs in a pool of worker processes, and return the log of the jobs
+
+    Inputs:
+        jobs : list of jobs, as from expand_jobs
+        workers : number of jobs to run at the same time
+        log_file : JSON file to write the log to, updated as jobs finish (None to not write the log)
+        force : run jobs even if their output files exist
+        modelCache : as in Simulator, used to load the models
+        manifest_file : manifest file name written to the log
+        progress_interval : seconds between updates of the progress of running jobs in the log
+    Returns a dictionary with the start time and duration of the jobs, the model loading times,
+    and the options, seed, status ('done', 'skipped', or 'failed'), timing, error, and progress of each job
+    """
+    from dish.simulator import Simulator
+    from dish.progress import ProgressCounts
+
+    if int(workers) != workers or workers < 1:
+        raise ValueError('Number of workers must be a positive integer: {}'.format(workers))
+
+    if not progress_interval > 0:
+        raise ValueError('Progress interval must be positive: {}'.format(progress_interval))
+
+    start = time.time()
+    log = {
+        'manifest' : manifest_file,
+        'started' : _timestamp(start),
+        'workers' : workers,
+        'seconds' : None,
+        'models' : list(),
+        'jobs' : [{'index' : index, 'job' : job, 'status' : 'pending'} for index, job in enumerate(jobs)],
+        'summary' : None,
+        }
+
+    # existing outputs are skipped, except when adding runs to them
+    pending = list()
+    for record in log['jobs']:
+        job = record['job']
+        if not force and not job.get('extend', False) and os.path.exists(job['output']):
+            record['status'] = 'skipped'
+        else:
+            pending.append(record)
+
+    # read each model once
+    models = dict()
+    for record in pending:
+        job = record['job']
+        model_key = (job['model'], job.get('ruleTableSize', 0))
+        if model_key not in models:
+            load_start = time.perf_counter()
+            try:
+                models[model_key] = Simulator(job['model'], ruleTableSize=model_key[1], modelCache=modelCache)
+                error = None
+            except Exception:
+                models[model_key] = None
+                error = traceback.format_exc()
+            log['models'].append({'model' : job['model'], 'ruleTableSize' : model_key[1],
+                    'seconds' : time.perf_counter() - load_start, 'error' : error})
+        if models[model_key] is None:
+            record.update({'status' : 'failed', 'error' : 'Could not load the model {}'.format(job['model'])})
+    pending = [record for record in pending if record['status'] == 'pending']
+
+    # each job simulates a copy of the model with the same random number generator state,
+    # so jobs without a seed get their own seed, drawn in job order as in Simulator.run_scenarios
+    for record in pending:
+        job = record['job']
+        if job.get('seed') is None:
+            record['seed'] = models[(job['model'], job.get('ruleTableSize', 0))].get_rng().draw_seed()
+        else:
+            record['seed'] = job['seed']
+    _write_log(log, log_file)
+
+    if workers > 1 and len(pending) > 1:
+        # imported here to keep the import of this module fast
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+        # the models are passed to each worker process once, instead of with every job,
+        # and the workers report the progress of the jobs in shared memory, by job index
+        counts = ProgressCounts(len(log['jobs']))
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                initializer=_init_job_worker, initargs=(models, counts, progress_interval)) as executor:
+            futures = {executor.submit(_run_job, dict(record['job'], seed=record['seed']), record['index']) : record
+                    for record in pending}
+            running = set(futures)
+            while running:
+                done, running = wait(running, timeout=progress_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    futures[future].update(future.result())
+                for record in futures.values():
+                    report = counts.get(record['index'])
+                    if report is not None:
+                        record['progress'] = _progress_record(report, report['time'])
+                _write_log(log, log_file)
+    else:
+        _init_job_worker(models, progress_interval=progress_interval)
+        for record in pending:
+            def write_progress(report, record=record):
+                record['progress'] = _progress_record(report, time.time())
+                _write_log(log, log_file)
+            record.update(_run_job(dict(record['job'], seed=record['seed']), progress=write_progress))
+            _write_log(log, log_file)
+        _init_job_worker(dict())
+
+    log['seconds'] = time.time() - start
+    log['summary'] = {status : sum(record['status'] == status for record in log['jobs'])
+            for status in ['done', 'skipped', 'failed']}
+    _write_log(log, log_file)
+    return log
+
+
+def _init_job_worker(models, counts=None, progress_interval=PROGRESS_INTERVAL):
+    global _job_models, _job_counts, _job_progress_interval
+    _job_models = models
+    _job_counts = counts
+    _job_progress_interval = progress_interval
+
+
+def _run_job(job, index=None, progress=None):
+    """Run one job on a copy of its model, and return its status and timing.
+    The progress of the simulation is reported to the progress function, 
+    or else stored with the job index in the progress counts of the worker
+    """
+
+    model = copy.deepcopy(_job_models[(job['model'], job.get('ruleTableSize', 0))])
+    options = {key : value for key, value in job.items() if key in RUN_OPTIONS}
+    if progress is None and _job_counts is not None:
+        progress = _job_counts.callback(index)
+    if progress is not None:
+        options.update(progress=progress, progressInterval=_job_progress_interval)
+
+    start = time.time()
+    job_start = time.perf_counter()
+    partial = None
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(job['output'])), exist_ok=True)
+        if options.get('extend', False):
+            # the simulator replaces extended outputs when they are complete
+            model.run_simulation(job['scheme'], job['runs'], job['steps'], job['output'], **options)
+        else:
+            partial = job['output'] + '.partial'
+            model.run_simulation(job['scheme'], job['runs'], job['steps'], partial, **options)
+            os.replace(partial, job['output'])
+        status, error = 'done', None
+    except Exception:
+        status, error = 'failed', traceback.format_exc()
+    finally:
+        if partial is not None and os.path.exists(partial):
+            os.remove(partial)
+
+    return {'status' : status, 'error' : error, 'started' : _timestamp(start),
+            'seconds' : time.perf_counter() - job_start, 'pid' : os.getpid()}
+
+
+def _progress_record(report, seconds):
+    """Return the progress of a job written to the log, from a progress report
+    of the simulation at time seconds
+    """
+
+    return {'runs_completed' : report['runs_completed'], 'steps_completed' : report['steps_completed'],
+            'steps_per_second' : report['steps_per_second'], 'eta' : report['eta'], 'updated' : _timestamp(seconds)}
+
+
+def _timestamp(seconds):
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))
+
+
+def _write_log(log, log_file):
+    if log_file is None:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+    # replace the log when it is complete, so that it can be read while the jobs run
+    with open(log_file + '.tmp', 'w') as output_file:
+        json.dump(log, output_file, indent=2)
+    os.replace(log_file + '.tmp', log_file)
+
+
+def main(argv=None):
+    """Run the jobs of a manifest with the command-line arguments argv (by default, sys.argv)
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='dish-jobs',
+        description='Run the simulation jobs listed in a TOML or JSON manifest')
+    parser.add_argument('manifest', help='manifest file (.toml or .json)')
+    parser.add_argument('--workers', type=int, default=None,
+        help='number of jobs to run at the same time (default: workers in the manifest, or 1)')
+    parser.add_argument('--log', default=None,
+        help='JSON log file (default: log in the manifest, or the manifest name with .log.json)')
+    parser.add_argument('--force', action='store_true', help='run jobs even if their output files exist')
+    parser.add_argument('--no-cache', action='store_true',
+        help='always read the model files instead of the parsed model cache')
+    parser.add_argument('--progress-interval', type=float, default=PROGRESS_INTERVAL, metavar='SECONDS',
+        help='seconds between updates of the progress of running jobs in the log (default: {:g})'.format(
+            PROGRESS_INTERVAL))
+    args = parser.parse_args(argv)
+
+    try:
+        log = run_manifest(args.manifest, args.workers, args.log, args.force,
+                modelCache=None if args.no_cache else True, progress_interval=args.progress_interval)
+    except (OSError, ValueError) as error:
+        parser.exit(1, '{}: error: {}\n'.format(parser.prog, error))
+
+    for record in log['jobs']:
+        if record['status'] == 'failed':
+            print('job {} failed: {}\n{}'.format(record['index'], record['job']['output'], record['error']),
+                    file=sys.stderr)
+    print('{done} done, {skipped} skipped, {failed} failed'.format(**log['summary']), file=sys.stderr)
+    return 1 if log['summary']['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Profiles of the phases of a simulation and of the evaluations of each element
+
+Simulator.run_simulation with profile=True replaces the model methods of each
+phase, and the evaluation and regulation functions of the elements, with timed
+wrappers (see timed) while the simulation runs, and collects the counts and times
+in a SimulationProfile, returned by Simulator.get_profile.
+"""
+import time
+
+
+class SimulationProfile(object):
+    """Counters and timers of the phases of a simulation and of the evaluations of each element,
+    collected by run_simulation with profile=True and returned by Simulator.get_profile.
+    While the simulation runs, the model methods of each phase (METHODS) and the evaluation
+    and regulation functions of the elements are replaced by wrappers that count and time their calls,
+    so that simulations without profiling run the same code as before.
+    With workers, the phases of the runs are added up over the worker processes.
+    """
+
+    # timed model methods, and the timer of each
+    METHODS = [
+            ('write_simulation', 'write'),
+            ('run_workers', 'workers'),
+            ('simulate_runs', 'runs'),
+            ('set_initial', 'initialize'),
+            ('set_random_initial', 'initialize'),
+            ('update_step', 'update'),
+            ('toggle', 'toggles'),
+            ('stream_toggle', 'toggles'),
+            ('write_run_output', 'output'),
+            ]
+
+    # phases of the simulation in the report
+    PHASES = {
+            'initialize' : 'setting the initial values of each run',
+            'scheduling' : 'choosing the elements to update (including update groups and the transition cache)',
+            'rules' : 'evaluating the regulation functions and truth tables',
+            'delays' : 'comparing regulation scores and counting delays to get the next element values',
+            'toggles' : 'toggling element values',
+            'store' : 'storing element values and summaries of each step, and finding cycles',
+            'output' : 'writing the output file',
+            'other' : 'checking inputs and reading existing outputs or event traces',
+            }
+
+    def __init__(self, simtype=None, runs=0, steps=0):
+        self.__simtype = simtype
+        self.__runs = runs
+        self.__steps = steps
+        # [calls, seconds] of each timer
+        self.__timers = {timer : [0, 0.0] for timer in ['total'] + [timer for _, timer in self.METHODS]}
+        # [calls, seconds] of the evaluations ('evaluate') and regulation functions ('act', 'inh') of each element
+        self.__elements = dict()
+        # notation types of the regulation functions of each element
+        self.__notations = dict()
+
+    def get_simtype(self):
+        return self.__simtype
+
+    def get_runs(self):
+        return self.__runs
+
+    def get_steps(self):
+        return self.__steps
+
+    def attach(self, model):
+        """Replace the methods of the model and its updated elements by timed wrappers
+        """
+
+        for method, timer in self.METHODS:
+            setattr(model, method, timed(getattr(model, method), self.__timers[timer]))
+        elements = model.get_elements()
+        for name in model.get_update_list():
+            stats = self.__elements.setdefault(name, {key : [0, 0.0] for key in ['evaluate', 'act', 'inh']})
+            self.__notations[name] = elements[name].get_notations()
+            elements[name].set_profile(stats)
+
+    def detach(self, model):
+        """Restore the methods replaced by attach
+        """
+
+        for method, _ in self.METHODS:
+            model.__dict__.pop(method, None)
+        elements = model.get_elements()
+        for name in model.get_update_list():
+            elements[name].set_profile(None)
+
+    def add_time(self, timer, seconds):
+        self.__timers[timer][0] += 1
+        self.__timers[timer][1] += seconds
+
+    def merge(self, profile):
+        """Add the counts and times of another profile (e.g., of the runs in a worker process)
+        """
+
+        for timer, (calls, seconds) in profile.__timers.items():
+            self.__timers[timer][0] += calls
+            self.__timers[timer][1] += seconds
+        for name, stats in profile.__elements.items():
+            own = self.__elements.setdefault(name, {key : [0, 0.0] for key in stats})
+            for key, (calls, seconds) in stats.items():
+                own[key][0] += calls
+                own[key][1] += seconds
+        self.__notations.update(profile.__notations)
+
+    def report(self):
+        """Return the profile as a dictionary with
+            simtype, runs, steps : simulation scheme, and number of runs and steps of each run
+            seconds : total time of the simulation
+            phases : seconds spent in each phase (see PHASES)
+            counters : number of runs, steps, element evaluations, and regulation function evaluations,
+                and steps with toggles
+            elements : for each updated element, the number of evaluations, their total and mean seconds,
+                and the seconds in its regulation functions
+            notations : for each notation type of the regulation functions, the number of rules of this type,
+                their evaluations, and total and mean seconds
+        """
+
+        timers = {timer : seconds for timer, (calls, seconds) in self.__timers.items()}
+
+        elements = dict()
+        notations = dict()
+        for name, stats in self.__elements.items():
+            calls, seconds = stats['evaluate']
+            rule_seconds = stats['act'][1] + stats['inh'][1]
+            elements[name] = {
+                    'evaluations' : calls,
+                    'seconds' : seconds,
+                    'mean_seconds' : seconds/calls if calls > 0 else 0.0,
+                    'rule_seconds' : rule_seconds,
+                    }
+            for key, notation in self.__notations.get(name, dict()).items():
+                entry = notations.setdefault(notation, {'rules' : 0, 'evaluations' : 0, 'seconds' : 0.0})
+                entry['rules'] += 1
+                entry['evaluations'] += stats[key][0]
+                entry['seconds'] += stats[key][1]
+        for entry in notations.values():
+            entry['mean_seconds'] = entry['seconds']/entry['evaluations'] if entry['evaluations'] > 0 else 0.0
+
+        evaluate_seconds = sum([element['seconds'] for element in elements.values()])
+        rule_seconds = sum([element['rule_seconds'] for element in elements.values()])
+        # the runs are simulated in the workers, or in write_simulation
+        runs_seconds = timers['workers'] if self.__timers['workers'][0] > 0 else timers['runs']
+        phases = {
+                'initialize' : timers['initialize'],
+                'scheduling' : timers['update'] - evaluate_seconds,
+                'rules' : rule_seconds,
+                'delays' : evaluate_seconds - rule_seconds,
+                'toggles' : timers['toggles'],
+                'store' : timers['runs'] - timers['initialize'] - timers['update'] - timers['toggles'] - timers['output'],
+                'output' : timers['output'] + timers['write'] - runs_seconds,
+                'other' : timers['total'] - timers['write'],
+                }
+
+        counters = {
+                'runs' : self.__runs,
+                'steps' : self.__timers['update'][0],
+                'evaluations' : sum([element['evaluations'] for element in elements.values()]),
+                'rule_evaluations' : sum([stats['act'][0] + stats['inh'][0] for stats in self.__elements.values()]),
+                'toggle_steps' : self.__timers['toggles'][0],
+                }
+
+        return {
+                'simtype' : self.__simtype,
+                'runs' : self.__runs,
+                'steps' : self.__steps,
+                'seconds' : timers['total'],
+                'phases' : phases,
+                'counters' : counters,
+                'elements' : elements,
+                'notations' : notations,
+                }
+
+    def __str__(self):
+        """Summary of the report: time of each phase, notation types, and the elements with the longest evaluation time
+        """
+
+        report = self.report()
+        total = report['seconds'] or 1.0
+        lines = ['{} simulation, {} runs of {} steps: {:.3f} s'.format(
+                report['simtype'], report['runs'], report['steps'], report['seconds'])]
+        lines.append(', '.join(['{} {}'.format(count, name.replace('_', ' ')) for name, count in report['counters'].items()]))
+        lines.append('Phase          Seconds        %')
+        for name, seconds in report['phases'].items():
+            lines.append('{:<12} {:9.4f} {:8.1f}'.format(name, seconds, 100*seconds/total))
+        lines.append('Notation                        Rules  Evaluations  Mean (us)')
+        for name, entry in sorted(report['notations'].items(), key=lambda item: -item[1]['seconds']):
+            lines.append('{:<30} {:6d} {:12d} {:10.2f}'.format(
+                    name, entry['rules'], entry['evaluations'], 1e6*entry['mean_seconds']))
+        lines.append('Element                    Evaluations    Seconds  Mean (us)')
+        for name, entry in sorted(report['elements'].items(), key=lambda item: -item[1]['seconds'])[:10]:
+            lines.append('{:<26} {:11d} {:10.4f} {:10.2f}'.format(
+                    name, entry['evaluations'], entry['seconds'], 1e6*entry['mean_seconds']))
+        return '\n'.join(lines)
+
+
+def timed(func, timer):
+    """Return a function that calls func, and adds 1 to timer[0] and the time of the call to timer[1]
+    (func is the __wrapped__ attribute of the returned function)
+    """
+
+    perf_counter = time.perf_counter
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        result = func(*args, **kwargs)
+        timer[0] += 1
+        timer[1] += perf_counter() - start
+        return result
+    wrapper.__wrapped__ = func
+    return wrapper
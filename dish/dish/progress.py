@@ -0,0 +1,215 @@
+"""Progress reports of running simulations
+
+SimulationProgress calls a progress function with the runs and steps completed,
+the speed, and the estimated time remaining while a simulation runs.
+ProgressCounts keeps the progress of simulations in worker processes in shared
+memory, so that the main process can add them up.
+"""
+import math
+import time
+
+
+# default seconds between progress reports
+PROGRESS_INTERVAL = 1.0
+
+
+class SimulationProgress(object):
+    """Progress of a simulation, reported to a progress function while it runs.
+    The simulation loops call check every few steps of a run and finish_run after each run,
+    and the progress function is called with report() at most every interval seconds,
+    and when finish is called at the end of the simulation.
+    The number of steps between checks is set from the speed of the simulation,
+    so that the time is read about CHECKS_PER_INTERVAL times per interval
+    """
+
+    CHECKS_PER_INTERVAL = 10
+
+    def __init__(self, callback, simtype=None, runs=0, steps=0, interval=PROGRESS_INTERVAL):
+        self.__callback = callback
+        self.__simtype = simtype
+        self.__runs = runs
+        self.__steps = steps
+        self.__interval = interval
+        self.__start = time.perf_counter()
+        self.__last_report = self.__start
+        # runs completed, and steps of the completed runs and of the current run
+        self.__runs_completed = 0
+        self.__steps_completed = 0
+        self.__run_steps = 0
+        self.__done = False
+        # time and steps completed at the last check, and steps from one check to the next
+        self.__check_time = self.__start
+        self.__check_steps = 0
+        self.__stride = 1
+
+    def get_simtype(self):
+        return self.__simtype
+
+    def get_runs(self):
+        return self.__runs
+
+    def get_steps(self):
+        return self.__steps
+
+    def get_interval(self):
+        return self.__interval
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    def check(self, step):
+        """Record that the current run is at step, report the progress if the interval has passed,
+        and return the step of the next check
+        """
+
+        now = time.perf_counter()
+        self.__run_steps = step
+        steps_completed = self.__steps_completed + step
+
+        # steps in a fraction of the interval at the speed since the last check,
+        # at most doubling from one check to the next so that a fast start does not delay reports
+        elapsed = now - self.__check_time
+        if elapsed > 0:
+            stride = int((steps_completed - self.__check_steps)*self.__interval/(elapsed*self.CHECKS_PER_INTERVAL))
+            self.__stride = max(1, min(stride, 2*self.__stride))
+        self.__check_time = now
+        self.__check_steps = steps_completed
+
+        if now - self.__last_report >= self.__interval:
+            self.notify(now)
+        return step + self.__stride
+
+    def finish_run(self):
+        """Record that the current run is complete, and report the progress if the interval has passed
+        """
+
+        self.__runs_completed += 1
+        self.__steps_completed += self.__steps
+        self.__run_steps = 0
+        now = time.perf_counter()
+        if now - self.__last_report >= self.__interval:
+            self.notify(now)
+
+    def update(self, runs_completed, steps_completed):
+        """Set the runs and steps completed (e.g., added up over worker processes),
+        and report the progress if the interval has passed
+        """
+
+        self.__runs_completed = runs_completed
+        self.__steps_completed = steps_completed
+        self.__run_steps = 0
+        now = time.perf_counter()
+        if now - self.__last_report >= self.__interval:
+            self.notify(now)
+
+    def finish(self):
+        """Record that all runs are complete, and report the progress
+        """
+
+        self.__runs_completed = self.__runs
+        self.__steps_completed = self.__runs*self.__steps
+        self.__run_steps = 0
+        self.__done = True
+        self.notify()
+
+    def notify(self, now=None):
+        """Call the progress function with the progress report
+        """
+
+        self.__last_report = time.perf_counter() if now is None else now
+        if self.__callback is not None:
+            self.__callback(self.report())
+
+    def report(self):
+        """Return the progress as a dictionary with
+            simtype, runs, steps : simulation scheme, and number of runs and steps of each run
+            runs_completed : number of runs completed
+            steps_completed : number of steps completed, in all runs
+            total_steps : number of steps of all runs
+            fraction : fraction of the steps completed
+            seconds : time since the simulation started
+            steps_per_second : average number of steps per second since the simulation started
+            eta : estimated seconds until the simulation is done (None before the first steps)
+            done : whether the simulation is done
+        """
+
+        seconds = time.perf_counter() - self.__start
+        steps_completed = self.__steps_completed + self.__run_steps
+        total_steps = self.__runs*self.__steps
+        steps_per_second = steps_completed/seconds if seconds > 0 else 0.0
+        if self.__done:
+            eta = 0.0
+        elif steps_per_second > 0:
+            eta = (total_steps - steps_completed)/steps_per_second
+        else:
+            eta = None
+        return {
+            'simtype' : self.__simtype,
+            'runs' : self.__runs,
+            'steps' : self.__steps,
+            'runs_completed' : self.__runs_completed,
+            'steps_completed' : steps_completed,
+            'total_steps' : total_steps,
+            'fraction' : steps_completed/total_steps if total_steps > 0 else 1.0,
+            'seconds' : seconds,
+            'steps_per_second' : steps_per_second,
+            'eta' : eta,
+            'done' : self.__done,
+            }
+
+
+class ProgressCounts(object):
+    """Progress reports of simulations in worker processes, kept in shared memory
+    so that the main process can read them while the workers run.
+    The object is passed to the worker processes when they start (e.g., in the initializer arguments
+    of a process pool), and callback(slot) is the progress function of the simulation in each slot
+    """
+
+    # values of each slot, from SimulationProgress.report and the time of the report
+    FIELDS = ['runs_completed', 'steps_completed', 'seconds', 'steps_per_second', 'eta', 'time']
+
+    def __init__(self, slots):
+        # imported here to keep the import of the simulator fast
+        import multiprocessing
+        self.__slots = slots
+        # a time of 0 marks slots without reports
+        self.__values = multiprocessing.RawArray('d', len(self.FIELDS)*slots)
+
+    def __len__(self):
+        return self.__slots
+
+    def callback(self, slot):
+        """Return a progress function that stores the progress reports in slot
+        """
+
+        values = self.__values
+        offset = slot*len(self.FIELDS)
+        fields = self.FIELDS[:-1]
+        def store(report):
+            for i, field in enumerate(fields):
+                values[offset+i] = math.nan if report[field] is None else report[field]
+            values[offset+len(fields)] = time.time()
+        return store
+
+    def get(self, slot):
+        """Return the last progress report stored in slot (with the time of the report),
+        or None if there is no report
+        """
+
+        values = self.__values[slot*len(self.FIELDS):(slot+1)*len(self.FIELDS)]
+        if values[-1] == 0:
+            return None
+        report = dict(zip(self.FIELDS, values))
+        report['runs_completed'] = int(report['runs_completed'])
+        report['steps_completed'] = int(report['steps_completed'])
+        if math.isnan(report['eta']):
+            report['eta'] = None
+        return report
+
+    def total(self):
+        """Return the number of runs and steps completed in all slots
+        """
+
+        reports = [self.get(slot) for slot in range(self.__slots)]
+        return (sum(report['runs_completed'] for report in reports if report is not None),
+                sum(report['steps_completed'] for report in reports if report is not None))
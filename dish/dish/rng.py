@@ -0,0 +1,210 @@
+"""Seedable random number source for the simulation schemes
+
+The schemes draw many single random values per step (element choices, update
+probabilities, delay perturbations). Drawing each value from NumPy separately is
+slow, so SimulationRandom draws uniform and normal values in blocks and hands them
+out one at a time, with the same method names as the random module.
+WeightedChoice selects items with probability proportional to their weights
+(e.g., element update rates) in constant time using an alias table.
+run_seed derives the seed of each simulation run from the seed of the simulation,
+so that a run draws the same values in any worker process.
+"""
+import numpy as np
+
+
+# number of values drawn from the generator at once
+BLOCK_SIZE = 4096
+
+
+class SimulationRandom(object):
+    """Random number source for one simulation, drawing values in blocks
+
+    Example:
+        rng = SimulationRandom(seed=42)
+        element = rng.choice(update_list)
+        delay = rng.randint(delay-delta, delay+delta)
+    """
+
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        """Inputs:
+            seed : seed for the NumPy generator (int, SeedSequence, or None for a random seed)
+            block_size : number of values drawn from the generator at once
+        """
+
+        self.__block_size = block_size
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Reset the generator with a new seed and discard any pre-drawn values
+        """
+
+        self.__generator = np.random.default_rng(seed)
+        # pre-drawn values, and the position of the next value to use in each block
+        self.__uniform = list()
+        self.__uniform_index = 0
+        self.__normal = list()
+        self.__normal_index = 0
+
+    def get_generator(self):
+        return self.__generator
+
+    def draw_seed(self):
+        """Return a random integer seed drawn from this generator
+        """
+
+        return int(self.__generator.integers(2**63))
+
+    def spawn(self, n):
+        """Return n independent SeedSequences derived from this generator,
+        used to seed the random numbers of worker processes
+        """
+
+        return np.random.SeedSequence(self.draw_seed()).spawn(n)
+
+    def random(self):
+        """Return a random float in [0.0, 1.0)
+        """
+
+        if self.__uniform_index >= len(self.__uniform):
+            self.__uniform = self.__generator.random(self.__block_size).tolist()
+            self.__uniform_index = 0
+        value = self.__uniform[self.__uniform_index]
+        self.__uniform_index += 1
+        return value
+
+    def randrange(self, n):
+        """Return a random integer in [0, n)
+        """
+
+        return int(self.random()*n)
+
+    def randint(self, a, b):
+        """Return a random integer in [a, b], including both end points
+        """
+
+        return a + int(self.random()*(b-a+1))
+
+    def choice(self, seq):
+        """Return a random item from a non-empty sequence
+        """
+
+        return seq[int(self.random()*len(seq))]
+
+    def shuffle(self, x):
+        """Shuffle list x in place
+        """
+
+        for i in reversed(range(1, len(x))):
+            j = int(self.random()*(i+1))
+            x[i], x[j] = x[j], x[i]
+
+    def normal(self, loc=0.0, scale=1.0):
+        """Return a normally distributed float with mean loc and standard deviation scale
+        """
+
+        if self.__normal_index >= len(self.__normal):
+            self.__normal = self.__generator.standard_normal(self.__block_size).tolist()
+            self.__normal_index = 0
+        value = self.__normal[self.__normal_index]
+        self.__normal_index += 1
+        return loc + scale*value
+
+
+def run_seed(seed, run):
+    """Return the SeedSequence for the random numbers of one run of a simulation
+
+    Inputs:
+        seed : seed of the simulation (int, or SeedSequence, e.g. from SimulationRandom.spawn)
+        run : index of the run
+
+    This is the SeedSequence spawned for the run from the SeedSequence of the seed,
+    so each run has its own stream, which does not depend on the other runs
+    simulated in the same process, or on the stream seeded with the seed itself.
+    """
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.SeedSequence(seed.entropy, spawn_key=tuple(seed.spawn_key) + (run,),
+            pool_size=seed.pool_size)
+
+
+class WeightedChoice(object):
+    """Select items with probability proportional to their (possibly fractional) weights
+
+    Uses Vose's alias table: each of the n columns holds one item with probability
+    prob[i] and an alias item otherwise, so a selection takes one uniform draw
+    regardless of the weight values, and memory grows with the number of items only.
+
+    Example:
+        rates = WeightedChoice(['A', 'B'], [1, 2.5])
+        element = rates.choice(rng)
+        positions = rates.sample(rng.get_generator(), 1000)
+    """
+
+    def __init__(self, items, weights):
+        """Inputs:
+            items : list of items to select from
+            weights : non-negative weight of each item, with a positive sum
+        """
+
+        weights = np.asarray(weights, dtype=float)
+        if len(items) != len(weights) or len(items) == 0:
+            raise ValueError('WeightedChoice needs one weight for each item')
+        if np.any(weights < 0) or not np.all(np.isfinite(weights)) or weights.sum() <= 0:
+            raise ValueError('Weights must be non-negative numbers with a positive sum: {}'.format(weights.tolist()))
+
+        self.__items = list(items)
+        n = len(items)
+
+        # scale the weights so that the average column is full (1)
+        scaled = weights*n/weights.sum()
+        prob = np.ones(n)
+        alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1]
+        large = [i for i in range(n) if scaled[i] >= 1]
+        # fill each small column with its own item and the remainder with a large item
+        while small and large:
+            i = small.pop()
+            j = large[-1]
+            prob[i] = scaled[i]
+            alias[i] = j
+            scaled[j] -= 1-scaled[i]
+            if scaled[j] < 1:
+                small.append(large.pop())
+        # any remaining columns are full (up to rounding errors)
+
+        self.__prob = prob
+        self.__alias = alias
+        self.__prob_list = prob.tolist()
+        self.__alias_list = alias.tolist()
+
+    def get_items(self):
+        return self.__items
+
+    def get_probabilities(self):
+        """Return the selection probability of each item
+        """
+
+        n = len(self.__items)
+        probabilities = self.__prob/n
+        np.add.at(probabilities, self.__alias, (1-self.__prob)/n)
+        return probabilities
+
+    def choice(self, rng):
+        """Return one item, using one uniform value from rng (a SimulationRandom object)
+        """
+
+        scaled = rng.random()*len(self.__prob_list)
+        column = int(scaled)
+        if scaled - column < self.__prob_list[column]:
+            return self.__items[column]
+        return self.__items[self.__alias_list[column]]
+
+    def sample(self, generator, size):
+        """Return an array with the positions in items of size selections,
+        drawn at once from a NumPy generator
+        """
+
+        columns = generator.integers(len(self.__prob), size=size)
+        keep = generator.random(size) < self.__prob[columns]
+        return np.where(keep, columns, self.__alias[columns])
@@ -0,0 +1,786 @@
+"""Parse and compile regulation functions written in influence set notation
+
+A rule string such as '(A,!B),{C}[D]' is parsed once into a small expression
+tree, which is then compiled into nested closures. Evaluating the compiled
+rule gives exactly the same score as interpreting the rule string with
+Element.eval_reg, without splitting and searching strings on every update.
+Rules with few regulators can also be tabulated for every combination of
+regulator levels, so that evaluating them reads one score from a lookup table.
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+
+
+# Nodes of the parsed expression tree
+
+# regulators separated by commas (discrete OR) or plus signs (summation)
+RegList = namedtuple('RegList', ['items', 'summation'])
+# {A} : initializer, only valid at the top level of a rule
+Initializer = namedtuple('Initializer', ['rule'])
+# {A}[B] : necessary pair
+NecessaryPair = namedtuple('NecessaryPair', ['necessary', 'enhance'])
+# (A,B) : discrete AND
+And = namedtuple('And', ['rules'])
+# A^ or !A^ : highest-value regulator
+Highest = namedtuple('Highest', ['name', 'negate'])
+# 2*A*B : product of weights and regulators
+Product = namedtuple('Product', ['factors'])
+# !A : discrete NOT
+Not = namedtuple('Not', ['name'])
+# A=1 : target-value regulator
+Target = namedtuple('Target', ['name', 'target'])
+# 2~A or !2~A : propagation delay
+Delayed = namedtuple('Delayed', ['name', 'delay', 'negate'])
+# A : single regulator
+Regulator = namedtuple('Regulator', ['name'])
+
+
+def parse_rule(reg_rule, layer=0):
+    """Parse a regulation function into an expression tree
+
+    Mirrors the parsing done by Element.eval_reg, including its error checks.
+    Returns None for an empty rule (an element without this type of regulator).
+    """
+
+    if not reg_rule:
+        return None
+
+    summation = False
+
+    # regulators are separated by commas or + (outside parentheses)
+    if '+' not in reg_rule:
+        reg_list = split_comma_outside_parentheses(reg_rule)
+    else:
+        if ',' in reg_rule:
+            raise ValueError(
+                'Found mixed commas (OR) and plus signs (ADD) in regulator function. '
+                'Check for deprecated highest state notation element+ and replace with element^')
+        elif reg_rule[-1] == '+':
+            raise ValueError(
+                'Check for deprecated highest state notation: replace element+ with element^')
+        else:
+            reg_list = reg_rule.split('+')
+            summation = True
+
+    items = list()
+    for reg_element in reg_list:
+
+        if reg_element[0] == '{' and reg_element[-1] == '}':
+            # initializer, only allowed at the top level
+            assert(layer == 0)
+            if '*' in reg_element:
+                raise ValueError('Weights are not supported in initializers: ' + reg_element)
+            items.append(Initializer(parse_group(reg_element[1:-1])))
+
+        elif reg_element[0] == '{' and reg_element[-1] == ']':
+            # necessary pair, find the cut point between {} and []
+            parentheses = 0
+            cut_point = 0
+            for index, char in enumerate(reg_element):
+                if char == '{':
+                    parentheses += 1
+                elif char == '}':
+                    parentheses -= 1
+                if parentheses == 0:
+                    cut_point = index
+                    break
+
+            necessary_element = reg_element[1:cut_point]
+            enhance_element = reg_element[cut_point+2:-1]
+            if '*' in necessary_element or '*' in enhance_element:
+                raise ValueError('Weights are not supported in necessary pairs: ' + reg_element)
+            items.append(NecessaryPair(
+                    parse_group(necessary_element),
+                    parse_group(enhance_element)))
+
+        elif reg_element[0] == '(' and reg_element[-1] == ')':
+            # discrete AND of all entities in the parentheses
+            items.append(And([
+                    parse_group(and_entity)
+                    for and_entity in split_comma_outside_parentheses(reg_element[1:-1])]))
+
+        else:
+            # single regulator, confirm that there are no commas remaining
+            assert(',' not in reg_element)
+            items.append(parse_single(reg_element))
+
+    return RegList(items, summation)
+
+
+def parse_group(reg_rule):
+    """Parse a nested (layer 1) regulation function, which must not be empty"""
+
+    group = parse_rule(reg_rule, 1)
+    if group is None:
+        raise ValueError('Empty regulator group in regulation function')
+
+    return group
+
+
+def parse_single(reg_element):
+    """Parse a single regulator and its notation (^, *, !, =, ~)"""
+
+    if reg_element[-1] == '^':
+        # highest state regulator
+        if reg_element[0] == '!':
+            return Highest(reg_element[1:-1], True)
+        else:
+            return Highest(reg_element[:-1], False)
+    elif '*' in reg_element:
+        # list of weights and regulators multiplied together
+        factors = list()
+        for reg in reg_element.split('*'):
+            if not re.search(r'[a-zA-Z]', reg):
+                factors.append(float(reg))
+            else:
+                factors.append(parse_group(reg))
+        return Product(factors)
+    elif reg_element[0] == '!':
+        if '~' in reg_element[1:]:
+            propagation_delay, name = reg_element[1:].split('~')
+            return Delayed(name, int(propagation_delay), True)
+        else:
+            return Not(reg_element[1:])
+    elif '=' in reg_element:
+        name, target_state = reg_element.split('=')
+        return Target(name, int(target_state))
+    elif '~' in reg_element:
+        propagation_delay, name = reg_element.split('~')
+        return Delayed(name, int(propagation_delay), False)
+    else:
+        return Regulator(reg_element)
+
+
+def delayed_regulators(rule):
+    """List the (name, delay) of each propagation delay (2~A notation) in a parsed rule"""
+
+    if isinstance(rule, Delayed):
+        return [(rule.name, rule.delay)]
+    delayed = list()
+    if isinstance(rule, (tuple, list)):
+        for field in rule:
+            delayed += delayed_regulators(field)
+    return delayed
+
+
+def regulator_names(rule):
+    """List the names of the regulators read by a parsed rule, without repeats"""
+
+    if isinstance(rule, (Regulator, Not, Highest, Target, Delayed)):
+        return [rule.name]
+    names = list()
+    if isinstance(rule, (tuple, list)):
+        for field in rule:
+            for name in regulator_names(field):
+                if name not in names:
+                    names.append(name)
+    return names
+
+
+def rule_notations(rule):
+    """List the notation types used in a parsed rule (e.g., 'or', 'and', 'not'), in alphabetical order.
+    A rule with a single regulator and no other notation is 'single'
+    """
+
+    notations = set()
+
+    def visit(node):
+        if isinstance(node, RegList):
+            if node.summation:
+                notations.add('sum')
+            elif len(node.items) > 1:
+                notations.add('or')
+        elif isinstance(node, Initializer):
+            notations.add('initializer')
+        elif isinstance(node, NecessaryPair):
+            notations.add('necessary pair')
+        elif isinstance(node, And):
+            notations.add('and')
+        elif isinstance(node, Highest):
+            notations.add('highest')
+            if node.negate:
+                notations.add('not')
+        elif isinstance(node, Product):
+            notations.add('weight')
+        elif isinstance(node, Not):
+            notations.add('not')
+        elif isinstance(node, Target):
+            notations.add('target')
+        elif isinstance(node, Delayed):
+            notations.add('delay')
+            if node.negate:
+                notations.add('not')
+        if isinstance(node, (tuple, list)):
+            for field in node:
+                visit(field)
+
+    visit(rule)
+    return sorted(notations) or ['single']
+
+
+def tabulate_rule(rule, rule_func, state, index, levels, regulated, max_size):
+    """Evaluate a compiled rule for every combination of the levels of its regulators
+
+    Returns a NumPy array of scores indexed by the value indices of the regulators,
+    and the names of the regulators in the order of the array dimensions
+    (an object array if any score is not a float, e.g. the integer scores of target values,
+    so that the table keeps the type of each score),
+    or (None, None) if the rule cannot be stored as a table: rules with
+    propagation delays (which depend on earlier steps and draw random numbers),
+    and tables with more than max_size entries.
+
+    Inputs:
+        rule : expression tree from parse_rule
+        rule_func : compiled rule from compile_rule, reading the values from state
+        state : list of the current value index of every element in the model,
+            which is restored after evaluating the rule
+        index : dictionary mapping element names to their position in state
+        levels : dictionary mapping element names to their number of levels
+        regulated : name of the regulated element (read by initializers)
+        max_size : maximum number of entries in the table
+    """
+
+    if rule is None or delayed_regulators(rule):
+        return None, None
+
+    names = regulator_names(rule)
+    # initializers also read the value of the regulated element
+    if any(isinstance(item, Initializer) for item in rule.items) and regulated not in names:
+        names.append(regulated)
+    if any(name not in index for name in names):
+        # invalid regulators are reported when the rule is compiled
+        return None, None
+
+    shape = tuple([levels[name] for name in names])
+    if int(np.prod(shape)) > max_size:
+        return None, None
+
+    positions = [index[name] for name in names]
+    current = [state[i] for i in positions]
+    table = np.empty(shape, dtype=object)
+    try:
+        for value_indices in np.ndindex(*shape):
+            for i, value_index in zip(positions, value_indices):
+                state[i] = value_index
+            table[value_indices] = rule_func(None, 0)
+    except (ValueError, AssertionError):
+        # combinations of levels that raise an error are left to the compiled rule,
+        # which raises the same error if they occur in a simulation
+        return None, None
+    finally:
+        for i, value_index in zip(positions, current):
+            state[i] = value_index
+
+    if all(type(score) is float for score in table.flat):
+        table = table.astype(float)
+    return table, names
+
+
+def compile_rule_table(table, positions, state):
+    """Compile a table of scores from tabulate_rule into a function of (memo, step),
+    which reads the score at the current value indices of the regulators
+
+    Inputs:
+        table : array of scores, with one dimension for each regulator
+        positions : position in state of the regulator of each dimension
+        state : list of the current value index of every element in the model
+    """
+
+    # read the scores from a flat list, at the position of the regulator values in the table
+    scores = table.ravel().tolist()
+    strides = [stride//table.itemsize for stride in table.strides]
+
+    if len(positions) == 1:
+        i, = positions
+
+        def eval_table_1(memo, step):
+            return scores[state[i]]
+
+        return eval_table_1
+
+    elif len(positions) == 2:
+        i, j = positions
+        stride_i = strides[0]
+
+        def eval_table_2(memo, step):
+            return scores[state[i]*stride_i + state[j]]
+
+        return eval_table_2
+
+    elif len(positions) == 3:
+        i, j, k = positions
+        stride_i, stride_j, _ = strides
+
+        def eval_table_3(memo, step):
+            return scores[state[i]*stride_i + state[j]*stride_j + state[k]]
+
+        return eval_table_3
+
+    offsets = list(zip(positions, strides))
+
+    def eval_table(memo, step):
+        return scores[sum([state[i]*stride for i, stride in offsets])]
+
+    return eval_table
+
+
+def compile_rule(rule, state, index, level_values, regulated, levels, delta, rng):
+    """Compile a parsed rule into a function of (memo, step) returning its score
+
+    Inputs:
+        rule : expression tree from parse_rule (or None for an empty rule)
+        state : list of the current value index of every element in the model,
+            read every time the rule is evaluated
+        index : dictionary mapping element names to their position in state
+        level_values : dictionary mapping element names to their list of level values
+        regulated : name of the regulated element (used by initializers)
+        levels : number of levels of the regulated element
+        delta : delay range used to randomize propagation delays
+        rng : SimulationRandom object used to randomize propagation delays
+    """
+
+    if rule is None:
+        return _empty_rule
+
+    # level of the regulated element, used to scale delayed regulator values
+    N = levels-1
+
+    def position(name):
+        # position of a regulator in the model state
+        if name not in index:
+            raise ValueError('Invalid regulator {} in regulation function for {}'.format(name, regulated))
+        return index[name]
+
+    def compile_group(group):
+        if any(isinstance(item, NecessaryPair) for item in group.items):
+            funcs = compile_items(group.items)
+
+            def eval_group_pairs(memo, step):
+                y_sum, _ = eval_items(funcs, memo, step)
+                return y_sum
+
+            return eval_group_pairs
+
+        item_funcs = [compile_item(item) for item in group.items]
+
+        def eval_group(memo, step):
+            return [item_func(memo, step) for item_func in item_funcs]
+
+        return eval_group
+
+    def compile_items(items):
+        # (initializer, necessary pair, other) function for each item
+        funcs = list()
+        for item in items:
+            if isinstance(item, Initializer):
+                funcs.append((compile_group(item.rule), None, None))
+            elif isinstance(item, NecessaryPair):
+                funcs.append((None, compile_necessary_pair(item), None))
+            else:
+                funcs.append((None, None, compile_item(item)))
+        return funcs
+
+    def eval_items(funcs, memo, step):
+        # evaluate in order, so that random propagation delays are drawn
+        # in the same sequence as the interpreter, note that the scores of
+        # necessary pairs are accumulated across all pairs in the same list
+        y_init = list()
+        y_necessary = list()
+        y_enhance = list()
+        y_sum = list()
+        for init_func, pair_func, item_func in funcs:
+            if init_func is not None:
+                y_init += init_func(memo, step)
+            elif pair_func is not None:
+                y_sum.append(pair_func(memo, step, y_necessary, y_enhance))
+            else:
+                y_sum.append(item_func(memo, step))
+        return y_sum, y_init
+
+    def compile_necessary_pair(item):
+        necessary_func = compile_group(item.necessary)
+        enhance_func = compile_group(item.enhance)
+
+        def eval_necessary_pair(memo, step, y_necessary, y_enhance):
+            y_necessary += necessary_func(memo, step)
+            y_enhance += enhance_func(memo, step)
+            if all([y == 0 for y in y_necessary]):
+                return 0
+            return sorted([0, float(max(min(y_necessary), max(y_enhance))), 1])[1]
+
+        return eval_necessary_pair
+
+    def compile_item(item):
+
+        if isinstance(item, Regulator):
+            i = position(item.name)
+            values = level_values[item.name]
+
+            def eval_regulator(memo, step):
+                return values[state[i]]
+
+            return eval_regulator
+
+        elif isinstance(item, And):
+            group_funcs = [compile_group(group) for group in item.rules]
+
+            def eval_and(memo, step):
+                return min([float(x)
+                        for group_func in group_funcs
+                        for x in group_func(memo, step)])
+
+            return eval_and
+
+        elif isinstance(item, Not):
+            i = position(item.name)
+            values = level_values[item.name]
+
+            def eval_not(memo, step):
+                return discrete_not(values[state[i]], 1)
+
+            return eval_not
+
+        elif isinstance(item, Highest):
+            i = position(item.name)
+            values = level_values[item.name]
+            if item.negate:
+                def eval_highest(memo, step):
+                    return 0 if values[state[i]] == 1 else 1
+            else:
+                def eval_highest(memo, step):
+                    return 1 if values[state[i]] == 1 else 0
+
+            return eval_highest
+
+        elif isinstance(item, Target):
+            i = position(item.name)
+            target = item.target
+
+            def eval_target(memo, step):
+                return 1 if state[i] == target else 0
+
+            return eval_target
+
+        elif isinstance(item, Delayed):
+            name = item.name
+            i = position(item.name)
+            values = level_values[item.name]
+            delay = item.delay
+            negate = item.negate
+
+            def eval_delayed(memo, step):
+                propagation_delay = rng.randint(delay-delta, delay+delta)
+                if propagation_delay < 0:
+                    propagation_delay = 0
+                old_values = memo[name]
+                if propagation_delay < len(old_values) and propagation_delay != 0:
+                    if negate:
+                        effective_value = int(old_values[step-propagation_delay])
+                        return float(discrete_not(float(effective_value/N), 1))
+                    return float(old_values[step-propagation_delay]/N)
+                elif propagation_delay != 0:
+                    if negate:
+                        return float(discrete_not(float(old_values[0]/N), 1))
+                    return float(old_values[0]/N)
+                else:
+                    if negate:
+                        return discrete_not(values[state[i]], 1)
+                    return values[state[i]]
+
+            return eval_delayed
+
+        elif isinstance(item, Product):
+            factors = [
+                    (factor, None) if isinstance(factor, float)
+                    else (None, compile_group(factor))
+                    for factor in item.factors]
+
+            def eval_product(memo, step):
+                multiplied_reg_values = list()
+                for weight, group_func in factors:
+                    if group_func is None:
+                        multiplied_reg_values.append(weight)
+                    else:
+                        multiplied_reg_values.append(float(group_func(memo, step)[0]))
+                return np.prod(np.array(multiplied_reg_values))
+
+            return eval_product
+
+        else:
+            raise ValueError('Invalid regulation function for ' + str(regulated))
+
+    # top level: combine scores by summation or discrete OR,
+    # and check initializers against the value of the regulated element
+    summation = rule.summation
+
+    if all(isinstance(item, (Regulator, And, Not, Highest, Target, Delayed, Product))
+            for item in rule.items):
+        # no initializers or necessary pairs, so all items score independently
+        item_funcs = [compile_item(item) for item in rule.items]
+
+        if summation:
+            def eval_rule(memo, step):
+                return 0 + sum([item_func(memo, step) for item_func in item_funcs])
+        else:
+            def eval_rule(memo, step):
+                return max([item_func(memo, step) for item_func in item_funcs])
+
+        return eval_rule
+
+    funcs = compile_items(rule.items)
+    regulated_index = index[regulated]
+
+    def eval_rule_init(memo, step):
+        y_sum, y_init = eval_items(funcs, memo, step)
+
+        if (state[regulated_index] == 0
+                and len(y_init) != 0
+                and all([y == 0 for y in y_init])):
+            return 0
+        elif summation:
+            return sum(y_init) + sum(y_sum)
+        elif len(y_sum) > 0 and len(y_init) > 0:
+            return max(max(y_init), max(y_sum))
+        elif len(y_sum) == 0:
+            return max(y_init)
+        else:
+            return max(y_sum)
+
+    return eval_rule_init
+
+
+def compile_rule_array(rule, column, level_values, regulated, levels, delta, rng):
+    """Compile a parsed rule into a function of (state, memo, step) returning an array
+    of scores, one for each row of state (a runs x elements array of value indices)
+
+    Uses the same arithmetic as compile_rule, with the discrete OR, AND, and NOT
+    computed element-wise across rows.
+
+    Inputs:
+        rule : expression tree from parse_rule (or None for an empty rule)
+        column : dictionary mapping element names to columns of the state array
+        level_values : list of the level values of the element in each column
+        regulated : name of the regulated element (used by initializers)
+        levels : number of levels of the regulated element
+        delta : delay range used to randomize propagation delays
+        rng : numpy random Generator used to randomize propagation delays
+        memo : object with a get(col, steps) method returning the stored values
+            of a column at the given step for each row (used by propagation delays)
+    """
+
+    if rule is None:
+        return _empty_rule_array
+
+    N = levels-1
+
+    def compile_group(group):
+        if any(isinstance(item, NecessaryPair) for item in group.items):
+            funcs = compile_items(group.items)
+
+            def eval_group_pairs(state, memo, step):
+                y_sum, _ = eval_items(funcs, state, memo, step)
+                return y_sum
+
+            return eval_group_pairs
+
+        item_funcs = [compile_item(item) for item in group.items]
+
+        def eval_group(state, memo, step):
+            return [item_func(state, memo, step) for item_func in item_funcs]
+
+        return eval_group
+
+    def compile_items(items):
+        funcs = list()
+        for item in items:
+            if isinstance(item, Initializer):
+                funcs.append((compile_group(item.rule), None, None))
+            elif isinstance(item, NecessaryPair):
+                funcs.append((None, compile_necessary_pair(item), None))
+            else:
+                funcs.append((None, None, compile_item(item)))
+        return funcs
+
+    def eval_items(funcs, state, memo, step):
+        y_init = list()
+        y_necessary = list()
+        y_enhance = list()
+        y_sum = list()
+        for init_func, pair_func, item_func in funcs:
+            if init_func is not None:
+                y_init += init_func(state, memo, step)
+            elif pair_func is not None:
+                y_sum.append(pair_func(state, memo, step, y_necessary, y_enhance))
+            else:
+                y_sum.append(item_func(state, memo, step))
+        return y_sum, y_init
+
+    def compile_necessary_pair(item):
+        necessary_func = compile_group(item.necessary)
+        enhance_func = compile_group(item.enhance)
+
+        def eval_necessary_pair(state, memo, step, y_necessary, y_enhance):
+            y_necessary += necessary_func(state, memo, step)
+            y_enhance += enhance_func(state, memo, step)
+            necessary_zero = np.logical_and.reduce([y == 0 for y in y_necessary])
+            score = np.clip(np.maximum(
+                    np.minimum.reduce(y_necessary), np.maximum.reduce(y_enhance)), 0, 1)
+            return np.where(necessary_zero, 0.0, score)
+
+        return eval_necessary_pair
+
+    def compile_item(item):
+
+        if isinstance(item, Regulator):
+            col = column[item.name]
+            values = level_values[col]
+
+            def eval_regulator(state, memo, step):
+                return values[state[:, col]]
+
+            return eval_regulator
+
+        elif isinstance(item, And):
+            group_funcs = [compile_group(group) for group in item.rules]
+
+            def eval_and(state, memo, step):
+                return np.minimum.reduce([x
+                        for group_func in group_funcs
+                        for x in group_func(state, memo, step)])
+
+            return eval_and
+
+        elif isinstance(item, Not):
+            col = column[item.name]
+            values = level_values[col]
+
+            def eval_not(state, memo, step):
+                return 1 - values[state[:, col]]
+
+            return eval_not
+
+        elif isinstance(item, Highest):
+            col = column[item.name]
+            values = level_values[col]
+            if item.negate:
+                def eval_highest(state, memo, step):
+                    return (values[state[:, col]] != 1).astype(float)
+            else:
+                def eval_highest(state, memo, step):
+                    return (values[state[:, col]] == 1).astype(float)
+
+            return eval_highest
+
+        elif isinstance(item, Target):
+            col = column[item.name]
+            target = item.target
+
+            def eval_target(state, memo, step):
+                return (state[:, col] == target).astype(float)
+
+            return eval_target
+
+        elif isinstance(item, Delayed):
+            col = column[item.name]
+            values = level_values[col]
+            delay = item.delay
+            negate = item.negate
+
+            def eval_delayed(state, memo, step):
+                propagation_delay = rng.integers(
+                        delay-delta, delay+delta, size=state.shape[0], endpoint=True)
+                propagation_delay[propagation_delay < 0] = 0
+                delayed = propagation_delay != 0
+                # use the stored value propagation_delay steps ago,
+                # or the initial value if the simulation has not run that long yet
+                old_step = np.where(delayed & (propagation_delay < step), step-propagation_delay, 0)
+                old_values = memo.get(col, old_step)
+                if negate:
+                    old_values = np.where(old_step > 0, np.trunc(old_values), old_values)
+                    return np.where(delayed, 1 - old_values/N, 1 - values[state[:, col]])
+                return np.where(delayed, old_values/N, values[state[:, col]])
+
+            return eval_delayed
+
+        elif isinstance(item, Product):
+            factors = [
+                    (factor, None) if isinstance(factor, float)
+                    else (None, compile_group(factor))
+                    for factor in item.factors]
+
+            def eval_product(state, memo, step):
+                product = np.ones(state.shape[0])
+                for weight, group_func in factors:
+                    if group_func is None:
+                        product = product*weight
+                    else:
+                        product = product*group_func(state, memo, step)[0]
+                return product
+
+            return eval_product
+
+        else:
+            raise ValueError('Invalid regulation function for ' + str(regulated))
+
+    summation = rule.summation
+    funcs = compile_items(rule.items)
+    regulated_col = column[regulated]
+
+    def eval_rule(state, memo, step):
+        y_sum, y_init = eval_items(funcs, state, memo, step)
+
+        if summation:
+            score = sum(y_init) + sum(y_sum)
+        else:
+            score = np.maximum.reduce(y_init + y_sum)
+
+        if len(y_init) > 0:
+            # regulated element is 0 and all initializers are 0
+            init_zero = np.logical_and.reduce([y == 0 for y in y_init])
+            score = np.where(init_zero & (state[:, regulated_col] == 0), 0.0, score)
+
+        return np.broadcast_to(score, state.shape[:1]).astype(float)
+
+    return eval_rule
+
+
+def _empty_rule(memo, step):
+    """Score of an empty regulation function"""
+    return None
+
+
+def _empty_rule_array(state, memo, step):
+    """Scores of an empty regulation function"""
+    return None
+
+
+def discrete_not(x, N):
+    """Compute NOT using n's complement"""
+
+    assert N >= x, 'Can\'t compute NOT, input ({}) is greater than maximum value ({})'.format(x,N)
+
+    return (N - x)
+
+
+def split_comma_outside_parentheses(sentence):
+    """Parse comma-separated strings in a regulation function,
+    preserving groups of elements in parentheses or brackets (AND, necessary pair, initializers).
+    """
+
+    final_list = list()
+    parentheses = 0
+    start = 0
+    for index, char in enumerate(sentence):
+        if index == len(sentence)-1:
+            final_list.append(sentence[start:index+1])
+        elif char == '(' or char == '{' or char == '[':
+            parentheses += 1
+        elif char == ')' or char == '}' or char == ']':
+            parentheses -= 1
+        elif (char == ',' and parentheses == 0):
+            final_list.append(sentence[start:index])
+            start = index+1
+
+    return final_list
@@ -1,14 +1,35 @@
 import re
+import math
 import random
 import ast
+import os
+import time
+import copy
+import shutil
+import tempfile
 import logging
-import pandas as pd
 import numpy as np
-from collections import deque
+from dish.rules import parse_rule, compile_rule, delayed_regulators, regulator_names
+from dish.rules import tabulate_rule, compile_rule_table, rule_notations
+from dish.rng import SimulationRandom, WeightedChoice, run_seed
+from dish.cycles import CycleDetector, TransitionCache
+from dish.history import StepHistory, ScoreWindow
+from dish.profiling import SimulationProfile, timed
+from dish.progress import PROGRESS_INTERVAL, SimulationProgress, ProgressCounts
+from dish.cache import ModelCache
+from dish.traces import write_run, write_run_table, write_summary
+from dish.traces import binary_header, write_run_binary, write_summary_binary
+from dish.traces import read_summary, check_summary, copy_runs
 
 # define regex for regulator update functions
 _VALID_CHARS = r'a-zA-Z0-9\_'
 
+# numbers in text cells of CSV/TSV model files
+_NUMBER = re.compile(r'[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?')
+
+# number of steps buffered before adding them to the summaries in streaming simulations
+STREAM_CHUNK_STEPS = 1024
+
 ####################################################################
 ############ 			Simulator object  		 		############
 ####################################################################
@@ -19,13 +40,51 @@ class Simulator(object):
 	Any element-specific model characteristics are properties of the Element objects
 	"""
 
-	def __init__(self, model_file):
+	def __init__(self, model_file, ruleTableSize=0, modelCache=None):
 		"""Initialize the model object using model information from the input file
 
 		Inputs:
-			model_file : an excel spreadsheet containing required columns: Variable, Positive, Negative, Initial
+			model_file : an excel spreadsheet containing required columns: Variable, Positive, Negative, Initial,
+				with truth tables in the other sheets, or a CSV (.csv) or TSV (.tsv, .tab) file with the same columns,
+				or the model table as a pandas DataFrame (or a dictionary of DataFrames, 
+				the model table first and then truth tables, as from pd.read_excel(model_file, sheet_name=None))
+			ruleTableSize : maximum number of entries in the lookup table of a regulation function
+				(0 to not use lookup tables). The activation and inhibition scores of rules with few regulators
+				are calculated for every combination of regulator levels when the model is loaded,
+				and read from the tables during simulations. Rules with propagation delays are not tabulated
+			modelCache : cache.ModelCache object that stores the parsed model on disk, 
+				to load it from there instead of reading the model file when the same file is loaded again,
+				True to use a ModelCache in the default location, or None to always read the model file
 		"""
 
+		if modelCache is True:
+			modelCache = ModelCache()
+
+		parsed = None
+		if not isinstance(model_file, (str, os.PathLike)):
+			# only model files can be cached
+			modelCache = None
+		if modelCache is not None:
+			cache_key = modelCache.key(model_file)
+			parsed = modelCache.load(cache_key)
+
+		if parsed is not None:
+			self.__dict__.update(parsed)
+			self.randomize_parsed_initial()
+		else:
+			self.parse_model_file(model_file)
+			if modelCache is not None:
+				modelCache.store(cache_key, self.__dict__)
+
+		self.init_state(ruleTableSize)
+
+	def parse_model_file(self, model_file):
+		""" Read the elements, regulation functions, initial values, toggles, 
+			and simulation parameters from the model file
+		"""
+		# pandas is only needed to read model files, not to load models from the cache
+		import pandas as pd
+
 		global _VALID_CHARS
 
 		# Model defaults 
@@ -70,10 +129,10 @@ class Simulator(object):
 		# Higher value means it should be updated more often
 		# Used in RA simulation only
 		self.__rateUpdate = dict()
-		# List of element names to use for rate update, 
-		# where the number of times the name appears in this list 
-		# is proportional to the update rate
-		self.__rateUpdateList = [] 
+		# Weighted selection of element names for rate update, 
+		# where the probability of selecting an element 
+		# is proportional to the update rate (None if not using update rate)
+		self.__rateSelector = None
 		# If this remains 0 we are not using update rate, 
 		# if > 0 we are using update rate
 		self.__totalPriority = 0
@@ -85,11 +144,9 @@ class Simulator(object):
 		# Store element probabilities for ra multi
 		self.__probUpdate = dict()
 
-		# Load the input file containing elements and regulators
-		model_sheets = pd.ExcelFile(model_file)
-
-		# get the model from the first sheet, will check the other sheets for truth tables later
-		df_model = model_sheets.parse(0, na_values='NaN', keep_default_na=False, index_col=None)
+		# Load the input file containing elements and regulators,
+		# will check the other sheets for truth tables later
+		df_model, df_other_sheets = self.read_model_file(model_file)
 
 		# check model format
 		if 'element attributes' in [x.lower() for x in df_model.columns]:
@@ -97,17 +154,6 @@ class Simulator(object):
 					columns=df_model.iloc[1]
 					).drop([0,1]).set_index('#')
 
-		# get other sheets, will parse truth tables later
-		if len(model_sheets.sheet_names) > 1:
-			df_other_sheets = {
-					sheet : model_sheets.parse(
-							sheet,na_values='NaN',keep_default_na=False
-							) 
-					for sheet in model_sheets.sheet_names[1:]
-					}
-		else:
-			df_other_sheets = ''
-			
 		# required columns
 		input_col_X = [
 				x.strip() for x in df_model.columns 
@@ -211,6 +257,16 @@ class Simulator(object):
 		if input_col_data != '':
 			self.__exp_data_list = [{} for i in range(len(input_col_data))]
 				
+		# read each column used below into a list once, 
+		# instead of looking up each cell with df_model.loc
+		used_columns = input_col_X[:1] + input_col_A[:1] + input_col_I[:1] + input_col_initial + input_col_data
+		for input_col in [input_col_maxstate, input_col_increment, input_col_delays, input_col_spont, 
+				input_col_balance, input_col_update_group, input_col_update_rate, input_col_update_rank, 
+				input_col_update_prob, input_col_in_out, input_col_in_out_value, input_col_obj_weight, 
+				input_col_tau_noise, input_col_delta]:
+			used_columns += input_col[:1]
+		columns = {col : df_model[col].tolist() for col in used_columns}
+
 		# Initialize lists for storing special initial values 
 		# for each scenario (randomizing, knockout)
 		for scenario,init_col in enumerate(input_col_initial):
@@ -218,16 +274,16 @@ class Simulator(object):
 				self.__knockout[scenario] = []
 
 		# Parse each row of the input model file
-		for curr_row in df_model.index:
+		for row in range(len(df_model)):
 			# Each row in the spreadsheet corresponds to one element
 
 			# Get names of the element (X), activators (A), and inhibitors (I)
-			X = df_model.loc[curr_row, input_col_X[0]].strip()
+			X = columns[input_col_X[0]][row].strip()
 			if set('~!#$%^&*()-\ []\{\}+=\'\"\|/?<>,.:;').intersection(X):
 				raise ValueError('Invalid characters in variable name: {}'
                         '\n\tUse only letters, numbers, and underscores'.format(X))
-			A = df_model.loc[curr_row, input_col_A[0]].strip()
-			I = df_model.loc[curr_row, input_col_I[0]].strip()
+			A = columns[input_col_A[0]][row].strip()
+			I = columns[input_col_I[0]][row].strip()
 
 			# Check for duplicate variables
 			if X in self.__getElement:
@@ -236,12 +292,14 @@ class Simulator(object):
 			# Get the number of levels for this element
 			levels = DEF_LEVELS
 			if len(input_col_maxstate) > 0:
-				if df_model.loc[curr_row, input_col_maxstate[0]] is not '':
-					levels = int(df_model.loc[curr_row, input_col_maxstate[0]])
+				if columns[input_col_maxstate[0]][row] != '':
+					levels = int(columns[input_col_maxstate[0]][row])
 					
 			# Add this element to the list of elements that will be updated if it has regulators
+			updated = False
 			if A != '' or I != '':
 				self.__updateList += [X]
+				updated = True
 			else:
 				# Look for truth tables in other sheets
 				if df_other_sheets != '':
@@ -249,24 +307,25 @@ class Simulator(object):
 						if X in sheet.keys():
 							A = self.parse_truth_table(sheet,levels)	
 							self.__updateList += [X]
+							updated = True
 			
 			# Get the increment function for this element
 			increment = DEF_INCREMENT
 			if len(input_col_increment) > 0:
-				if df_model.loc[curr_row, input_col_increment[0]] is not '':
-					increment = float(df_model.loc[curr_row, input_col_increment[0]])
+				if columns[input_col_increment[0]][row] != '':
+					increment = float(columns[input_col_increment[0]][row])
 
 			# Get the length of the allowed noise for random delays
 			noise = DEF_TAU_NOISE
 			if len(input_col_tau_noise) > 0:  # Check for the delay noise column
-				if df_model.loc[curr_row, input_col_tau_noise[0]] is not '':
-					noise = int(df_model.loc[curr_row, input_col_tau_noise[0]])
+				if columns[input_col_tau_noise[0]][row] != '':
+					noise = int(columns[input_col_tau_noise[0]][row])
 			
 			# Get delta for the random-delay sync update scheme
 			delta = DEF_DELAY_DELTA
 			if len(input_col_delta) > 0:  # Check for the delay noise column
-				if df_model.loc[curr_row, input_col_delta[0]] is not '':
-					delta = int(df_model.loc[curr_row, input_col_delta[0]])
+				if columns[input_col_delta[0]][row] != '':
+					delta = int(columns[input_col_delta[0]][row])
 
 			# Values for steady state optimization analysis
 			opt_input = False
@@ -275,23 +334,23 @@ class Simulator(object):
 			opt_output_value = ''
 			opt_obj_weight = ''
 			if len(input_col_in_out) > 0:  
-				if df_model.loc[curr_row, input_col_in_out[0]] is not '':
-					if df_model.loc[curr_row, input_col_in_out[0]] in ['I', 'i', 'Input', 'input']:
+				if columns[input_col_in_out[0]][row] != '':
+					if columns[input_col_in_out[0]][row] in ['I', 'i', 'Input', 'input']:
 						opt_input = True
-					elif df_model.loc[curr_row, input_col_in_out[0]] in ['O', 'o', 'Output', 'output']:
+					elif columns[input_col_in_out[0]][row] in ['O', 'o', 'Output', 'output']:
 						opt_output = True
 
 			if len(input_col_in_out_value) > 0: 
-				if df_model.loc[curr_row, input_col_in_out_value[0]] is not '':
-					fixed_value = df_model.loc[curr_row, input_col_in_out_value[0]]
+				if columns[input_col_in_out_value[0]][row] != '':
+					fixed_value = columns[input_col_in_out_value[0]][row]
 					if opt_input:
 						opt_input_value = fixed_value
 					elif opt_output:
 						opt_output_value = fixed_value
 			
 			if len(input_col_obj_weight) > 0:  
-				if df_model.loc[curr_row, input_col_obj_weight[0]] is not '':
-					opt_obj_weight = df_model.loc[curr_row, input_col_obj_weight[0]]
+				if columns[input_col_obj_weight[0]][row] != '':
+					opt_obj_weight = columns[input_col_obj_weight[0]][row]
 
 			# Get initial value for this element and any toggling
 			self.__switchValue[X] = dict()
@@ -299,7 +358,7 @@ class Simulator(object):
 			self.__initial[X] = dict()
 
 			for scenario, init_col in enumerate(input_col_initial):
-				initial_value_input = str(df_model.loc[curr_row, init_col])
+				initial_value_input = str(columns[init_col][row])
 
 				initial_value_split = initial_value_input.split(',')
 				if len(initial_value_split) > 1:
@@ -332,7 +391,7 @@ class Simulator(object):
 				elif str(initial_value_input).lower().strip() in ['x']:
 					self.__knockout[scenario] += [X]
 					init_val = 0
-				elif initial_value_input is not '':
+				elif initial_value_input != '':
 					init_val = int(initial_value_input)
 				else:
 					raise ValueError(
@@ -349,7 +408,7 @@ class Simulator(object):
 			# Get element experimental or historical data
 			if input_col_data != '':
 				for scenario, data_col in enumerate(input_col_data):
-					scenario_data = str(df_model.loc[curr_row, data_col])
+					scenario_data = str(columns[data_col][row])
 					if scenario_data != '':
 						scenario_data_split = scenario_data.split('-')
 						# Converting string to list
@@ -363,9 +422,9 @@ class Simulator(object):
 
 			delays = [0 for x in range(2*(levels-1))]
 			if len(input_col_delays) > 0:
-				if df_model.loc[curr_row, input_col_delays[0]] is not '':
+				if columns[input_col_delays[0]][row] != '':
 					delays = [int(x.strip()) for x in str(
-						df_model.loc[curr_row, input_col_delays[0]]).split(',')]
+						columns[input_col_delays[0]][row]).split(',')]
 			# check that the number of delays matches the number of states
 			if len(delays) != 2*(levels-1):
 				if len(delays) == 1:
@@ -387,10 +446,10 @@ class Simulator(object):
 			# Get balancing behavior
 			balancing = DEF_BALANCING
 			if len(input_col_balance) > 0:
-				if df_model.loc[curr_row,input_col_balance[0]] is not '':
+				if columns[input_col_balance[0]][row] != '':
 					balancing_input = [
 							x.strip() for x in str(
-									df_model.loc[curr_row,input_col_balance[0]]
+									columns[input_col_balance[0]][row]
 									).split(',')
 							]
 					if (len(balancing_input) == 2 
@@ -409,46 +468,50 @@ class Simulator(object):
 			# Get spontaneous activation/inhibition behavior and delays
 			spont_delay = DEF_SPONT
 			if len(input_col_spont) > 0:
-				if df_model.loc[curr_row, input_col_spont[0]] is not '':
-					if df_model.loc[curr_row, input_col_spont[0]] not in ['-', 'none', 'None']:
-						spont_delay = int(df_model.loc[curr_row, input_col_spont[0]])
+				if columns[input_col_spont[0]][row] != '':
+					if columns[input_col_spont[0]][row] not in ['-', 'none', 'None']:
+						spont_delay = int(columns[input_col_spont[0]][row])
 					else:
 						# spontaneous input is None, set as blank to indicate no spontaneous behavior
 						# distinguishing this case from the default value DEF_SPONT, which is spontaneous behavior with 0 delay
 						spont_delay = ''
 
 			# only get update group, rate, rank, prob if this element has regulators
-			if X in self.__updateList:
+			if updated:
 
 				# Set this element's update group for simulations
 				if len(input_col_update_group) > 0:
-					if df_model.loc[curr_row, input_col_update_group[0]] is not '':
-						group = df_model.loc[curr_row, input_col_update_group[0]]
+					if columns[input_col_update_group[0]][row] != '':
+						group = columns[input_col_update_group[0]][row]
 						self.__groupUpdate[X] = group
 						if group not in self.__groups:
 							self.__groups += [group]
 
 				# Set this element's update rate for simulations
 				if len(input_col_update_rate) > 0:
-					if df_model.loc[curr_row, input_col_update_rate[0]] is not '':
-						rate = df_model.loc[curr_row, input_col_update_rate[0]]
+					if columns[input_col_update_rate[0]][row] != '':
+						rate = columns[input_col_update_rate[0]][row]
 					else:
 						# Default rate
 						rate = 1
 
-					self.__rateUpdate[X] = rate
+					# Rates can be fractional, but must be non-negative numbers
+					try:
+						rate = float(rate)
+					except (TypeError, ValueError):
+						raise ValueError('Invalid update rate for element {}: {}'.format(X, rate))
+					if not rate >= 0 or rate == float('inf'):
+						raise ValueError('Invalid update rate for element {}: {}'.format(X, rate))
 
-					# Include instances of element X in the array 
-					# proportional to update rate
-					self.__rateUpdateList += [X]*rate
+					self.__rateUpdate[X] = rate
 
 					# Increase total priority by the rate
 					self.__totalPriority += rate
 
 				# Set this element's update rank for round-based simulations
 				if len(input_col_update_rank) > 0:
-					if df_model.loc[curr_row, input_col_update_rank[0]] is not '':
-						rank = df_model.loc[curr_row, input_col_update_rank[0]]
+					if columns[input_col_update_rank[0]][row] != '':
+						rank = columns[input_col_update_rank[0]][row]
 					else:
 						rank = DEF_UPDATE_RANK
 					# If this rank already exists in our dictionary, just append the current element into this ranking
@@ -461,9 +524,9 @@ class Simulator(object):
 				# Set this element's update probability for random asynchronous multi-step simulations
 				prob = DEF_UPDATE_PROBABILITY
 				if len(input_col_update_prob) > 0:
-					if df_model.loc[curr_row, input_col_update_prob[0]] is not '':
-						prob = df_model.loc[curr_row, input_col_update_prob[0]]
-					self.__probUpdate[X] = prob
+					if columns[input_col_update_prob[0]][row] != '':
+						prob = columns[input_col_update_prob[0]][row]
+				self.__probUpdate[X] = prob
 
 			# Create an element/node object for this element
 			ele = Element(
@@ -478,9 +541,6 @@ class Simulator(object):
 			# Include this element in the model's dictionary of elements
 			self.__getElement[X] = ele
 
-			# Go to the next row in the input file
-			curr_row += 1
-
 		# check that all regulators are in the model's element list
 		# NOTE: 'for name in self.__getElement' iterates over the keys 
 		# faster than calling __getElement.keys()
@@ -497,6 +557,119 @@ class Simulator(object):
 								'No Variable Name for element {}'.format(reg)
 								)
 
+	def read_model_file(self, model_file):
+		""" Read the model table and the truth tables from a model file or DataFrames (see __init__).
+			Returns the model table, and a dictionary of truth tables by sheet name ('' if there are none).
+			Empty cells are read as '', and numbers in CSV/TSV files and DataFrames are converted
+			as for Excel files (int for whole numbers)
+		"""
+		import pandas as pd
+
+		if isinstance(model_file, pd.DataFrame):
+			sheets = {0 : model_file}
+		elif isinstance(model_file, dict):
+			sheets = model_file
+		elif str(model_file).lower().endswith(('.csv', '.tsv', '.tab')):
+			separator = ',' if str(model_file).lower().endswith('.csv') else '\t'
+			sheets = {0 : pd.read_csv(model_file, sep=separator, dtype=str, 
+					na_values='NaN', keep_default_na=False, index_col=None)}
+		else:
+			model_sheets = pd.ExcelFile(model_file)
+			# get the model from the first sheet and truth tables from the other sheets
+			df_model = model_sheets.parse(0, na_values='NaN', keep_default_na=False, index_col=None)
+			df_other_sheets = {
+					sheet : model_sheets.parse(
+							sheet,na_values='NaN',keep_default_na=False
+							) 
+					for sheet in model_sheets.sheet_names[1:]
+					}
+			return df_model, df_other_sheets if df_other_sheets else ''
+
+		# convert the cells of each table column to the values read from Excel files
+		tables = {
+				sheet : table.astype(object).apply(lambda column: column.map(_excel_cell))
+				for sheet, table in sheets.items()
+				}
+		df_model = tables.pop(list(tables)[0])
+		return df_model, tables if tables else ''
+
+	def randomize_parsed_initial(self):
+		""" Draw the random initial values of a model loaded from the cache, 
+			in the same order as parse_model_file, so that the random module gives the same values
+			(and later random numbers) as reading the model file
+		"""
+		random_elements = {scenario : set(names) for scenario, names in self.__randomInitial.items()}
+		for key, element in self.__getElement.items():
+			for scenario in self.__randomInitial:
+				if key in random_elements[scenario]:
+					self.__initial[key][scenario] = random.randrange(element.get_levels())
+			element.set_value_index(self.__initial[key][0])
+
+	def init_state(self, ruleTableSize=0):
+		""" Set up the model state and the simulation data of the parsed model (see __init__ for the inputs)
+		"""
+
+		# Select elements with probability proportional to update rate,
+		# in constant time for any rate values
+		if self.__totalPriority > 0:
+			self.__rateSelector = WeightedChoice(
+					list(self.__rateUpdate.keys()), list(self.__rateUpdate.values()))
+
+		# Store the current value index of every element in one list,
+		# elements read their own and their regulators' values directly from this list
+		# using the integer positions in __index, instead of querying each Element object
+		self.__index = {name : i for i, name in enumerate(self.__getElement)}
+		self.__state = [element.get_value_index() for element in self.__getElement.values()]
+		# the level values only depend on the number of levels, so elements share the same lists
+		levels_values = {levels : np.linspace(0, 1, levels).tolist() 
+				for levels in set([element.get_levels() for element in self.__getElement.values()])}
+		level_values = {
+				name : levels_values[element.get_levels()]
+				for name, element in self.__getElement.items()
+				}
+
+		# random number source shared by the simulation schemes and the elements,
+		# seeded from the random module unless a seed is given to run_simulation
+		self.__rng = SimulationRandom(random.getrandbits(128))
+		# seed of the runs of the current simulation, each run is seeded with run_seed(seed, run)
+		self.__runSeed = self.__rng.draw_seed()
+
+		# cycles found in the runs of the last simulation, by run index
+		self.__attractors = dict()
+
+		# cache of state transitions for the last simulation (None if not used)
+		self.__transitionCache = None
+
+		# profile of the last simulation (None if it was not profiled)
+		self.__profile = None
+
+		# progress of the current simulation (None if it is not reported)
+		self.__progress = None
+
+		for element in self.__getElement.values():
+			element.bind_state(self.__state, self.__index, level_values, self.__rng)
+
+		# updated elements that read the value of each element (by position in the model state),
+		# so that sync steps only evaluate the elements with changed regulators
+		self.__dependents = [list() for _ in self.__state]
+		for name in self.__updateList:
+			for reg in self.__getElement[name].get_regulator_names():
+				self.__dependents[self.__index[reg]].append(name)
+		# the updated element at each position in the model state (None if it is not updated)
+		self.__updateOrder = {name : i for i, name in enumerate(self.__updateList)}
+		self.__updatedAt = [name if name in self.__updateOrder else None for name in self.__getElement]
+		# elements with delays, which depend on earlier steps and are evaluated in every sync step
+		self.__alwaysUpdate = [name for name in self.__updateList if self.__getElement[name].has_delays()]
+		# element value indices before and after the last sync step (None before the first sync step)
+		self.__syncBefore = None
+		self.__syncAfter = None
+
+		if int(ruleTableSize) != ruleTableSize or ruleTableSize < 0:
+			raise ValueError('Rule table size must be a non-negative integer: {}'.format(ruleTableSize))
+		if ruleTableSize > 0:
+			for element in self.__getElement.values():
+				element.tabulate_rules(ruleTableSize)
+
 	## Simulator get/set functions
 
 	def get_elements(self):
@@ -508,14 +681,90 @@ class Simulator(object):
 	def get_exp_data(self):
 		return self.__exp_data_list
 
+	def get_update_list(self):
+		return self.__updateList
+
+	def get_group_update(self):
+		return self.__groupUpdate
+
+	def get_rate_update(self):
+		return self.__rateUpdate
+
+	def get_rate_selector(self):
+		return self.__rateSelector
+
+	def get_rng(self):
+		return self.__rng
+
+	def get_attractors(self):
+		""" Return the cycles (attractors) found in the sync runs of the last simulation,
+			a dictionary of lists of cycles by run index, each a dictionary with
+				step : step at which the cycle was found
+				period : number of steps after which the element values repeat (1 for a fixed point)
+				states : list of the element value indices at each step of the cycle
+		"""
+		return self.__attractors
+
+	def get_profile(self):
+		""" Return the profile of the last simulation (a SimulationProfile object with the time 
+			of each phase and the evaluations of each element), or None if it was not profiled
+		"""
+		return self.__profile
+
+	def get_progress(self):
+		""" Return the progress of the current simulation (a SimulationProgress object),
+			or None if it is not reported
+		"""
+		return self.__progress
+
+	def __getstate__(self):
+		""" The timed methods of a profiled simulation are not copied (e.g., to worker processes),
+			and copies get an empty profile to profile their simulations.
+			Copies also get a progress without the progress function, which may not be picklable
+		"""
+		attributes = self.__dict__.copy()
+		for method, _ in SimulationProfile.METHODS:
+			attributes.pop(method, None)
+		if self.__profile is not None:
+			attributes['_Simulator__profile'] = SimulationProfile(
+					self.__profile.get_simtype(), self.__profile.get_runs(), self.__profile.get_steps())
+		if self.__progress is not None:
+			attributes['_Simulator__progress'] = SimulationProgress(None, 
+					self.__progress.get_simtype(), self.__progress.get_runs(), self.__progress.get_steps(), 
+					self.__progress.get_interval())
+		return attributes
+
+	def get_transition_cache(self):
+		""" Return the transition cache of the last simulation (a TransitionCache object 
+			with the hit and miss counts), or None if it was not used
+		"""
+		return self.__transitionCache
+
+	def get_state(self):
+		return self.__state
+
+	def get_index(self):
+		return self.__index
+
+	def get_random_initial(self):
+		return self.__randomInitial
+
+	def get_switch_step(self):
+		return self.__switchStep
+
+	def get_switch_value(self):
+		return self.__switchValue
+
 	def set_initial(self, scenario=0):
 		""" Set the current value of each element (node) in the model
-			to its initial value
+			to its initial value, and clear the next values calculated in previous runs
+			(which sync_multi and ra_multi keep for elements that are not updated in a step)
 		"""
 		for key, element in self.__getElement.items():
 			val = self.__initial[key].get(scenario)
 			if val is not None:
 				element.set_value_index(val)
+				element.set_next_value_index(0)
 			else:
 				raise ValueError('Scenario {} does not exist in model '
                     '(note scenario is zero-indexed, 0 is the first scenario)'.format(scenario))
@@ -528,7 +777,7 @@ class Simulator(object):
 		# this function is needed so you can run multiple simulations
 		# with random initial values using the same Simulator object
 		for name in self.__randomInitial[scenario]:
-		    init_val_index = random.randrange(self.__getElement[name].get_levels())
+		    init_val_index = self.__rng.randrange(self.__getElement[name].get_levels())
 		    self.__getElement[name].set_value_index(init_val_index)
 
 	def knockout(self, scenario=0):
@@ -548,7 +797,16 @@ class Simulator(object):
                     outMode=1,
                     normalize=False,
                     randomizeEachRun=False,
-					eventTraces=None
+					eventTraces=None,
+					workers=1,
+					seed=None,
+					streaming=False,
+					chunkSteps=None,
+					extend=False,
+					cacheSize=0,
+					profile=False,
+					progress=None,
+					progressInterval=PROGRESS_INTERVAL
                     ):
 		""" Run a simulation!
 			Inputs
@@ -565,11 +823,45 @@ class Simulator(object):
 				simStep : number of simulation steps
 				outName : name of output file
 				scenario : index of initial value column (zero-indexed)
-				outMode : specify output mode (1: all runs and summary, 2: transpose format, 3: summary only)
+				outMode : specify output mode (1: all runs and summary, 2: transpose format, 3: summary only,
+					4: all runs and summary in a binary file that can be read with traces.BinaryTraces)
 				normalize : whether to output values normalized to the range [0,1]
 				randomizeEachRun : for ra and ra_multi specify whether or not to randomize initial values at beginning of each new run
 				eventTraces: name of the event traces file for the fixed_updates scheme
+				workers : number of worker processes to split the runs across 
+					(the results are the same as with one worker, except that models with delay counters 
+					in this scheme, see Element.has_delay_counters, are simulated in one process, 
+					because their delay counters carry over from one run to the next)
+				seed : seed for the random numbers of this simulation, for reproducible results
+					(each run uses its own random number stream derived from the seed and the run index;
+					by default, the seed is drawn from the random numbers of the previous simulation;
+					element delay state also carries over from previous simulations of this model)
+				streaming : for output mode 3, accumulate the summaries in NumPy arrays and only keep
+					the recent element values needed for propagation delays, instead of all values of each run
+				chunkSteps : in streaming mode, store the summaries in temporary files on disk 
+					and add the values of each run to them every chunkSteps steps, 
+					so that memory does not grow with the number of steps
+				extend : add runs to the existing output file outName (output mode 1, 3, or 4) 
+					instead of overwriting it: the summaries of the existing runs are read from the file
+					and added to the summaries of the new runs, which are numbered after the existing runs
+					(the scenario, number of steps and normalize option must match the existing simulation;
+					the new runs have different run indices, so their random numbers differ from the existing runs 
+					simulated with the same seed)
+				cacheSize : number of state transitions (element values before and after a step) kept 
+					in a least-recently-used cache, to skip evaluating the elements when the same values 
+					come up again, in this or other runs (0 to not use the cache). 
+					Only used when the transitions are deterministic, see transitions_deterministic
+				profile : count and time the phases of the simulation and the evaluations of each element, 
+					returned by get_profile as a SimulationProfile (this slows down the simulation, 
+					simulations without profile run the same code as before)
+				progress : function called with the progress of the simulation (a dictionary of the runs and steps 
+					completed, steps per second, and estimated seconds remaining, see SimulationProgress.report)
+					every progressInterval seconds while it runs, and when it is done.
+					Errors raised by the function stop the simulation (e.g., to cancel it)
+				progressInterval : seconds between progress reports
 		"""
+		start = time.perf_counter() if profile else None
+
 		# # Timing code below, to separate simulation time from parsing
 		# import time
 		# starttime = time.time()
@@ -578,6 +870,54 @@ class Simulator(object):
 			raise ValueError(
 				'Invalid simulation scheme, must be ra, round, sync, ra_multi, sync_multi, rand_sync, rand_sync_guess or fixed_updates')
 
+		if int(workers) != workers or workers < 1:
+			raise ValueError('Number of workers must be a positive integer: {}'.format(workers))
+
+		if streaming and outMode != 3:
+			raise ValueError('Streaming simulation is only supported for output mode 3 (summary only)')
+
+		if chunkSteps is not None and (int(chunkSteps) != chunkSteps or chunkSteps < 1):
+			raise ValueError('Number of chunk steps must be a positive integer: {}'.format(chunkSteps))
+
+		if int(cacheSize) != cacheSize or cacheSize < 0:
+			raise ValueError('Transition cache size must be a non-negative integer: {}'.format(cacheSize))
+
+		if progressInterval < 0:
+			raise ValueError('Progress interval must not be negative: {}'.format(progressInterval))
+
+		# number of levels written to the output for each element
+		out_levels = {key : 2 if normalize else element.get_levels() 
+				for key, element in self.__getElement.items()}
+
+		previous = None
+		previousRuns = 0
+		if extend:
+			if simtype == 'fixed_updates' or outMode not in [1, 3, 4]:
+				raise ValueError('Extending a simulation is only supported for output modes 1, 3, and 4, '
+						'and not for the fixed_updates scheme')
+			previous = read_summary(outName)
+			if previous['binary'] != (outMode == 4) or previous['binary'] and previous['normalize'] != normalize:
+				raise ValueError('Output mode and normalize option must match the existing simulation: {}'.format(outName))
+			check_summary(previous, list(self.__getElement.keys()), out_levels, simStep+1, outName)
+			previousRuns = previous['runs']
+
+		# each run reseeds the random numbers with run_seed(seed, run), 
+		# so that the runs do not depend on how they are split across workers
+		if seed is None:
+			seed = self.__rng.draw_seed()
+		self.__runSeed = seed
+
+		self.__attractors = dict()
+
+		self.__transitionCache = None
+		if cacheSize > 0:
+			if self.transitions_deterministic(simtype):
+				self.__transitionCache = TransitionCache(cacheSize, 
+						[element.get_levels() for element in self.__getElement.values()])
+			else:
+				logging.info('Transition cache is not used: the {} transitions of this model are not deterministic'.format(simtype))
+
+		updates = None
 		if simtype == 'fixed_updates':
 			# Get event traces from file input to set element update order,
 			# number of steps and runs
@@ -605,270 +945,908 @@ class Simulator(object):
 			# increment the value read from the file to get the total number of runs
 			runs+=1	
 
-		with open(outName, 'w') as output_file:
+		if extend:
+			# write to a new file next to the existing one, which replaces it when the simulation is done
+			fd, writeName = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(outName)))
+			os.close(fd)
+		else:
+			writeName = outName
+
+		self.__profile = None
+		if profile:
+			self.__profile = SimulationProfile(simtype, runs, simStep)
+			self.__profile.attach(self)
+
+		if progress is not None:
+			self.__progress = SimulationProgress(progress, simtype, runs, simStep, progressInterval)
+		simulation_progress = self.__progress
+
+		try:
+			self.write_simulation(writeName, simtype, runs, simStep, scenario, outMode, normalize, 
+					randomizeEachRun, updates, workers, streaming, chunkSteps, out_levels, previous)
+		except BaseException:
+			if extend:
+				os.remove(writeName)
+			raise
+		finally:
+			if profile:
+				self.__profile.detach(self)
+			self.__progress = None
+			# later simulations without a seed continue from the stream of this seed
+			self.__rng.seed(seed)
+
+		if extend:
+			shutil.copymode(outName, writeName)
+			os.replace(writeName, outName)
+
+		if profile:
+			self.__profile.add_time('total', time.perf_counter() - start)
+
+		if simulation_progress is not None:
+			# the output is complete
+			simulation_progress.finish()
+
+	def write_simulation(self,
+					outName,
+					simtype,
+					runs,
+					simStep,
+					scenario,
+					outMode,
+					normalize,
+					randomizeEachRun,
+					updates,
+					workers,
+					streaming,
+					chunkSteps,
+					out_levels,
+					previous=None
+					):
+		""" Simulate the runs and write the output file for run_simulation
+			Inputs are the same as run_simulation, and
+				out_levels : number of levels written to the output for each element
+				previous : summary of existing runs to extend (from traces.read_summary)
+		"""
+
+		previousRuns = previous['runs'] if previous is not None else 0
+		totalRuns = previousRuns + runs
+
+		with open(outName, 'wb' if outMode == 4 else 'w') as output_file:
+
+			if outMode == 4:
+				header, info = binary_header(list(self.__getElement.keys()), 
+						{key : element.get_levels() for key, element in self.__getElement.items()}, 
+						totalRuns, simStep+1, normalize)
+				output_file.write(header)
+
+			if previous is not None and outMode != 3:
+				# keep the values of the existing runs
+				copy_runs(previous['path'], output_file)
+
+			if workers > 1 and runs > 1 and self.delay_counter_elements(simtype):
+				logging.warning('The runs are simulated in one process, because the delay counters of this model '
+						'carry over from one run to the next')
+				workers = 1
+
+			if workers > 1 and runs > 1:
+				freq_sum, square_sum = self.run_workers(workers, output_file, 
+						simtype, runs, simStep, scenario, outMode, normalize, randomizeEachRun, updates,
+						streaming, chunkSteps, previousRuns)
+			else:
+				freq_sum, square_sum = self.simulate_runs(range(previousRuns, totalRuns), output_file, 
+						simtype, runs, simStep, scenario, outMode, normalize, randomizeEachRun, updates,
+						streaming, chunkSteps)
+
+			if previous is not None:
+				# add the sums of the existing runs
+				for key in self.__getElement:
+					freq_sum[key] = previous['frequency'][key] + np.asarray(freq_sum[key])
+					square_sum[key] = previous['squares'][key] + np.asarray(square_sum[key])
+
+			if outMode == 4:
+				write_summary_binary(output_file, info, freq_sum, square_sum)
+			elif outMode != 2 and outMode != 7 and (simtype != 'sync' or simtype != 'sync_multi' or simtype != 'rand_sync' or simtype != 'rand_sync_gauss'):
+				# Write total number of runs with output mode 3, to be used for plotting
+				write_summary(output_file, self.__getElement, out_levels, freq_sum, square_sum,
+						last_run=totalRuns-1 if outMode == 3 else None)
+
+	def run_scenarios(self,
+					simtype,
+					runs,
+					simStep,
+					scenarios,
+					outNames,
+					outMode=1,
+					normalize=False,
+					randomizeEachRun=False,
+					workers=None,
+					seed=None,
+					progress=None,
+					progressInterval=PROGRESS_INTERVAL
+					):
+		""" Simulate multiple scenarios concurrently, writing one output file per scenario.
+			Each scenario is simulated on its own copy of the model, so that scenarios
+			do not affect each other through the element values or delay state.
+			Inputs are the same as run_simulation, and
+				scenarios : list of scenario indices
+				outNames : list of output file names, one for each scenario
+				workers : number of worker processes (default: the number of scenarios, 
+					limited to the number of CPUs), use 1 to simulate the scenarios in sequence
+				seed : seed for the random numbers, each scenario uses an independent stream derived from it
+				progress : function called with the progress of all scenarios, as in run_simulation
+					(with the runs of all scenarios)
+		"""
+
+		if len(scenarios) != len(outNames):
+			raise ValueError('Number of output files ({}) must match the number of scenarios ({})'.format(
+					len(outNames), len(scenarios)))
+
+		if workers is None:
+			workers = min(len(scenarios), os.cpu_count() or 1)
+
+		if int(workers) != workers or workers < 1:
+			raise ValueError('Number of workers must be a positive integer: {}'.format(workers))
+
+		# independent random number streams for each scenario
+		if seed is not None:
+			self.__rng.seed(seed)
+		seeds = self.__rng.spawn(len(scenarios))
+
+		args = [(simtype, runs, simStep, outName, scenario) 
+				for scenario, outName in zip(scenarios, outNames)]
+		kwargs = [{'outMode' : outMode, 'normalize' : normalize, 'randomizeEachRun' : randomizeEachRun, 
+				'seed' : scenario_seed} for scenario_seed in seeds]
+
+		scenarios_progress = None
+		if progress is not None:
+			scenarios_progress = SimulationProgress(progress, simtype, runs*len(scenarios), simStep, progressInterval)
+			for scenario_kwargs in kwargs:
+				scenario_kwargs['progressInterval'] = progressInterval
+
+		if workers > 1 and len(scenarios) > 1:
+			# imported here to keep the import of the simulator fast
+			from concurrent.futures import ProcessPoolExecutor, wait
+			# the workers report the progress of each scenario in shared memory
+			counts = ProgressCounts(len(scenarios)) if progress is not None else None
+			with ProcessPoolExecutor(max_workers=workers, 
+					initializer=_init_progress_worker, initargs=(counts,)) as executor:
+				futures = [executor.submit(_run_scenario_worker, self, scenario_args, scenario_kwargs, 
+						slot if progress is not None else None) 
+						for slot, (scenario_args, scenario_kwargs) in enumerate(zip(args, kwargs))]
+				if progress is not None:
+					while wait(futures, timeout=progressInterval).not_done:
+						scenarios_progress.update(*counts.total())
+				# raise any error from the workers
+				for future in futures:
+					future.result()
+		else:
+			# same random number streams as the workers, so results do not depend on the number of workers
+			for index, (scenario_args, scenario_kwargs) in enumerate(zip(args, kwargs)):
+				if progress is not None:
+					scenario_kwargs['progress'] = _scenario_progress(scenarios_progress, index*runs, index*runs*simStep)
+				_run_scenario_worker(copy.deepcopy(self), scenario_args, scenario_kwargs)
+
+		if progress is not None:
+			scenarios_progress.finish()
+
+	def simulate_runs(self,
+					run_list,
+					output_file,
+					simtype,
+					runs,
+					simStep,
+					scenario=0,
+					outMode=1,
+					normalize=False,
+					randomizeEachRun=False,
+					updates=None,
+					streaming=False,
+					chunkSteps=None
+					):
+		""" Perform the simulation runs with indices in run_list, writing the output of each run.
+			Each run draws its random numbers from its own stream, seeded with run_seed(seed, run) 
+			for the seed of the simulation.
+			Returns the frequency and square sums of element values at each step across these runs,
+			with initial and toggled values counted for the total number of runs.
+			Inputs are the same as run_simulation, and 
+				run_list : indices of the runs to simulate
+				output_file : open file (or other text stream) for the output of each run
+				updates : updated element names for each run and step, for the fixed_updates scheme
+			In streaming mode, the frequency and square sums of each element are rows of NumPy arrays.
+		"""
+
+		if streaming:
+			return self.stream_runs(run_list, simtype, runs, simStep, scenario, 
+					normalize, randomizeEachRun, chunkSteps)
+
+		# Set elements to initial values
+		self.set_initial(scenario)
+
+		# freq_sum will keep a running sum of the value of each element
+		# across runs (frequency)
+		# square_sum will keep a running sum of the value squares (to get
+		# variance later)
+		# write initial values to the output
+		freq_sum = dict()
+		square_sum = dict()
+		# store element names for event_traces file
+		updated_element = simStep * [0]
+		for key, element in self.__getElement.items():
+			freq_sum[key] = (simStep+1) * [0]
+			square_sum[key] = (simStep+1) * [0]
+			if normalize:
+				ele_value = element.get_value()
+				freq_sum[key][0] = ele_value * runs
+				square_sum[key][0] = ele_value*ele_value * runs
+			else:
+				ele_val_index = element.get_value_index()
+				freq_sum[key][0] = ele_val_index * runs
+				square_sum[key][0] = ele_val_index*ele_val_index * runs
+
+		# number of levels written to the output for each element
+		out_levels = {key : 2 if normalize else element.get_levels() 
+				for key, element in self.__getElement.items()}
+
+		info = None
+		if outMode == 4:
+			# description of the binary trace file
+			header, info = binary_header(list(self.__getElement.keys()), 
+					{key : element.get_levels() for key, element in self.__getElement.items()}, 
+					runs, simStep+1, normalize)
+
+		# read element values directly from the model state when storing each step
+		state = self.__state
+		element_positions = [(key, self.__index[key], element) 
+				for key, element in self.__getElement.items()]
+
+		# toggles of this scenario at each step, in the order of the elements
+		step_toggles = dict()
+		for key, element in self.__getElement.items():
+			for index, switch_step in enumerate(self.__switchStep[key].get(scenario, [])):
+				step_toggles.setdefault(switch_step, []).append(
+						(key, element, self.__switchValue[key][scenario][index]))
+
+		if simtype == 'round':
+			# Store the number elements needed to be updated each round
+			totalNumElements = len(self.__updateList)
+
+		# find cycles of sync runs, to skip the steps that repeat earlier steps
+		cycle_steps = self.cycle_steps(simtype)
+		cycles = CycleDetector(self, cycle_steps) if cycle_steps is not None else None
+		toggle_steps = set(step_toggles)
+
+		# step of the next progress check (after the last step without progress reports)
+		progress = self.__progress
+		next_check = simStep+1
+
+		# Perform the simulation runs in run_list
+		for run in run_list:
+			self.__rng.seed(run_seed(self.__runSeed, run))
 
 			# Set elements to initial values
 			self.set_initial(scenario)
 
-			# freq_sum will keep a running sum of the value of each element
-			# across runs (frequency)
-			# square_sum will keep a running sum of the value squares (to get
-			# variance later)
-			# write initial values to the output
-			freq_sum = dict()
-			square_sum = dict()
-			# store element names for event_traces file
-			updated_element = simStep * [0]
+			if simtype == 'sync' or simtype == 'sync_multi' or simtype == 'rand_sync' or simtype == 'rand_sync_guass' or randomizeEachRun == True:
+				self.set_random_initial(scenario)
+
+			# 'memo' will store each element's values for each step/round
+			memo = dict()
+
+			# write initial value to the output
 			for key, element in self.__getElement.items():
-				freq_sum[key] = (simStep+1) * [0]
-				square_sum[key] = (simStep+1) * [0]
 				if normalize:
-					ele_value = element.get_value()
-					freq_sum[key][0] = ele_value * runs
-					square_sum[key][0] = ele_value*ele_value * runs
+					memo[key] = [element.get_value()]
 				else:
-					ele_val_index = element.get_value_index()
-					freq_sum[key][0] = ele_val_index * runs
-					square_sum[key][0] = ele_val_index*ele_val_index * runs
+					memo[key] = [element.get_value_index()]
 
-			if simtype == 'round':
-				# Store the number elements needed to be updated each round
-				totalNumElements = len(self.__updateList)
+			# last step filled in from a cycle
+			skip_until = 0
+			if cycles is not None:
+				cycles.reset()
 
-			# Perform 'runs' number of simulation runs
-			for run in range(runs):
-				# Set elements to initial values
-				self.set_initial(scenario)
+			if progress is not None:
+				next_check = progress.check(0)
 
-				if simtype == 'sync' or simtype == 'sync_multi' or simtype == 'rand_sync' or simtype == 'rand_sync_guass' or randomizeEachRun == True:
-					self.set_random_initial(scenario)
+			# Perform 'simStep' number of simulation steps (or rounds)
+			for step in range(1, simStep+1):
+				if step <= skip_until:
+					continue
 
-				# 'memo' will store each element's values for each step/round
-				memo = dict()
+				# Update elements according to the simulation scheme
+				name = self.update_step(simtype, memo, step, run, updates)
+				if name is not None:
+					# Store element name for event_traces file
+					updated_element[step-1] = name
+
+				# Store element values for this step
+				for key, i, element in element_positions:
 
-				# write initial value to the output
-				for key, element in self.__getElement.items():
 					if normalize:
-						memo[key] = [element.get_value()]
+						ele_value = element.get_value()
 					else:
-						memo[key] = [element.get_value_index()]
-
-				# Perform 'simStep' number of simulation steps (or rounds)
-				for step in range(1, simStep+1):
-					# Update elements according to the simulation scheme
-					if simtype == 'fixed_updates':
-						element = updates[run][step-1]
-						name = self.fixed_updates(memo, step, element)
-						#  update the element to its next state value.
-						self.__getElement[name].set_value_index(
-							self.__getElement[name].get_next_value_index())
-
-						# Store element name for event_traces file
-						updated_element[step-1] = name
-
-					if simtype == 'ra':
-						# randomly choose an element or element group to update, by calculating it's next state value
-						name = self.ra_update(memo, step)
-						if name in self.__groupUpdate:
-							# calculate the next state value for all other elements in this group
-							for key in self.__groupUpdate:
-								if self.__groupUpdate[name] == self.__groupUpdate[key]:
-									# Have to first calculate next state values of all elements
-									self.update_next(key)
-							for key in self.__groupUpdate:
-								if self.__groupUpdate[name] == self.__groupUpdate[key]:
-									# Now update the variables with next state values.
-									self.__getElement[key].set_value_index(
-										self.__getElement[key].get_next_value_index())
-						# Finally update the originally generated random element to its next state value.
-						self.__getElement[name].set_value_index(
-							self.__getElement[name].get_next_value_index())
-						
-						# Store element name for event_traces file
-						updated_element[step-1] = name
-
-					elif simtype == 'sync' or simtype ==  'rand_sync' or simtype == 'rand_sync_gauss':
-						# simultaneously update all elements either with random delays or not
-						self.sync_update(memo, step, simtype)
-					
+						ele_value = state[i]
+					memo[key] += [ele_value]
+					freq_sum[key][step] += ele_value
+					square_sum[key][step] += ele_value*ele_value
+
+				# Check for element value toggles
+				if step in step_toggles:
+					self.toggle(step_toggles[step], step, memo, freq_sum, square_sum, runs, normalize)
+
+				if cycles is not None:
+					period = cycles.check(step, step in toggle_steps)
+					if period is not None:
+						# in a cycle, fill in the values of the following steps without simulating them
+						self.record_attractor(run, step, period, cycles.cycle_values(period))
+						skip_until = self.skip_cycle(scenario, step, simStep, period)
+						cycles.reset()
+						for key in self.__getElement:
+							cycle = memo[key][step-period+1:step+1]
+							memo[key] += (skip_until-step)//period * cycle
+							freq_sum[key][step+1:skip_until+1] = [x + cycle[j % period] 
+									for j, x in enumerate(freq_sum[key][step+1:skip_until+1])]
+							square_sum[key][step+1:skip_until+1] = [x + cycle[j % period]*cycle[j % period] 
+									for j, x in enumerate(square_sum[key][step+1:skip_until+1])]
+
+				if step >= next_check:
+					next_check = progress.check(step)
+
+			# Write values from this run to the output file
+			self.write_run_output(output_file, run, outMode, simStep, out_levels, memo, info, updated_element)
+
+			if progress is not None:
+				progress.finish_run()
+
+		return freq_sum, square_sum
+
+	def toggle(self, toggles, step, memo, freq_sum, square_sum, runs, normalize=False):
+		""" Set the toggled elements to their toggle values after step, 
+			replacing their stored values at this step in memo and the summaries (for all runs)
+			toggles : list of (name, element, toggle value index)
+		"""
+		for key, element, toggle_val in toggles:
+			# set element value to the toggle value
+			element.set_value_index(toggle_val)
+
+			if normalize:
+				ele_value = element.get_value()
+				memo[key][step] = ele_value
+				freq_sum[key][step] = ele_value * runs
+				square_sum[key][step] = ele_value*ele_value * runs
+			else:
+				ele_val_index = element.get_value_index()
+				memo[key][step] = ele_val_index
+				freq_sum[key][step] = ele_val_index * runs
+				square_sum[key][step] = ele_val_index*ele_val_index * runs
+
+	def write_run_output(self, output_file, run, outMode, simStep, out_levels, memo, info=None, updated_element=None):
+		""" Write the element values of a run to the output file, in the format of the output mode
+			(info is the binary trace file description for output mode 4, 
+			and updated_element the updated element names of each step for output mode 7)
+		"""
+		if outMode == 1:
+			write_run(output_file, run, self.__getElement, out_levels, memo)
+
+		elif outMode == 2:
+			# transpose format (used by sensitivity analysis and model checking)
+			write_run_table(output_file, run, self.__getElement, memo, simStep)
+
+		elif outMode == 4:
+			write_run_binary(output_file, info, memo)
+
+		# write to the event_traces file
+		elif outMode == 7:
+			output_file.write('Run #'+str(run)+'\n')
+			output_file.write(' '.join(updated_element)+'\n')
+
+	def stream_runs(self,
+					run_list,
+					simtype,
+					runs,
+					simStep,
+					scenario=0,
+					normalize=False,
+					randomizeEachRun=False,
+					chunkSteps=None
+					):
+		""" Perform the simulation runs with indices in run_list for summary-only output, 
+			without keeping all element values of each run.
+			Values of each step are buffered in a NumPy array and added to the summary arrays 
+			every chunkSteps steps (or STREAM_CHUNK_STEPS if chunkSteps is None), 
+			and memo only keeps the recent values of elements used in propagation delays.
+			If chunkSteps is given, the summary arrays are stored in temporary files on disk.
+			Returns dictionaries of the frequency and square sums of each element (rows of NumPy arrays)
+		"""
 
-					elif simtype == 'ra_multi':
-						# Randomly select an element in the model. Decide whether or not to update it based on probability.
-						# If the element is to be updated, also update the other elements in its group.
-						if bool(self.__groupUpdate):
-							# Randomly generate an element and see if it passed the probability check.
-							element, passed = self.prob_update_ra()
-							if element in self.__groupUpdate:
-								# compute next state values for all other elements in this group
-								for key in self.__groupUpdate:
-									if (self.__groupUpdate[element] == self.__groupUpdate[key]):
-										# only compute next state value if the first element in the group's probability check passed
-										if passed:
-											self.update_next(key)
-										else:
-											# Next state value should be the element's current state value
-											self.__getElement[key].__next_val_index = self.__getElement[key].get_value_index()
-								for key in self.__groupUpdate:
-									if (self.__groupUpdate[element] == self.__groupUpdate[key]):
-										# Update the current values with the computed next state values
-										self.__getElement[key].set_value_index(
-											self.__getElement[key].get_next_value_index())
+		# Set elements to initial values
+		self.set_initial(scenario)
+
+		names = list(self.__getElement.keys())
+		elements = list(self.__getElement.values())
+		num_elements = len(names)
+		state = self.__state
+
+		# summary arrays, with a row for each element and a column for each step
+		dtype = float if normalize else np.int64
+		if chunkSteps is not None:
+			freq_array = np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode='w+', 
+					shape=(num_elements, simStep+1))
+			square_array = np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode='w+', 
+					shape=(num_elements, simStep+1))
+		else:
+			freq_array = np.zeros((num_elements, simStep+1), dtype=dtype)
+			square_array = np.zeros((num_elements, simStep+1), dtype=dtype)
+
+		# the initial values are counted for all runs, as in simulate_runs
+		if normalize:
+			initial = np.array([element.get_value() for element in elements], dtype=float)
+		else:
+			initial = np.array(state, dtype=np.int64)
+		freq_array[:, 0] = initial*runs
+		square_array[:, 0] = initial*initial*runs
+
+		# value index of each element at each step of the current chunk
+		buffer = np.zeros((min(chunkSteps or STREAM_CHUNK_STEPS, simStep), num_elements), dtype=np.int64)
+		if normalize:
+			# level values of each element by value index, to normalize the buffer
+			max_levels = max(element.get_levels() for element in elements)
+			value_table = np.zeros((num_elements, max_levels))
+			for i, element in enumerate(elements):
+				value_table[i, :element.get_levels()] = [
+						element.get_value_from_index(index) for index in range(element.get_levels())]
+			columns = np.arange(num_elements)
+
+		# elements used in propagation delays, and the number of recent steps to keep for each
+		history_lengths = self.propagation_history_lengths()
+		memo_positions = [(key, self.__index[key], self.__getElement[key]) for key in history_lengths]
+
+		# toggles of this scenario at each step, in the same order as simulate_runs applies them
+		step_toggles = dict()
+		for key in self.__switchStep:
+			for index, switch_step in enumerate(self.__switchStep[key].get(scenario, [])):
+				step_toggles.setdefault(switch_step, []).append(
+						(key, self.__index[key], self.__getElement[key], self.__switchValue[key][scenario][index]))
+
+		# find cycles of sync runs, to skip the steps that repeat earlier steps
+		cycle_steps = self.cycle_steps(simtype)
+		cycles = CycleDetector(self, cycle_steps) if cycle_steps is not None else None
+
+		# step of the next progress check (after the last step without progress reports)
+		progress = self.__progress
+		next_check = simStep+1
+
+		for run in run_list:
+			self.__rng.seed(run_seed(self.__runSeed, run))
+
+			# Set elements to initial values
+			self.set_initial(scenario)
+
+			if simtype == 'sync' or simtype == 'sync_multi' or simtype == 'rand_sync' or simtype == 'rand_sync_guass' or randomizeEachRun == True:
+				self.set_random_initial(scenario)
+
+			memo = dict()
+			for key, i, element in memo_positions:
+				memo[key] = StepHistory(element.get_value() if normalize else state[i], history_lengths[key])
+
+			# last step filled in from a cycle
+			skip_until = 0
+			if cycles is not None:
+				cycles.reset()
+
+			if progress is not None:
+				next_check = progress.check(0)
+
+			chunk_start = 1
+			for step in range(1, simStep+1):
+				if step <= skip_until:
+					continue
+
+				self.update_step(simtype, memo, step, run)
+
+				# Store element values for this step
+				buffer[step-chunk_start] = state
+				for key, i, element in memo_positions:
+					memo[key].append(element.get_value() if normalize else state[i])
+
+				# Check for element value toggles
+				if step in step_toggles:
+					self.stream_toggle(step_toggles[step], step, memo, normalize)
+
+				# in a cycle, skip the following steps
+				if cycles is not None:
+					period = cycles.check(step, step in step_toggles)
+					if period is not None:
+						cycle = np.array(cycles.cycle_values(period), dtype=np.int64)
+						self.record_attractor(run, step, period, cycles.cycle_values(period))
+						skip_until = self.skip_cycle(scenario, step, simStep, period)
+						cycles.reset()
+
+				# add the values of this chunk of steps to the summaries
+				if step-chunk_start+1 == len(buffer) or step == simStep or skip_until > step:
+					values = buffer[:step-chunk_start+1]
+					if normalize:
+						values = value_table[columns, values]
+					freq_array[:, chunk_start:step+1] += values.T
+					square_array[:, chunk_start:step+1] += (values*values).T
+					chunk_start = step+1
+
+				if skip_until > step:
+					# add the values of the cycle for the skipped steps, 
+					# each step of the cycle repeats every period steps
+					for key, i, element in memo_positions:
+						memo[key] += (skip_until-step)//period * [
+								element.get_value_from_index(index) if normalize else index for index in cycle[:, i].tolist()]
+					if normalize:
+						cycle = value_table[columns, cycle]
+					for j in range(period):
+						freq_array[:, step+1+j:skip_until+1:period] += cycle[j][:, None]
+						square_array[:, step+1+j:skip_until+1:period] += (cycle[j]*cycle[j])[:, None]
+					chunk_start = skip_until+1
+
+				if step >= next_check:
+					next_check = progress.check(step)
+
+			if progress is not None:
+				progress.finish_run()
+
+		# toggled values are counted for all runs, as in simulate_runs
+		for step in sorted(step_toggles):
+			if 0 < step <= simStep:
+				for key, i, element, toggle_val in step_toggles[step]:
+					value = element.get_value_from_index(toggle_val) if normalize else toggle_val
+					freq_array[i, step] = value*runs
+					square_array[i, step] = value*value*runs
+
+		freq_sum = {key : freq_array[i] for i, key in enumerate(names)}
+		square_sum = {key : square_array[i] for i, key in enumerate(names)}
+		return freq_sum, square_sum
+
+	def stream_toggle(self, toggles, step, memo, normalize=False):
+		""" Set the toggled elements to their toggle values after step in streaming simulations,
+			replacing their recent values in memo
+			toggles : list of (name, state position, element, toggle value index)
+		"""
+		for key, i, element, toggle_val in toggles:
+			element.set_value_index(toggle_val)
+			if key in memo:
+				memo[key][step] = element.get_value() if normalize else self.__state[i]
+
+	def propagation_history_lengths(self):
+		""" Find the elements used with propagation delays in regulation functions or truth tables,
+			and the number of recent steps of their values needed to evaluate the delays
+			(including the random delay range of rand_sync)
+		"""
+		lengths = dict()
+		for element in self.__getElement.values():
+			delayed = list()
+			if type(element.get_act()) is str:
+				for name, delay in delayed_regulators(element.get_act_rule()) + delayed_regulators(element.get_inh_rule()):
+					delayed.append((name, delay + element.get_delta()))
+			else:
+				prop_delays, reg_delays = element.get_table_delays()
+				for name, delay in zip(element.get_name_list(), prop_delays):
+					if int(delay) > 0:
+						delayed.append((name, int(delay)))
+			for name, delay in delayed:
+				lengths[name] = max(lengths.get(name, 1), delay+1)
+		return lengths
+
+	def cycle_steps(self, simtype):
+		""" Number of recent steps of element values that determine the next state 
+			(together with the delay state of the elements), or None if cycles are not detected 
+			for this simulation scheme.
+			Only sync runs are deterministic. Propagation delays in regulation functions draw 
+			a random number at each evaluation, so these models are also excluded, 
+			to keep the random numbers (and the results of later runs) the same as without skipping steps.
+		"""
+		if simtype != 'sync':
+			return None
+		steps = 1
+		for name in self.__updateList:
+			element = self.__getElement[name]
+			if type(element.get_act()) is str:
+				if delayed_regulators(element.get_act_rule()) + delayed_regulators(element.get_inh_rule()):
+					return None
+			else:
+				prop_delays, reg_delays = element.get_table_delays()
+				steps = max([steps] + [int(delay) for delay in prop_delays])
+		return steps
+
+	def transitions_deterministic(self, simtype):
+		""" Check whether the element values after each step only depend on the values before the step,
+			so that state transitions can be cached: 
+			sync updates, or round updates with at most one element of each rank (which are not shuffled),
+			of models without any delays (delay counters and regulation scores are not part of the cached state,
+			and propagation delays also draw random numbers)
+		"""
+		if simtype == 'round':
+			if any(len(names) > 1 for names in self.__rankUpdate.values()):
+				return False
+		elif simtype != 'sync':
+			return False
+		return len(self.__alwaysUpdate) == 0
+
+	def delay_counter_elements(self, simtype=''):
+		""" Return the names of the updated elements with delay counters in simtype simulations 
+			(see Element.has_delay_counters), which carry over from one run to the next, 
+			so that each run depends on the previous runs
+		"""
+		return [name for name in self.__updateList if self.__getElement[name].has_delay_counters(simtype)]
+
+	def cached_transition(self, step):
+		""" Set the element values after step from the transition cache.
+			Returns None if the values were in the cache, otherwise the key to store 
+			the values after the step with TransitionCache.store once they are calculated
+		"""
+		cache = self.__transitionCache
+		key = cache.pack(self.__state)
+		successor = cache.get(key)
+		if successor is not None:
+			self.__state[:] = successor
+			return None
+		# the elements were not evaluated in cached steps, 
+		# as if they had not changed since the previous step (without delays)
+		for name in self.__updateList:
+			self.__getElement[name].set_last_update_step(step-1)
+		return key
+
+	def delay_state(self):
+		""" Return the delay counters and recent regulation scores of the updated elements
+		"""
+		return [self.__getElement[name].get_delay_state() for name in self.__updateList]
+
+	def skip_cycle(self, scenario, step, simStep, period):
+		""" In a cycle with period steps found after step, skip as many whole cycles as fit
+			before the next toggle (or the end of the run), and return the last skipped step.
+			The elements are not evaluated during these steps, and after whole cycles 
+			their delay state is the same as at step.
+		"""
+		toggle_steps = [switch_step for key in self.__switchStep 
+				for switch_step in self.__switchStep[key].get(scenario, []) if switch_step > step]
+		last = min(toggle_steps + [simStep+1]) - 1
+		end = step + (last-step)//period*period
+		for name in self.__updateList:
+			# so that the next update does not hold the regulation scores for the skipped steps
+			self.__getElement[name].set_last_update_step(end)
+		return end
+
+	def record_attractor(self, run, step, period, cycle):
+		""" Store a cycle found in a run, with the element value indices at each step of the cycle.
+			The delay counters may take longer to repeat than the element values (e.g., at a fixed point
+			with delays), so the reported period is the shortest period of the element values.
+		"""
+		value_period = min([length for length in range(1, period+1) if period % length == 0 
+				and all([cycle[j] == cycle[j % length] for j in range(period)])])
+		names = sorted(self.__index, key=self.__index.get)
+		self.__attractors.setdefault(run, []).append({
+				'step' : step,
+				'period' : value_period,
+				'states' : [{name : int(value) for name, value in zip(names, values)} 
+						for values in cycle[:value_period]],
+				})
+		logging.info('Run {} is in a cycle with period {} at step {}'.format(run, value_period, step))
+
+	def update_step(self, simtype, memo=dict(), step=0, run=0, updates=None):
+		""" Update elements for one simulation step (or round) according to the simulation scheme.
+			Returns the name of the updated element for the ra and fixed_updates schemes 
+			(written to the event traces file), or None for other schemes
+		"""
+		# the element chosen for update, for the event traces file
+		name = None
+
+		# Update elements according to the simulation scheme
+		if simtype == 'fixed_updates':
+			element = updates[run][step-1]
+			name = self.fixed_updates(memo, step, element)
+			#  update the element to its next state value.
+			self.__getElement[name].set_value_index(
+				self.__getElement[name].get_next_value_index())
+
+		if simtype == 'ra':
+			# randomly choose an element or element group to update, by calculating it's next state value
+			name = self.ra_update(memo, step)
+			if name in self.__groupUpdate:
+				# calculate the next state value for all other elements in this group
+				for key in self.__groupUpdate:
+					if self.__groupUpdate[name] == self.__groupUpdate[key]:
+						# Have to first calculate next state values of all elements
+						self.update_next(key)
+				for key in self.__groupUpdate:
+					if self.__groupUpdate[name] == self.__groupUpdate[key]:
+						# Now update the variables with next state values.
+						self.__getElement[key].set_value_index(
+							self.__getElement[key].get_next_value_index())
+			# Finally update the originally generated random element to its next state value.
+			self.__getElement[name].set_value_index(
+				self.__getElement[name].get_next_value_index())
+
+		elif simtype == 'sync' or simtype ==  'rand_sync' or simtype == 'rand_sync_gauss':
+			# simultaneously update all elements either with random delays or not
+			self.sync_update(memo, step, simtype)
+		
+
+		elif simtype == 'ra_multi':
+			# Randomly select an element in the model. Decide whether or not to update it based on probability.
+			# If the element is to be updated, also update the other elements in its group.
+			if bool(self.__groupUpdate):
+				# Randomly generate an element and see if it passed the probability check.
+				element, passed = self.prob_update_ra()
+				if element in self.__groupUpdate:
+					# compute next state values for all other elements in this group
+					for key in self.__groupUpdate:
+						if (self.__groupUpdate[element] == self.__groupUpdate[key]):
+							# only compute next state value if the first element in the group's probability check passed
+							if passed:
+								self.update_next(key)
 							else:
-								# If this particular element did not belong to any update groups, just update it alone with its computed next state value
-								self.__getElement[element].set_value_index(
-									self.__getElement[element].get_next_value_index())
-						# The case if we are not using update groups at all
-						else:
-							element, passed = self.prob_update_ra()
-							self.__getElement[element].set_value_index(
-								self.__getElement[element].get_next_value_index())
-
-					elif simtype == 'sync_multi':
-						# Run through each element in the model. Decide whether or not to update the rule based on probability
-						# If a set of rules belongs to a group, make the decision to update them only one time (they either all get updated or stay the same)
-						# The probability for the elements belonging to a group is the same as the first element in the group.
-						# First check if we are using groups (check if groupUpdate dictionary is populated)
-						if bool(self.__groupUpdate):
-							# Use a list to keep track of elements that have already been updated, in order to avoid redundancy
-							alreadyUpdated = []
-							for element in self.__updateList:
-								# If this element's update group has already been computed, ignore it
-								if element not in alreadyUpdated:
-									passed = self.prob_update(element)
-									alreadyUpdated += [element]
-									if element in self.__groupUpdate:
-										# compute next state values for all other elements in this group
-										for key in self.__groupUpdate:
-											if (self.__groupUpdate[element] == self.__groupUpdate[key]):
-												# only compute next state value if the first element in the group's probability check passed
-												if passed:
-													self.update_next(key)
-												else:
-													# Next state value should be the element's current state value
-													self.__getElement[key].__next_val_index = self.__getElement[key].get_value_index()
-												# All elements in group are added to update list regardless of whether the check passed, to avoid recheck
-												alreadyUpdated += [key]
-							for element in self.__updateList:
-								# Now update all elements based on next state values
-								self.__getElement[element].set_value_index(
-									self.__getElement[element].get_next_value_index())
-
-						# The case if we are not using update groups
-						else:
-							for element in self.__updateList:
-								# Compute all next state values for each element
-								passed = self.prob_update(element)
-							for element in self.__updateList:
-								# Now update all elements based on next state values
-								self.__getElement[element].set_value_index(
-									self.__getElement[element].get_next_value_index())
-
-					elif simtype == 'round':
-						# Update all elements in the model once each round. If doing rank update simulation, update based on rank.
-						# Elements can be updated as soon as their next value is calculated. Each individual element in the list
-						# must be updated before a particular element can be updated again
-
-						# Obtain the ranks in order of smallest to largest.
-						# By default, the rankUpdate list will just contain 0 and all elements will have the same rank
-						rankList = sorted(self.__rankUpdate.keys())
-						# Place the highest rank first as that is what you want to run first
-						rankList.reverse()
-						# For each possible rank
-						for rank in rankList:
-							# Retrieve array of everything in a particular rank
-							currentRankList = self.__rankUpdate[rank]
-							# Create a list from 0 to num elements in rank - 1
-							n = len(currentRankList)
-							randomList = [i for i in range(n)]
-							# Shuffle the list and use it to index and update each element of this rank in random order
-							random.shuffle(randomList)
-							for j in randomList:
-								element = currentRankList[j]
-								self.__getElement[element].update(self.__getElement, memo, step)
-
-					# Store element values for this step
-					for key, element in self.__getElement.items():
-
-						if normalize:
-							ele_value = element.get_value()
-						else:
-							ele_value = element.get_value_index()
-						memo[key] += [ele_value]
-						freq_sum[key][step] += ele_value
-						square_sum[key][step] += ele_value*ele_value
-
-						# Check for element value toggles
-						if key in self.__switchStep:
-							for index, switch_step in enumerate(self.__switchStep[key][scenario]):
-								if switch_step == step:
-									# set element value to the toggle value
-									toggle_val = self.__switchValue[key][scenario][index]
-									element.set_value_index(toggle_val)
-
-									if normalize:
-										ele_value = element.get_value()
-										memo[key][step] = ele_value
-										freq_sum[key][step] = ele_value * runs
-										square_sum[key][step] = ele_value*ele_value * runs
+								# Next state value should be the element's current state value
+								self.__getElement[key].__next_val_index = self.__getElement[key].get_value_index()
+					for key in self.__groupUpdate:
+						if (self.__groupUpdate[element] == self.__groupUpdate[key]):
+							# Update the current values with the computed next state values
+							self.__getElement[key].set_value_index(
+								self.__getElement[key].get_next_value_index())
+				else:
+					# If this particular element did not belong to any update groups, just update it alone with its computed next state value
+					self.__getElement[element].set_value_index(
+						self.__getElement[element].get_next_value_index())
+			# The case if we are not using update groups at all
+			else:
+				element, passed = self.prob_update_ra()
+				self.__getElement[element].set_value_index(
+					self.__getElement[element].get_next_value_index())
+
+		elif simtype == 'sync_multi':
+			# Run through each element in the model. Decide whether or not to update the rule based on probability
+			# If a set of rules belongs to a group, make the decision to update them only one time (they either all get updated or stay the same)
+			# The probability for the elements belonging to a group is the same as the first element in the group.
+			# First check if we are using groups (check if groupUpdate dictionary is populated)
+			if bool(self.__groupUpdate):
+				# Use a list to keep track of elements that have already been updated, in order to avoid redundancy
+				alreadyUpdated = []
+				for element in self.__updateList:
+					# If this element's update group has already been computed, ignore it
+					if element not in alreadyUpdated:
+						passed = self.prob_update(element)
+						alreadyUpdated += [element]
+						if element in self.__groupUpdate:
+							# compute next state values for all other elements in this group
+							for key in self.__groupUpdate:
+								if (self.__groupUpdate[element] == self.__groupUpdate[key]):
+									# only compute next state value if the first element in the group's probability check passed
+									if passed:
+										self.update_next(key)
 									else:
-										ele_val_index = element.get_value_index()
-										memo[key][step] = ele_val_index
-										freq_sum[key][step] = ele_val_index * runs
-										square_sum[key][step] = ele_val_index*ele_val_index * runs
-
-				# Write values from this run to the output file
-				if outMode == 1:
-					output_file.write('Run #'+str(run)+'\n')
-					for name in sorted(self.__getElement):
-						if normalize:
-							out_level = 2
-						else:
-							out_level = self.__getElement[name].get_levels()
-						output_file.write(name+'|'+str(out_level)+'|'
-                                                    + ' '+' '.join([str(x) for x in memo[name]])+'\n')
-
-				elif outMode == 2:
-					# transpose format (used by sensitivity analysis and model checking)
-					if run == 0:
-						output_file.write('# time ')
-						output_file.write(' '.join([name for name in sorted(self.__getElement)]))
-						output_file.write(' step\n')
-
-					for step in range(simStep):
-						output_file.write(str(step)+'  ')
-						output_file.write(' '.join([str(memo[name][step])
-                                                    for name in sorted(self.__getElement)]))
-						output_file.write(' '+str(step)+'\n')
-				# write to the event_traces file
-				elif outMode == 7:
-					output_file.write('Run #'+str(run)+'\n')
-					output_file.write(' '.join(updated_element)+'\n')
-
-			if outMode != 2 and outMode != 7 and (simtype != 'sync' or simtype != 'sync_multi' or simtype != 'rand_sync' or simtype != 'rand_sync_gauss'):
-				if outMode == 3:
-					# Write total number of runs, to be used for plotting
-					output_file.write('Run #'+str(run)+'\n')
-				
-				# Write frequency summary (sum of values for each element at each step across runs)
-				output_file.write('Frequency Summary:\n')
-				for name in sorted(self.__getElement):
-					# also write number of levels for each element to output file so they can
-					# be used to plot the traces later
-					if normalize:
-						out_level = 2
-					else:
-						out_level = self.__getElement[name].get_levels()
-					output_file.write(name+'|'+str(out_level)+'|'
-                                            + ' '+' '.join([str(x) for x in freq_sum[name]])+'\n')
+										# Next state value should be the element's current state value
+										self.__getElement[key].__next_val_index = self.__getElement[key].get_value_index()
+									# All elements in group are added to update list regardless of whether the check passed, to avoid recheck
+									alreadyUpdated += [key]
+				for element in self.__updateList:
+					# Now update all elements based on next state values
+					self.__getElement[element].set_value_index(
+						self.__getElement[element].get_next_value_index())
+
+			# The case if we are not using update groups
+			else:
+				for element in self.__updateList:
+					# Compute all next state values for each element
+					passed = self.prob_update(element)
+				for element in self.__updateList:
+					# Now update all elements based on next state values
+					self.__getElement[element].set_value_index(
+						self.__getElement[element].get_next_value_index())
+
+		elif simtype == 'round':
+			# Update all elements in the model once each round. If doing rank update simulation, update based on rank.
+			# Elements can be updated as soon as their next value is calculated. Each individual element in the list
+			# must be updated before a particular element can be updated again
+
+			# Obtain the ranks in order of smallest to largest.
+			# By default, the rankUpdate list will just contain 0 and all elements will have the same rank
+			if self.__transitionCache is not None:
+				key = self.cached_transition(step)
+				if key is None:
+					return name
+			rankList = sorted(self.__rankUpdate.keys())
+			# Place the highest rank first as that is what you want to run first
+			rankList.reverse()
+			# For each possible rank
+			for rank in rankList:
+				# Retrieve array of everything in a particular rank
+				currentRankList = self.__rankUpdate[rank]
+				# Create a list from 0 to num elements in rank - 1
+				n = len(currentRankList)
+				randomList = [i for i in range(n)]
+				# Shuffle the list and use it to index and update each element of this rank in random order
+				self.__rng.shuffle(randomList)
+				for j in randomList:
+					element = currentRankList[j]
+					self.__getElement[element].update(self.__getElement, memo, step)
+			if self.__transitionCache is not None:
+				self.__transitionCache.store(key, self.__state)
+
+		return name
+
+	def run_workers(self,
+					workers,
+					output_file,
+					simtype,
+					runs,
+					simStep,
+					scenario=0,
+					outMode=1,
+					normalize=False,
+					randomizeEachRun=False,
+					updates=None,
+					streaming=False,
+					chunkSteps=None,
+					firstRun=0
+					):
+		""" Split the runs across a pool of worker processes, write the output of each run in order,
+			and merge the frequency and square sums from all workers
+			Runs are numbered from firstRun (the number of existing runs when extending a simulation),
+			and each run draws its random numbers from its own stream, as in simulate_runs
+		"""
+		# each worker simulates a contiguous block of runs
+		bounds = [firstRun + runs*worker//workers for worker in range(workers+1)]
+		run_lists = [list(range(bounds[worker], bounds[worker+1])) 
+				for worker in range(workers) if bounds[worker+1] > bounds[worker]]
+
+		args = (simtype, runs, simStep, scenario, outMode, normalize, randomizeEachRun, updates, 
+				streaming, chunkSteps)
+		from concurrent.futures import ProcessPoolExecutor, wait
+		# the workers report the progress of their runs in shared memory
+		progress = self.__progress
+		counts = ProgressCounts(len(run_lists)) if progress is not None else None
+		# each worker writes the output of its runs to a temporary file next to the output file,
+		# instead of sending it back in memory, and the files are copied to the output file in run order
+		output_dir = os.path.dirname(os.path.abspath(output_file.name))
+		block_names = list()
+		try:
+			for _ in run_lists:
+				fd, block_name = tempfile.mkstemp(dir=output_dir)
+				os.close(fd)
+				block_names.append(block_name)
+			with ProcessPoolExecutor(max_workers=len(run_lists), 
+					initializer=_init_progress_worker, initargs=(counts,)) as executor:
+				futures = [executor.submit(_simulate_runs_worker, self, run_list, args, block_name, slot) 
+						for slot, (run_list, block_name) in enumerate(zip(run_lists, block_names))]
+				if progress is not None:
+					while wait(futures, timeout=progress.get_interval()).not_done:
+						progress.update(*counts.total())
+				results = [future.result() for future in futures]
+
+			# the blocks are copied as bytes, after the text written to the output file so far
+			output_file.flush()
+			output_buffer = getattr(output_file, 'buffer', output_file)
+			for block_name in block_names:
+				with open(block_name, 'rb') as block_file:
+					shutil.copyfileobj(block_file, output_buffer)
+		finally:
+			for block_name in block_names:
+				os.remove(block_name)
+
+		freq_sum = dict()
+		square_sum = dict()
+		for key in self.__getElement:
+			freq_sum[key] = np.sum([np.asarray(result[0][key]) for result in results], axis=0)
+			square_sum[key] = np.sum([np.asarray(result[1][key]) for result in results], axis=0)
 
-				output_file.write('\nSquares Summary:\n')
-				for name in self.__getElement:
-					if normalize:
-						out_level = 2
-					else:
-						out_level = self.__getElement[name].get_levels()
-					output_file.write(name+'|'+str(out_level)+'|'
-                                            + ' '+' '.join([str(x) for x in square_sum[name]])+'\n')
+			# initial values and toggled values are already counted for the total number of runs
+			# in each worker, so use the value from one worker instead of adding them
+			for step in [0] + self.__switchStep[key].get(scenario, []):
+				if step <= simStep:
+					freq_sum[key][step] = results[0][0][key][step]
+					square_sum[key][step] = results[0][1][key][step]
+
+		for result in results:
+			self.__attractors.update(result[2])
+			if self.__transitionCache is not None:
+				self.__transitionCache.add_counts(*result[3])
+			if self.__profile is not None:
+				self.__profile.merge(result[4])
+
+		return freq_sum, square_sum
 
 	def update(self, element):
 		""" Update a specified element in the model
@@ -893,12 +1871,11 @@ class Simulator(object):
 		"""
 		if self.__totalPriority > 0:
 			#If you are using update rate
-			priorityIndex = random.randrange(self.__totalPriority)
-			element = self.__rateUpdateList[priorityIndex]
+			element = self.__rateSelector.choice(self.__rng)
 			self.__getElement[element].update_next(self.__getElement, memo, step)
 		else:
 			# randomly choose an element to update, if not using optional column update rate
-			element = random.choice(self.__updateList)
+			element = self.__rng.choice(self.__updateList)
 			# update the element's value (and each element's dictionary of the state of its regulators)
 			# note that the "update" function below is the gateNode update function, not the Manager update
 			self.__getElement[element].update_next(self.__getElement, memo, step)
@@ -915,17 +1892,58 @@ class Simulator(object):
 	def sync_update(self, memo=dict(), step=0, simtype='sync'):
 		""" Calculate the next value for each element based on the current values of its regulators.
 			Then update all elements in the same step.
+			With a transition cache, the next values are taken from the cache if the current values are in it.
+			In sync steps after the first step of a run, only the elements returned by changed_elements are evaluated.
 		"""
-		for element in self.__updateList:
+		if self.__transitionCache is not None:
+			key = self.cached_transition(step)
+			if key is None:
+				return
+		if simtype == 'sync' and step > 1 and self.__syncBefore is not None:
+			update_list = self.changed_elements()
+		else:
+			update_list = self.__updateList
+		before = list(self.__state)
+		for element in update_list:
 			self.__getElement[element].update_next(self.__getElement, memo, step, simtype)
-		for element in self.__updateList:
+		for element in update_list:
 			self.__getElement[element].set_value_index(self.__getElement[element].get_next_value_index())
+		if simtype == 'sync':
+			self.__syncBefore = before
+			self.__syncAfter = list(self.__state)
+		else:
+			# random delays make the next values depend on random numbers
+			self.__syncBefore = None
+			self.__syncAfter = None
+		if self.__transitionCache is not None:
+			self.__transitionCache.store(key, self.__state)
+
+	def changed_elements(self):
+		""" Return the elements to evaluate in a sync step, in the order of the update list: 
+			elements with delays, elements with a regulator that changed since before the last sync step,
+			and elements that changed since the last sync step (e.g., toggled elements).
+			Any other element without delays has the same regulator values as in the last sync step, 
+			so its next value is the value it got in that step, which is its current value.
+		"""
+		state = self.__state
+		before = self.__syncBefore
+		after = self.__syncAfter
+		changed = set(self.__alwaysUpdate)
+		if state != before:
+			for i, value in enumerate(state):
+				if value != before[i]:
+					changed.update(self.__dependents[i])
+		if state != after:
+			for i, value in enumerate(state):
+				if value != after[i] and self.__updatedAt[i] is not None:
+					changed.add(self.__updatedAt[i])
+		return sorted(changed, key=self.__updateOrder.__getitem__)
 
 	def prob_update(self, element):
 		""" Get elements probability, generate a random float from [0.0,1.0), see if probability of element is greater, then update based on that
 		"""
 		prob = self.__probUpdate[element]
-		if (prob > random.random()):
+		if (prob > self.__rng.random()):
 			self.__getElement[element].update_next(self.__getElement)
 			return True
 		return False
@@ -935,12 +1953,11 @@ class Simulator(object):
 		"""
 		if self.__totalPriority > 0:
 			#If you are using update rate
-			priorityIndex = random.randrange(self.__totalPriority)
-			element = self.__rateUpdateList[priorityIndex]
+			element = self.__rateSelector.choice(self.__rng)
 		else:
-			element = random.choice(self.__updateList)
+			element = self.__rng.choice(self.__updateList)
 		prob = self.__probUpdate[element]
-		if (prob > random.random()):
+		if (prob > self.__rng.random()):
 			self.__getElement[element].update_next(self.__getElement)
 			return element, True
 		return element, False
@@ -990,7 +2007,7 @@ class Simulator(object):
 		table['Table'] = table_array.astype(int)
 
 		reg_delays_array = np.full(table_array_shape, np.nan)
-		reg_delays_array[tuple(temp_table.index.codes)] = reg_delays.values.flat
+		reg_delays_array[tuple(temp_table.index.codes)] = reg_delays.to_numpy(dtype=object)
 		table['Reg_delays'] = reg_delays_array.astype(int)
 
 		return table
@@ -1055,7 +2072,10 @@ class Element(object):
 		# current element value
 		# use the line below later if we decide to accept either index or float level
 		# curr_val_index, = np.where(self.__levels_array == curr_val)
-		self.__curr_val_index = int(curr_val_index)
+		# the value index is stored in a list at position __state_index, 
+		# this list is replaced by the model's list of all element value indices in bind_state
+		self.__state = [int(curr_val_index)]
+		self.__state_index = 0
 
 		# next element value. use in sync simulation to update all elements upon calculating next values for every element
 		self.__next_val_index = 0
@@ -1091,7 +2111,7 @@ class Element(object):
 			max_delay = max(delays+[spont_delay])
 		else:
 			max_delay = max(delays)
-		self.__reg_score = deque([],max_delay+1)
+		self.__reg_score = ScoreWindow(max_delay+1)
 		
 		# for sequential updates, we need to keep track of the step where the element was last updated
 		self.__last_update_step = 0
@@ -1099,6 +2119,7 @@ class Element(object):
 		# names of this element and its regulators
 		self.__name_list = list()
 		self.__table_prop_delays = list()
+		self.__table_reg_delays = None
 		if type(A) is str:
 			self.__name_list = self.create_name_list(X.strip(), A.strip(), I.strip())
 		elif type(A) is dict:
@@ -1112,9 +2133,30 @@ class Element(object):
 			raise ValueError('Invalid regulation function for ' + str(X))
 
 		# dictionary mapping the names of this element and its regulators to their current values and indexes
+		# (only used by the eval_reg interpreter and truth tables)
 		self.__name_to_value = dict()
 		self.__name_to_index = dict()
 
+		# positions of this element and its regulators in the model state, set in bind_state
+		self.__reg_indices = list()
+		self.__level_values = dict()
+		self.__index = None
+		self.__rng = None
+
+		# parse the regulation functions once, so that evaluating them 
+		# does not re-parse the rule strings at every update, 
+		# they are compiled when the element is bound to the model state
+		if type(A) is str:
+			self.__act_rule = parse_rule(self.__act)
+		else:
+			self.__act_rule = None
+		self.__inh_rule = parse_rule(self.__inh)
+		self.__act_func = None
+		self.__inh_func = None
+		# lookup tables of the activation ('act') and inhibition ('inh') scores and the names of the regulators
+		# in the order of the table dimensions, for rules tabulated with tabulate_rules
+		self.__rule_tables = dict()
+
 		# check if the element is an input/output or not
 		self.__opt_input = opt_input
 		self.__opt_fixed_input = opt_input_value
@@ -1135,6 +2177,58 @@ class Element(object):
 	def get_inh(self):
 		return self.__inh
 
+	def get_act_rule(self):
+		return self.__act_rule
+
+	def get_inh_rule(self):
+		return self.__inh_rule
+
+	def get_act_func(self):
+		return self.__act_func
+
+	def get_inh_func(self):
+		return self.__inh_func
+
+	def get_rule_tables(self):
+		return self.__rule_tables
+
+	def get_regulator_names(self):
+		""" Return the names of the elements whose values are read to update this element, including itself
+		"""
+		if type(self.__act) is str:
+			names = regulator_names(self.__act_rule) + regulator_names(self.__inh_rule) + [self.__regulated]
+			return [name for i, name in enumerate(names) if name not in names[:i]]
+		return list(self.__name_list)
+
+	def has_delays(self):
+		""" Check whether this element has state-transition, spontaneous, balancing, propagation, 
+			or truth table delays, which make its next value depend on earlier steps 
+			(and not only on the current values of its regulators)
+		"""
+		if self.has_delay_counters():
+			return True
+		if type(self.__act) is str:
+			return len(delayed_regulators(self.__act_rule) + delayed_regulators(self.__inh_rule)) > 0
+		return any(int(delay) > 0 for delay in self.__table_prop_delays)
+
+	def has_delay_counters(self, simtype=''):
+		""" Check whether this element has state-transition, spontaneous, balancing, 
+			or truth table regulation delays, which are counted with delay counters
+			(kept from the end of one run to the start of the next run).
+			The random-delay sync schemes (rand_sync, rand_sync_gauss) also randomize balancing delays of 0,
+			so elements with activators, inhibitors, and balancing behavior have balancing delay counters
+		"""
+		if max(self.__delays, default=0) > 0 or self.__spont not in ['', 0]:
+			return True
+		if len(self.__balance) == 2 and int(self.__balance[1]) > 0:
+			return True
+		if simtype in ['rand_sync', 'rand_sync_gauss'] and self.__delta != 0 and len(self.__balance) == 2:
+			if type(self.__act) is str and self.__act and self.__inh:
+				return True
+		if type(self.__act) is str:
+			return False
+		return self.__table_reg_delays is not None and bool(np.any(np.asarray(self.__table_reg_delays, dtype=int) > 0))
+
 	def get_levels(self):
 		return self.__levels
 
@@ -1142,13 +2236,16 @@ class Element(object):
 		return self.__name_list
 
 	def get_value_index(self):
-		return self.__curr_val_index
+		return self.__state[self.__state_index]
 
 	def get_next_value_index(self):
 		return self.__next_val_index
 
+	def set_next_value_index(self, val_index):
+		self.__next_val_index = val_index
+
 	def get_value(self):
-		return self.__levels_array[self.__curr_val_index]
+		return self.__levels_array[self.__state[self.__state_index]]
 	
 	def get_value_from_index(self, index):
 		return self.__levels_array[index]
@@ -1161,10 +2258,48 @@ class Element(object):
 
 	def get_balancing(self):
 		return self.__balance
+
+	def get_noise(self):
+		return self.__noise
+
+	def get_delta(self):
+		return self.__delta
+
+	def get_increment(self):
+		return self.__increment
+
+	def get_table_delays(self):
+		return self.__table_prop_delays, self.__table_reg_delays
+
+	def get_delay_state(self):
+		""" Return the delay counters and recent regulation scores of this element, 
+			which determine its next value together with the values of its regulators (without random delays).
+			A counter is only compared to its delay, and is either reset or incremented, 
+			so all counts at or above the delay behave the same and are returned as the delay.
+		"""
+		delays = tuple([min(count, delay) for count, delay in zip(self.__curr_delays, self.__delays)])
+		spont_delay = self.__curr_spont_delay
+		if self.__spont != '':
+			spont_delay = min(spont_delay, int(self.__spont))
+		balancing_delay = self.__curr_balancing_delay
+		if len(self.__balance) == 2:
+			balancing_delay = min(balancing_delay, int(self.__balance[1]))
+		if type(self.__act) is np.ndarray:
+			table_state = (min(self.__table_curr_reg_delays, int(np.max(self.__table_reg_delays))), 
+					self.__old_table_indices[-1] if self.__old_table_indices else None)
+		else:
+			table_state = None
+		return (delays, spont_delay, balancing_delay, self.__reg_score.scores(), table_state)
+
+	def set_last_update_step(self, step):
+		""" Set the step of the last update, e.g., after skipping steps at a fixed point
+			without evaluating the element
+		"""
+		self.__last_update_step = step
 		
 	def set_value_index(self, val_index):
 		if val_index < self.__levels:
-			self.__curr_val_index = val_index
+			self.__state[self.__state_index] = val_index
 		else:
 			raise ValueError('Invalid value index for {}, '
 					'must be < {} : {}'.format(self.__regulated,self.__levels,val_index))
@@ -1208,34 +2343,126 @@ class Element(object):
 		# sorting and concatenating this way so that the regulated name is always at the end
 		return sorted(list(reg_set-names)) + list(names)
 
-	def update(self, getElement, memo=dict(), step=0, simtype='sync'):
-		""" Update this element's dictionary of its regulator's values,
-			then update the element's value 
+	def bind_state(self, state, index, level_values, rng):
+		""" Store this element's value in the model's list of element value indices,
+			and compile the regulation functions to read the values of this element 
+			and its regulators directly from that list
+			Inputs:
+				state : list of the current value index of every element in the model
+				index : dictionary mapping element names to their position in state
+				level_values : dictionary mapping element names to their list of level values
+				rng : SimulationRandom object used to randomize delays
+		"""
+		state[index[self.__regulated]] = self.get_value_index()
+		self.__state = state
+		self.__state_index = index[self.__regulated]
+		self.__reg_indices = [index[name] for name in self.__name_list]
+		self.__level_values = level_values
+		self.__index = index
+		self.__rng = rng
+
+		self.compile_funcs()
+
+	def compile_funcs(self):
+		""" Compile the regulation functions once, after the element is bound to the model state
+		"""
+		if type(self.__act) is str:
+			self.__act_func = self.compile_reg(self.__act_rule, self.__index)
+		self.__inh_func = self.compile_reg(self.__inh_rule, self.__index)
+
+		# read the scores of tabulated rules from their lookup tables
+		if 'act' in self.__rule_tables:
+			table, names = self.__rule_tables['act']
+			self.__act_func = compile_rule_table(table, [self.__index[name] for name in names], self.__state)
+		if 'inh' in self.__rule_tables:
+			table, names = self.__rule_tables['inh']
+			self.__inh_func = compile_rule_table(table, [self.__index[name] for name in names], self.__state)
+
+	def tabulate_rules(self, max_size):
+		""" Calculate the activation and inhibition scores for every combination of regulator levels,
+			for rules with lookup tables of at most max_size entries (and without propagation delays),
+			and compile the regulation functions to read the scores from the tables
+		"""
+		levels = {name : len(values) for name, values in self.__level_values.items()}
+		self.__rule_tables = dict()
+		# tabulate the compiled rules, so that the tables have the same scores
+		self.compile_funcs()
+		for key, rule, rule_func in [
+				('act', self.__act_rule, self.__act_func), 
+				('inh', self.__inh_rule, self.__inh_func)]:
+			table, names = tabulate_rule(
+					rule, rule_func, self.__state, self.__index, levels, self.__regulated, max_size)
+			if table is not None:
+				self.__rule_tables[key] = (table, names)
+		self.compile_funcs()
+
+	def __getstate__(self):
+		""" Compiled regulation functions are closures that cannot be pickled,
+			so they are dropped here and compiled again in __setstate__ 
+			(e.g., when the model is sent to worker processes)
+		"""
+		attributes = self.__dict__.copy()
+		attributes['_Element__act_func'] = None
+		attributes['_Element__inh_func'] = None
+		# timed methods of profiled simulations
+		attributes.pop('evaluate', None)
+		attributes.pop('eval_table', None)
+		return attributes
+
+	def __setstate__(self, attributes):
+		self.__dict__.update(attributes)
+		if self.__index is not None:
+			self.compile_funcs()
+
+	def get_notations(self):
+		""" Return the notation type of the activation ('act') and inhibition ('inh') functions 
+			of this element that are not empty, the notations used in the rule (see rules.rule_notations),
+			'truth table', or with '(lookup table)' for rules read from lookup tables
 		"""
+		notations = dict()
+		if type(self.__act) is not str:
+			notations['act'] = 'truth table'
+		for key, rule in [('act', self.__act_rule), ('inh', self.__inh_rule)]:
+			if rule is not None:
+				notations[key] = ', '.join(rule_notations(rule))
+				if key in self.__rule_tables:
+					notations[key] += ' (lookup table)'
+		return notations
+
+	def set_profile(self, stats):
+		""" Count and time the evaluations of this element and of its regulation functions in stats,
+			a dictionary of [calls, seconds] lists for 'evaluate', 'act', and 'inh' (from SimulationProfile),
+			or stop if stats is None
+		"""
+		self.__dict__.pop('evaluate', None)
+		self.__dict__.pop('eval_table', None)
+		self.__act_func = getattr(self.__act_func, '__wrapped__', self.__act_func)
+		self.__inh_func = getattr(self.__inh_func, '__wrapped__', self.__inh_func)
+		if stats is None:
+			return
+
+		self.evaluate = timed(self.evaluate, stats['evaluate'])
+		if type(self.__act) is not str:
+			self.eval_table = timed(self.eval_table, stats['act'])
+		elif self.__act_rule is not None:
+			self.__act_func = timed(self.__act_func, stats['act'])
+		if self.__inh_rule is not None:
+			self.__inh_func = timed(self.__inh_func, stats['inh'])
 
-		self.__name_to_value.clear()
-		self.__name_to_index.clear()
-		# update the state (values of this element and its regulators)
-		for name in self.__name_list:
-			self.__name_to_value[name] = getElement[name].get_value()
-			self.__name_to_index[name] = getElement[name].get_value_index()
+	def update(self, getElement, memo=dict(), step=0, simtype='sync'):
+		""" Update the element's value based on the current values of its regulators
+			(read from the model state, getElement is kept for compatibility)
+		"""
 
-		self.__curr_val_index = self.evaluate(memo, step, simtype)
+		self.__state[self.__state_index] = self.evaluate(memo, step, simtype)
 
 	def update_next(self, getElement, memo=dict(), step=0, simtype='sync'):
-		""" Update this element's dictionary of its regulators' values,
-			calculate the element's next value and store it in another variable,
+		""" Calculate the element's next value and store it in another variable,
 			but DO NOT update the element's current value yet.
 			This enables updating multiple elements in a single step,
 			one must calculate all next state values based on all current state values 
 			before updating the elements.
 		"""
-		self.__name_to_value.clear()
-		self.__name_to_index.clear()
-		# update the state (values of this element and its regulators)
-		for name in self.__name_list:
-			self.__name_to_value[name] = getElement[name].get_value()
-			self.__name_to_index[name] = getElement[name].get_value_index()
 
 		self.__next_val_index = self.evaluate(memo, step, simtype)
 
@@ -1250,8 +2477,8 @@ class Element(object):
 		mapping = None
 
 		if type(self.__act) is str:
-			# parse regulation function and calculate activation score
-			y_act = self.eval_reg(self.__act, 0, memo, step)
+			# calculate activation score using the compiled regulation function
+			y_act = self.__act_func(memo, step)
 			mapping = 'increment'
 		elif type(self.__act) is np.ndarray:
 			# will use truth table mapping to update this element
@@ -1260,7 +2487,7 @@ class Element(object):
 			raise ValueError('Invalid regulation function for ' + str(self.__regulated))
 
 		if type(self.__inh) is str:
-			y_inh = self.eval_reg(self.__inh, 0, memo, step)
+			y_inh = self.__inh_func(memo, step)
 		else:
 			raise ValueError('Invalid regulation function for ' + str(self.__regulated))
 
@@ -1275,17 +2502,18 @@ class Element(object):
 			# compare the regulation scores and increment the current value
 
 			# define values for code readability
-			X_curr_index = self.__curr_val_index
+			X_curr_index = self.__state[self.__state_index]
 
 			# check whether to randomize delays
 			if simtype == 'rand_sync' or simtype == 'rand_sync_gauss':
 				# randomized delays for spontaneous behavior
 				if self.__spont != '' and self.__spont != 0:
-					spont_dv = random.randint(
-						int(self.__spont)-self.__delta, int(self.__spont)+self.__delta)
 					if simtype == 'rand_sync_gauss':
-						spont_dv = int(round(np.random.normal(
-							int(self.__spont), self.__delta, 1)))
+						spont_dv = int(round(self.__rng.normal(
+							int(self.__spont), self.__delta)))
+					else:
+						spont_dv = self.__rng.randint(
+							int(self.__spont)-self.__delta, int(self.__spont)+self.__delta)
 					if spont_dv < 0:
 						D_spont = 0
 					else:
@@ -1298,11 +2526,12 @@ class Element(object):
 				# randomized delays for balancing behavior 
 				if len(self.__balance) == 2 and self.__balance[0] !=0:
 					balancing = self.__balance[0]
-					balancing_dv = random.randint(
-						int(self.__balance[1])-self.__delta, int(self.__balance[1])+self.__delta)
 					if simtype == 'rand_sync_gauss':
 						balancing_dv = int(
-							round(np.random.normal(int(self.__balance[1]), self.__delta, 1)))
+							round(self.__rng.normal(int(self.__balance[1]), self.__delta)))
+					else:
+						balancing_dv = self.__rng.randint(
+							int(self.__balance[1])-self.__delta, int(self.__balance[1])+self.__delta)
 					if balancing_dv < 0:
 						D_balancing = 0
 					else:
@@ -1314,9 +2543,10 @@ class Element(object):
 				D = list()
 				for dv in self.__delays:
 					if dv != 0:
-						new_dv = random.randint(dv-self.__delta, dv+self.__delta)
 						if simtype == 'rand_sync_gauss':
-							new_dv = int(round(np.random.normal(dv, self.__delta, 1)))
+							new_dv = int(round(self.__rng.normal(dv, self.__delta)))
+						else:
+							new_dv = self.__rng.randint(dv-self.__delta, dv+self.__delta)
 						if new_dv < 0:
 							D.append(0)
 						else:
@@ -1339,50 +2569,31 @@ class Element(object):
 			if self.__last_update_step > 0:
 				step_diff = step - self.__last_update_step
 				if step_diff > 1 and step > 1:
-					last_reg_score = self.__reg_score[-1]
-					stp = 1
-					while stp < step_diff:
-						self.__reg_score.append(last_reg_score)
-						self.__curr_delays[int(X_curr_index)] += 1
-						if D_spont != '':
-							self.__curr_spont_delay += 1
-						if balancing != '':
-							self.__curr_balancing_delay += 1
-						stp += 1
+					# hold the last score and advance the delays for each step without an update
+					self.__reg_score.append(self.__reg_score.last(), step_diff-1)
+					self.__curr_delays[int(X_curr_index)] += step_diff-1
+					if D_spont != '':
+						self.__curr_spont_delay += step_diff-1
+					if balancing != '':
+						self.__curr_balancing_delay += step_diff-1
 			self.__last_update_step = step
 
-			if D[int(X_curr_index)] > 0 and len(self.__reg_score) >= D[int(X_curr_index)]:
-				delay_index_increase = np.linspace(
-					1, D[int(X_curr_index)]+1, D[int(X_curr_index)], dtype=int, endpoint=False)
-				delay_index_increase = np.negative(np.transpose(delay_index_increase))
-				reg_scores_increase = [self.__reg_score[indx]
-                                    for indx in delay_index_increase]
+			# count the matching regulation scores in each delay window
+			# (windows longer than the score history are empty)
+			scores = self.__reg_score
+			count_increase = scores.count(1, D[int(X_curr_index)])
+			if int(X_curr_index) > 0:
+				count_decrease = scores.count(-1, D[-int(X_curr_index)])
 			else:
-				reg_scores_increase = []
-
-			if int(X_curr_index) > 0 and D[-int(X_curr_index)] > 0 and len(self.__reg_score) >= D[-int(X_curr_index)]:
-				delay_index_decrease = np.linspace(
-					1, D[-int(X_curr_index)]+1, D[-int(X_curr_index)], dtype=int, endpoint=False)
-				delay_index_decrease = np.negative(np.transpose(delay_index_decrease))
-				reg_scores_decrease = [self.__reg_score[indx]
-                                    for indx in delay_index_decrease]
+				count_decrease = 0
+			if D_balancing != '':
+				count_balancing = scores.count(0, D_balancing)
 			else:
-				reg_scores_decrease =[]
-			
-			if D_balancing != '' and D_balancing > 0 and len(self.__reg_score) >= D_balancing:
-				delay_index_balancing = np.linspace(1, D_balancing+1, D_balancing, dtype=int, endpoint=False)
-				delay_index_balancing = np.negative(np.transpose(delay_index_balancing))
-				reg_scores_balancing = [self.__reg_score[indx]
-                                    for indx in delay_index_balancing]
-			else:
-				reg_scores_balancing = []
-			
-			if D_spont != '' and D_spont > 0 and len(self.__reg_score) >= D_spont:
-				delay_index_spont = np.linspace(1, D_spont+1, D_spont, dtype=int, endpoint=False)
-				delay_index_spont = np.negative(np.transpose(delay_index_spont))
-				reg_scores_spont = [self.__reg_score[indx] for indx in delay_index_spont]
+				count_balancing = 0
+			if D_spont != '':
+				count_spont = scores.count(0, D_spont)
 			else:
-				reg_scores_spont = []
+				count_spont = 0
 
 			# determine next value of the regulated element,
 			# based on the type of regulators and activation/inhibition scores
@@ -1416,9 +2627,8 @@ class Element(object):
 					# since this is an increase, index the delays list using the current value of X
 					# so if X is currently 0, and transitioning from 0 - 1, we want delays[0]
 					# therefore, our index is X_curr
-					score_one, = np.where(np.array(reg_scores_increase) == 1)
 					# check the state transition delay value and increase
-					if (len(score_one) >= (D[int(X_curr_index)]-self.__noise)) and (self.__curr_delays[int(X_curr_index)] >= D[int(X_curr_index)]):
+					if (count_increase >= (D[int(X_curr_index)]-self.__noise)) and (self.__curr_delays[int(X_curr_index)] >= D[int(X_curr_index)]):
 						# increase and reset delay
 						X_next_index = X_curr_index + increment
 						self.__curr_delays[int(X_curr_index)] = 0
@@ -1428,10 +2638,9 @@ class Element(object):
 						self.__curr_delays[int(X_curr_index)] += 1
 					self.__reg_score.append(1)
 				elif (y_act == 0):
-					score_zero, = np.where(np.array(reg_scores_spont) == 0)
 					if D_spont != '':
 						# check spontaneous delay 
-						if (len(score_zero) >= (D_spont-self.__noise)) and (self.__curr_spont_delay >= D_spont):
+						if (count_spont >= (D_spont-self.__noise)) and (self.__curr_spont_delay >= D_spont):
 							# spontaneously decay and reset spontaneous delay
 							X_next_index = X_curr_index - spont_increment
 							self.__curr_spont_delay = 0
@@ -1450,8 +2659,7 @@ class Element(object):
 					# So if levels=3, delays = [delay01, delay12, delay21, delay10]
 					# and if X is currently 1, and transitioning from 1-0, we want delays[-1]
 					# therefore, our index is -X_curr
-					score_neg_one, = np.where(np.array(reg_scores_decrease) == -1)
-					if (len(score_neg_one) >= (D[-int(X_curr_index)]-self.__noise)) and (self.__curr_delays[-int(X_curr_index)] >= D[-int(X_curr_index)]):
+					if (count_decrease >= (D[-int(X_curr_index)]-self.__noise)) and (self.__curr_delays[-int(X_curr_index)] >= D[-int(X_curr_index)]):
 						# decrease and reset delay
 						X_next_index = X_curr_index - increment
 						self.__curr_delays[-int(X_curr_index)] = 0
@@ -1461,10 +2669,9 @@ class Element(object):
 						self.__curr_delays[-int(X_curr_index)] += 1
 					self.__reg_score.append(-1)
 				elif (y_inh == 0):
-					score_zero, = np.where(np.array(reg_scores_spont) == 0)
 					if D_spont != '':
 						# check spontaneous delay 
-						if (len(score_zero) >= (D_spont-self.__noise)) and (self.__curr_spont_delay >= D_spont):
+						if (count_spont >= (D_spont-self.__noise)) and (self.__curr_spont_delay >= D_spont):
 							# spontaneously increase and reset spontaneous delay
 							X_next_index = X_curr_index + spont_increment
 							self.__curr_spont_delay = 0
@@ -1481,9 +2688,8 @@ class Element(object):
 				# decrease if activation < inhibition,
 				# check balancing if activation == inhibition
 				if (y_act > y_inh):
-					score_one, = np.where(np.array(reg_scores_increase) == 1)
 					# check the state transition delay value and increase
-					if (len(score_one) >= (D[int(X_curr_index)]-self.__noise)) and (self.__curr_delays[int(X_curr_index)] >= D[int(X_curr_index)]):
+					if (count_increase >= (D[int(X_curr_index)]-self.__noise)) and (self.__curr_delays[int(X_curr_index)] >= D[int(X_curr_index)]):
 						# increase and reset delay
 						X_next_index = X_curr_index + increment
 						self.__curr_delays[int(X_curr_index)] = 0
@@ -1493,12 +2699,11 @@ class Element(object):
 						self.__curr_delays[int(X_curr_index)] += 1
 					self.__reg_score.append(1)
 				elif (y_act == y_inh):
-					score_zero, = np.where(np.array(reg_scores_balancing) == 0)
 					# check balancing behavior since regulator scores are equal
 					if balancing != '':
 						if balancing in ['decrease', 'negative']:
 							# check balancing delay 
-							if (len(score_zero) >= (D_balancing-self.__noise)) and (self.__curr_balancing_delay >= D_balancing):
+							if (count_balancing >= (D_balancing-self.__noise)) and (self.__curr_balancing_delay >= D_balancing):
 								# decay and reset balancing delay
 								X_next_index = X_curr_index - balance_increment
 								self.__curr_balancing_delay = 0
@@ -1508,7 +2713,7 @@ class Element(object):
 								self.__curr_balancing_delay += 1
 						elif balancing in ['increase', 'positive']:
 							# check balancing delay
-							if (len(score_zero) >= (D_balancing-self.__noise)) and (self.__curr_balancing_delay >= D_balancing):
+							if (count_balancing >= (D_balancing-self.__noise)) and (self.__curr_balancing_delay >= D_balancing):
 								# restore and reset balancing delay
 								X_next_index = X_curr_index + balance_increment
 								self.__curr_balancing_delay = 0
@@ -1523,9 +2728,8 @@ class Element(object):
 						X_next_index = X_curr_index
 					self.__reg_score.append(0)
 				elif (y_act < y_inh):
-					score_neg_one, = np.where(np.array(reg_scores_decrease) == -1)
 					# check the state transition delay value and decrease
-					if (len(score_neg_one) >= (D[-int(X_curr_index)]-self.__noise)) and (self.__curr_delays[-int(X_curr_index)] >= D[-int(X_curr_index)]):
+					if (count_decrease >= (D[-int(X_curr_index)]-self.__noise)) and (self.__curr_delays[-int(X_curr_index)] >= D[-int(X_curr_index)]):
 						# decrease and reset delay 
 						X_next_index = X_curr_index - increment
 						self.__curr_delays[-int(X_curr_index)] = 0
@@ -1546,16 +2750,41 @@ class Element(object):
 		# else 0 <= X_next_index <= max_value_index (within bounds), it will return X_next_index, as order will be 0, X_next_index, max_value_index
 		return sorted([0, X_next_index, max_value_index])[1]
 
+	def compile_reg(self, reg_rule, index):
+		""" Compile a regulation function (rule string or parsed rule) into a function 
+			of (memo, step) that returns the same score as eval_reg(reg_rule, 0, memo, step)
+		"""
+		if type(reg_rule) is str:
+			reg_rule = parse_rule(reg_rule)
+		return compile_rule(
+				reg_rule, 
+				self.__state, index, self.__level_values, 
+				self.__regulated, self.__levels, self.__delta, self.__rng)
+
+	def load_regulator_values(self):
+		""" Update this element's dictionary of its regulators' values from the model state,
+			used by the eval_reg interpreter and truth tables
+		"""
+		for name, i in zip(self.__name_list, self.__reg_indices):
+			self.__name_to_value[name] = self.__level_values[name][self.__state[i]]
+			self.__name_to_index[name] = self.__state[i]
+
 	def eval_reg(self, reg_rule, layer, memo=dict(), step=0):
 		""" Calculates a regulation score based on the value of the activators or inhibitors 
 			(the list in reg_rule).
 			Uses discrete AND, OR, and NOT (min, max, n's complement).
+			Simulations use the compiled rules from compile_reg instead,
+			this interpreter is kept as the reference implementation.
 			Inputs:
 				reg_rule : activator or inhibitor function notation 
 				layer : set != 0 when the function is called recursively
 			Returns score y_sum
 		"""
 
+		if layer == 0:
+			# get the current values of this element and its regulators
+			self.load_regulator_values()
+
 		# Only calculate the score if there are actually regulators for this element
 		if reg_rule:
 
@@ -1683,7 +2912,7 @@ class Element(object):
 						# NOT notation, uses n's complement
 						if '~' in reg_element[1:]:
 							propagation_delay, name = reg_element[1:].split('~')
-							propagation_delay = random.randint(
+							propagation_delay = self.__rng.randint(
 								int(propagation_delay)-self.__delta, int(propagation_delay)+self.__delta)
 							if int(propagation_delay) < 0:
 								propagation_delay = 0
@@ -1708,7 +2937,7 @@ class Element(object):
 					elif '~' in reg_element:
 						# check propagation delay
 						propagation_delay, name = reg_element.split('~')
-						propagation_delay = random.randint(
+						propagation_delay = self.__rng.randint(
 							int(propagation_delay)-self.__delta, int(propagation_delay)+self.__delta)
 						if int(propagation_delay) < 0:
 							propagation_delay = 0
@@ -1756,12 +2985,13 @@ class Element(object):
 			if int(self.__table_prop_delays[i]) > 0:
 				old_values = memo[reg]
 				if int(self.__table_prop_delays[i]) < len(old_values):
-					self.__name_to_index[reg] = int(
-						old_values[step - int(self.__table_prop_delays[i])])
+					reg_index = int(old_values[step - int(self.__table_prop_delays[i])])
 				else:
-					self.__name_to_index[reg] = int(old_values[0])
+					reg_index = int(old_values[0])
+			else:
+				reg_index = self.__state[self.__reg_indices[i]]
 			# build a tuple to index np.array
-			index += (self.__name_to_index[reg],)
+			index += (reg_index,)
 			i += 1
 
 		# if step_diff > 1, then we use sequential updates and we need to hold the old regulation scores
@@ -1784,7 +3014,7 @@ class Element(object):
 					self.__table_curr_reg_delays = 0  # Reset delay variable
 					self.__old_table_indices.clear()
 			if self.__table_curr_reg_delays < current_reg_delay:
-				next_state_index = self.__name_to_index[self.__name_list[-1]]
+				next_state_index = index[-1]
 				self.__table_curr_reg_delays += 1
 			else:
 				next_state_index = self.__act[self.__old_table_indices[-1]]
@@ -1797,7 +3027,7 @@ class Element(object):
 					self.__table_curr_reg_delays = 0  # Reset delay variable
 					self.__old_table_indices.clear()
 			if self.__table_curr_reg_delays < current_reg_delay:
-				next_state_index = self.__name_to_index[self.__name_list[-1]]
+				next_state_index = index[-1]
 				self.__table_curr_reg_delays += 1
 			else:
 				next_state_index = self.__act[index]
@@ -1840,3 +3070,76 @@ class Element(object):
 				final_list.append(sentence[start:index])
 				start = index+1
 		return final_list
+
+
+def _excel_cell(value):
+	""" Convert a cell of a model table from a CSV/TSV file or a DataFrame to the value 
+		read from the same cell of an Excel file: '' for empty cells, and numbers for numeric text,
+		with whole numbers as int
+	"""
+	if value is None:
+		return ''
+	if isinstance(value, str):
+		if not _NUMBER.fullmatch(value):
+			return value
+		value = float(value)
+	if isinstance(value, float):
+		if math.isnan(value):
+			return ''
+		if value.is_integer():
+			return int(value)
+	return value
+
+
+# progress of the simulations in a worker process (None if it is not reported)
+_progress_counts = None
+
+
+def _init_progress_worker(counts):
+	global _progress_counts
+	_progress_counts = counts
+
+
+def _simulate_runs_worker(model, run_list, args, output_name, slot=0):
+	""" Simulate a block of runs in a worker process, writing the output of the runs to the file output_name.
+		Returns the frequency and square sums of the runs,
+		the cycles found in the runs, the hit and miss counts of the transition cache, 
+		and the profile of the runs (or None if the simulation is not profiled)
+		The progress of the runs is reported in slot of the worker progress counts
+	"""
+	# the model is profiled in the worker if the simulation is profiled
+	profile = model.get_profile()
+	if profile is not None:
+		profile.attach(model)
+
+	progress = model.get_progress()
+	if progress is not None:
+		progress.set_callback(_progress_counts.callback(slot))
+
+	# outMode is the fifth simulation argument
+	with open(output_name, 'wb' if args[4] == 4 else 'w') as output_file:
+		freq_sum, square_sum = model.simulate_runs(run_list, output_file, *args)
+
+	if profile is not None:
+		profile.detach(model)
+	cache = model.get_transition_cache()
+	cache_counts = (cache.get_hits(), cache.get_misses()) if cache is not None else (0, 0)
+	return freq_sum, square_sum, model.get_attractors(), cache_counts, profile
+
+
+def _run_scenario_worker(model, args, kwargs, slot=None):
+	""" Run the simulation of one scenario on a separate copy of the model,
+		reporting its progress in slot of the worker progress counts (if slot is not None)
+	"""
+	if slot is not None:
+		kwargs = dict(kwargs, progress=_progress_counts.callback(slot))
+	model.run_simulation(*args, **kwargs)
+
+
+def _scenario_progress(progress, runs, steps):
+	""" Return a progress function for the simulation of a scenario, which updates the progress of all scenarios,
+		after runs and steps of the previous scenarios
+	"""
+	def update(report):
+		progress.update(runs + report['runs_completed'], steps + report['steps_completed'])
+	return update
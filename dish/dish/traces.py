@@ -0,0 +1,402 @@
+"""Write simulation traces and summaries in the DiSH trace file format
+
+Shared by the simulation engines so that every engine produces files that can
+be read back with visualization.get_traces.
+
+Output mode 4 writes a binary trace file instead of text: a short header, then a
+JSON description of the elements and arrays, then the value index of each element
+at each step of each run (int8, or uint16 for elements with more than 127 levels),
+and the frequency and squares summaries. BinaryTraces memory-maps these arrays,
+so large results can be sliced by run or element without reading the whole file.
+"""
+import json
+
+import numpy as np
+
+
+# first bytes of a binary trace file, followed by the length of the JSON header
+BINARY_MAGIC = b'DISHTRC1'
+# byte alignment of the arrays in a binary trace file
+BINARY_ALIGNMENT = 64
+
+
+def write_run(output_file, run, names, levels, traces):
+    """Write the values of each element for one run (output mode 1)
+
+    Inputs:
+        output_file : open text file
+        run : run index (zero-indexed)
+        names : element names
+        levels : dictionary of the number of levels written for each element
+        traces : dictionary of the values of each element at each step
+    """
+
+    output_file.write('Run #'+str(run)+'\n')
+    for name in sorted(names):
+        output_file.write(name+'|'+str(levels[name])+'|'
+                + ' '+' '.join([str(x) for x in traces[name]])+'\n')
+
+
+def write_run_table(output_file, run, names, traces, steps):
+    """Write the values of each element for one run in transpose format (output mode 2),
+    used by sensitivity analysis and model checking
+    """
+
+    sorted_names = sorted(names)
+    if run == 0:
+        output_file.write('# time ')
+        output_file.write(' '.join([name for name in sorted_names]))
+        output_file.write(' step\n')
+
+    for step in range(steps):
+        output_file.write(str(step)+'  ')
+        output_file.write(' '.join([str(traces[name][step]) for name in sorted_names]))
+        output_file.write(' '+str(step)+'\n')
+
+
+def write_summary(output_file, names, levels, freq_sum, square_sum, last_run=None):
+    """Write the frequency summary (sum of values for each element at each step across runs)
+    and the squares summary (sum of squared values, to get the variance)
+
+    Inputs:
+        last_run : if not None, write this run index before the summaries so that
+            the total number of runs is known when plotting (output mode 3)
+    """
+
+    if last_run is not None:
+        output_file.write('Run #'+str(last_run)+'\n')
+
+    output_file.write('Frequency Summary:\n')
+    for name in sorted(names):
+        # also write number of levels for each element to output file so they can
+        # be used to plot the traces later
+        output_file.write(name+'|'+str(levels[name])+'|'
+                + ' '+' '.join([str(x) for x in _as_list(freq_sum[name])])+'\n')
+
+    output_file.write('\nSquares Summary:\n')
+    for name in names:
+        output_file.write(name+'|'+str(levels[name])+'|'
+                + ' '+' '.join([str(x) for x in _as_list(square_sum[name])])+'\n')
+
+
+def _as_list(values):
+    """Convert NumPy summary arrays to lists of Python numbers, which are written
+    in the same format as the lists of sums from Simulator.simulate_runs
+    """
+
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    return values
+
+
+def binary_header(names, levels, runs, steps, normalize=False):
+    """Return the header of a binary trace file (output mode 4) and its description
+
+    Inputs:
+        names : element names, in the order of the element axis of the arrays
+        levels : dictionary of the number of levels of each element
+        runs : number of runs
+        steps : number of steps stored for each run (including step 0)
+        normalize : whether the summaries are sums of normalized values
+    """
+
+    trace_dtype = 'int8' if max([levels[name] for name in names] + [1]) <= 127 else 'uint16'
+    summary_dtype = 'float64' if normalize else 'int64'
+
+    info = {
+        'version' : 1,
+        'names' : list(names),
+        'levels' : [int(levels[name]) for name in names],
+        'runs' : int(runs),
+        'steps' : int(steps),
+        'normalize' : bool(normalize),
+        'trace_dtype' : trace_dtype,
+        'summary_dtype' : summary_dtype,
+        }
+
+    # offsets of the arrays depend on the header length, which depends on the offsets,
+    # so reserve enough room for the largest offset values
+    trace_size = runs*steps*len(names)*np.dtype(trace_dtype).itemsize
+    summary_size = len(names)*steps*np.dtype(summary_dtype).itemsize
+    info.update({'traces_offset' : 0, 'frequency_offset' : 0, 'squares_offset' : 0})
+    reserved = len(json.dumps(info)) + 3*20
+    traces_offset = _align(len(BINARY_MAGIC) + 8 + reserved)
+    info['traces_offset'] = traces_offset
+    info['frequency_offset'] = _align(traces_offset + trace_size)
+    info['squares_offset'] = _align(info['frequency_offset'] + summary_size)
+
+    description = json.dumps(info).encode('utf-8')
+    header = BINARY_MAGIC + np.uint64(len(description)).tobytes() + description
+    return header + b'\0'*(traces_offset - len(header)), info
+
+
+def write_run_binary(output_file, info, traces):
+    """Write the value indices of each element at each step of one run to a binary trace file,
+    after the header and any previous runs
+
+    Inputs:
+        output_file : binary file
+        info : description of the file from binary_header
+        traces : dictionary of the values (or normalized values) of each element at each step
+    """
+
+    run = np.empty((info['steps'], len(info['names'])), dtype=info['trace_dtype'])
+    for col, (name, levels) in enumerate(zip(info['names'], info['levels'])):
+        values = np.asarray(traces[name])
+        if info['normalize']:
+            # normalized values are stored as value indices
+            values = np.rint(values*(levels-1))
+        run[:, col] = values
+    output_file.write(run.tobytes())
+
+
+def write_summary_binary(output_file, info, freq_sum, square_sum):
+    """Write the frequency and squares summaries to a binary trace file, after all runs
+    """
+
+    for key in ['frequency_offset', 'squares_offset']:
+        # pad to the start of the summary array
+        output_file.write(b'\0'*(info[key] - output_file.tell()))
+        sums = freq_sum if key == 'frequency_offset' else square_sum
+        summary = np.array([np.asarray(sums[name]) for name in info['names']], dtype=info['summary_dtype'])
+        output_file.write(summary.tobytes())
+
+
+def is_binary_trace_file(path):
+    """Check whether a file is a binary trace file (output mode 4)
+    """
+
+    with open(path, 'rb') as in_file:
+        return in_file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+class BinaryTraces(object):
+    """Memory-mapped access to a binary trace file (output mode 4)
+
+    Example:
+        results = BinaryTraces('traces.bin')
+        il2 = results.element_traces('IL2')       # runs x steps array of value indices
+        run0 = results.traces[0]                  # steps x elements array
+        il2_avg = results.average('IL2')
+    """
+
+    def __init__(self, path):
+        """Inputs:
+            path : name of a binary trace file written with output mode 4
+        """
+
+        with open(path, 'rb') as in_file:
+            if in_file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError('Not a binary trace file: {}'.format(path))
+            length = int(np.frombuffer(in_file.read(8), dtype=np.uint64)[0])
+            self.info = json.loads(in_file.read(length).decode('utf-8'))
+
+        self.path = path
+        self.names = self.info['names']
+        self.levels = dict(zip(self.names, self.info['levels']))
+        self.runs = self.info['runs']
+        self.steps = self.info['steps']
+        self.normalize = self.info['normalize']
+        self.__column = {name : col for col, name in enumerate(self.names)}
+
+        num_elements = len(self.names)
+        # value index of each element at each step of each run
+        self.traces = np.memmap(path, dtype=self.info['trace_dtype'], mode='r',
+                offset=self.info['traces_offset'], shape=(self.runs, self.steps, num_elements))
+        # sums across runs of each element at each step
+        self.frequency = np.memmap(path, dtype=self.info['summary_dtype'], mode='r',
+                offset=self.info['frequency_offset'], shape=(num_elements, self.steps))
+        self.squares = np.memmap(path, dtype=self.info['summary_dtype'], mode='r',
+                offset=self.info['squares_offset'], shape=(num_elements, self.steps))
+
+    def element_traces(self, name):
+        """Return the value indices of an element (runs x steps), without reading other elements
+        """
+
+        return self.traces[:, :, self.__column[name]]
+
+    def average(self, name):
+        """Return the average value of an element at each step, across runs
+        """
+
+        return self.frequency[self.__column[name]]/self.runs
+
+    def stdev(self, name):
+        """Return the standard deviation of an element at each step, across runs
+        """
+
+        avg = self.average(name)
+        return np.sqrt(np.maximum(self.squares[self.__column[name]]/self.runs - avg**2, 0))
+
+    def trace_data(self, elements=None):
+        """Return the traces in the same format as visualization.get_traces
+        (values as NumPy arrays), for all elements or the names in elements
+        """
+
+        trace_data = dict()
+        for name in (elements if elements is not None else self.names):
+            col = self.__column[name]
+            levels = 2 if self.normalize else self.levels[name]
+            values = self.element_traces(name)
+            if self.normalize:
+                values = values/(self.levels[name]-1)
+            avg = self.average(name)
+            stdev = self.stdev(name)
+            trace_data[name] = {
+                    'levels' : levels,
+                    'runs' : self.runs,
+                    'traces' : {str(run) : np.asarray(values[run], dtype=float) for run in range(self.runs)},
+                    'frequency' : np.asarray(self.frequency[col], dtype=float),
+                    'squares' : np.asarray(self.squares[col], dtype=float),
+                    'avg' : avg,
+                    'stdev' : stdev,
+                    'avg_percent' : 100*avg/(levels-1),
+                    'stdev_percent' : 100*stdev/(levels-1),
+                    }
+        return trace_data
+
+
+def read_summary(path):
+    """Read the frequency and squares summaries of a trace file (output mode 1, 3, or 4)
+
+    Returns a dictionary with:
+        names : element names, in the order of the squares summary (or binary file)
+        levels : dictionary of the number of levels written for each element
+            (2 for normalized values, as in text files)
+        runs : number of runs in the summaries
+        steps : number of steps in the summaries (including step 0)
+        normalize : whether the summaries are sums of normalized values (None for text files)
+        binary : whether the file is a binary trace file
+        frequency, squares : dictionaries of the sums of each element (NumPy arrays)
+        path : name of the trace file
+    """
+
+    if is_binary_trace_file(path):
+        traces = BinaryTraces(path)
+        return {
+                'names' : list(traces.names),
+                'levels' : {name : 2 if traces.normalize else traces.levels[name] for name in traces.names},
+                'runs' : traces.runs,
+                'steps' : traces.steps,
+                'normalize' : traces.normalize,
+                'binary' : True,
+                'path' : path,
+                'frequency' : {name : np.array(traces.frequency[col]) for col, name in enumerate(traces.names)},
+                'squares' : {name : np.array(traces.squares[col]) for col, name in enumerate(traces.names)},
+                }
+
+    summary = {'names' : list(), 'levels' : dict(), 'runs' : None, 'steps' : None,
+            'normalize' : None, 'binary' : False, 'path' : path, 'frequency' : dict(), 'squares' : dict()}
+    section = None
+    with open(path) as in_file:
+        for line in in_file:
+            line = line.strip()
+            if line.startswith('Run #'):
+                # the last run index in the file gives the number of runs
+                summary['runs'] = int(line[len('Run #'):]) + 1
+                continue
+            elif line.startswith('Frequency Summary:'):
+                section = 'frequency'
+                continue
+            elif line.startswith('Squares Summary:'):
+                section = 'squares'
+                continue
+            elif section is None or line == '':
+                # values of individual runs
+                continue
+
+            element_info, _, values = line.partition(' ')
+            name, levels = element_info.split('|')[:2]
+            values = values.split()
+            try:
+                # sums of value indices are written as integers
+                values = np.array(values, dtype=np.int64)
+            except ValueError:
+                values = np.array(values, dtype=float)
+            summary[section][name] = values
+            summary['levels'][name] = int(levels)
+            if section == 'squares':
+                summary['names'].append(name)
+
+    if summary['runs'] is None or len(summary['names']) == 0:
+        raise ValueError('Trace file does not contain a run count and summaries: {}'.format(path))
+    if set(summary['frequency']) != set(summary['squares']):
+        raise ValueError('Frequency and squares summaries do not have the same elements: {}'.format(path))
+    summary['steps'] = len(summary['squares'][summary['names'][0]])
+    return summary
+
+
+def copy_runs(path, output_file):
+    """Copy the values of individual runs from an existing trace file to output_file,
+    which must have the same format (text with output mode 1, or binary after the header)
+    """
+
+    if is_binary_trace_file(path):
+        traces = BinaryTraces(path)
+        for run in range(traces.runs):
+            output_file.write(traces.traces[run].tobytes())
+        return
+
+    with open(path) as in_file:
+        run_line = None
+        for line in in_file:
+            if line.startswith('Frequency Summary:'):
+                break
+            elif line.startswith('Run #'):
+                # only copy run numbers followed by values (output mode 3 has a run number only)
+                run_line = line
+            elif line.strip() != '':
+                if run_line is not None:
+                    output_file.write(run_line)
+                    run_line = None
+                output_file.write(line)
+
+
+def merge_summaries(input_files, output_name):
+    """Add up the summaries of trace files from independent simulations of the same model,
+    scenario, and number of steps, and write them to a summary-only trace file (output mode 3)
+
+    Inputs:
+        input_files : names of trace files (output mode 1, 3, or 4)
+        output_name : name of the merged trace file
+
+    Returns the total number of runs
+    """
+
+    if len(input_files) == 0:
+        raise ValueError('No trace files to merge')
+
+    summaries = [read_summary(input_file) for input_file in input_files]
+    merged = summaries[0]
+    for input_file, summary in zip(input_files[1:], summaries[1:]):
+        check_summary(summary, merged['names'], merged['levels'], merged['steps'], input_file)
+
+    runs = sum(summary['runs'] for summary in summaries)
+    freq_sum = {name : np.sum([summary['frequency'][name] for summary in summaries], axis=0)
+            for name in merged['names']}
+    square_sum = {name : np.sum([summary['squares'][name] for summary in summaries], axis=0)
+            for name in merged['names']}
+
+    with open(output_name, 'w') as output_file:
+        write_summary(output_file, merged['names'], merged['levels'], freq_sum, square_sum, last_run=runs-1)
+    return runs
+
+
+def check_summary(summary, names, levels, steps, path):
+    """Check that the summary from read_summary has the given elements, number of levels,
+    and number of steps, so that it can be combined with other runs
+    """
+
+    if set(summary['names']) != set(names):
+        raise ValueError('Elements in {} do not match: {}'.format(path, 
+                sorted(set(summary['names']) ^ set(names))))
+    if summary['steps'] != steps:
+        raise ValueError('Number of steps in {} ({}) does not match ({})'.format(
+                path, summary['steps']-1, steps-1))
+    different = [name for name in names if summary['levels'][name] != levels[name]]
+    if different:
+        raise ValueError('Number of levels in {} does not match for: {}'.format(path, different))
+
+
+def _align(offset):
+    return -(-offset//BINARY_ALIGNMENT)*BINARY_ALIGNMENT
@@ -2,86 +2,99 @@ import os
 import re
 from collections import defaultdict
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
 
+from dish.traces import BinaryTraces, is_binary_trace_file
 
-def get_traces(input_file, default_levels=3):
+
+# run number lines in trace files
+_RUN_PATTERN = re.compile(r'Run #([0-9]+)')
+
+
+def get_traces(input_file, default_levels=3, elements=None):
     """Load simulation values from a trace file
 
     Trace file should contain (optionally) individual runs, followed by the
     frequency summaries, followed by the squares summaries for each element
-    (output_format 1 or 3 from the simulator)
+    (output_format 1 or 3 from the simulator), or be a binary trace file (output_format 4)
+
+    Values are returned as NumPy arrays. If elements is given, only the lines of
+    those elements are parsed.
 
     """
 
+    if is_binary_trace_file(input_file):
+        return BinaryTraces(input_file).trace_data(elements)
+
+    if elements is not None:
+        elements = set(elements)
+
     # dictionary to store traces for each element
     trace_data = defaultdict(lambda: defaultdict())
 
-    # read traces from trace file
-    with open(input_file) as in_file:
-        trace_file_lines = in_file.readlines()
-    trace_file_lines = [x.strip() for x in trace_file_lines]
-
     run = 0
     frequency_summary = False
     squares_summary = False
-    for trace_line_content in trace_file_lines:
-
-        # check each line for the Run #, Frequency/Squares summaries, or values
-        if re.match(r'Run #[0-9]+', trace_line_content):
-            # save the last run # as the total number of runs
-            run = re.findall(r'Run #([0-9]+)', trace_line_content)[0]
-
-        elif re.match('Frequency Summary:', trace_line_content):
-            # set frequency summary flag
-            frequency_summary = True
-
-        elif re.match('Squares Summary:', trace_line_content):
-            # set squares summary flag
-            squares_summary = True
-        
-        else:
-            # get trace values and element name
-            trace_values_str = trace_line_content.split(' ')
-            element_name = trace_values_str[0].split('|')[0] 
-
-            if element_name != '':
-                # get num states for this element if available
-                if len(trace_values_str[0].split('|')) > 1:
-                    levels = int(trace_values_str[0].split('|')[1])
-                else:
-                    levels = default_levels
-                
-                # get simulation values
-                trace_values = [float(val) for val in trace_values_str[1:]]
-                                
-                # store trace data
-                trace_data[element_name]['levels'] = levels
-                # will save the number read from the last occurrence of "Run#" in the file
-                # adding 1 to correct for zero indexed run number
-                trace_data[element_name]['runs'] = int(run) + 1
-                if squares_summary:
-                    trace_data[element_name]['squares'] = trace_values
-                    # calculate avg and stdev values
-                    runs = trace_data[element_name]['runs']
-                    levels = trace_data[element_name]['levels']
-                    freq_vals = trace_data[element_name]['frequency']
-                    avg_vals = [float(val)/runs for val in freq_vals]
-                    stdev_vals = [np.sqrt(float(val)/runs - avg_vals[idx]**2) for idx, val in enumerate(trace_values)]
-                    
-                    trace_data[element_name]['avg'] = avg_vals
-                    trace_data[element_name]['stdev'] = stdev_vals
-                    trace_data[element_name]['avg_percent'] = [100*val/(levels-1) for val in avg_vals]
-                    trace_data[element_name]['stdev_percent'] = [100*val/(levels-1) for val in stdev_vals]
-
-                elif frequency_summary:
-                    trace_data[element_name]['frequency'] = trace_values
+    with open(input_file) as in_file:
+        for trace_line_content in in_file:
+            trace_line_content = trace_line_content.strip()
+
+            # check each line for the Run #, Frequency/Squares summaries, or values
+            if trace_line_content.startswith('Run #') and _RUN_PATTERN.match(trace_line_content):
+                # save the last run # as the total number of runs
+                run = _RUN_PATTERN.match(trace_line_content).group(1)
+                continue
+
+            elif trace_line_content.startswith('Frequency Summary:'):
+                # set frequency summary flag
+                frequency_summary = True
+                continue
+
+            elif trace_line_content.startswith('Squares Summary:'):
+                # set squares summary flag
+                squares_summary = True
+                continue
+
+            # get element name, and skip elements that were not requested
+            element_info, _, trace_values_str = trace_line_content.partition(' ')
+            element_info = element_info.split('|')
+            element_name = element_info[0]
+            if element_name == '' or (elements is not None and element_name not in elements):
+                continue
+
+            # get num states for this element if available
+            if len(element_info) > 1:
+                levels = int(element_info[1])
+            else:
+                levels = default_levels
+
+            # get simulation values
+            trace_values = np.array(trace_values_str.split(), dtype=float)
+
+            # store trace data
+            trace_data[element_name]['levels'] = levels
+            # will save the number read from the last occurrence of "Run#" in the file
+            # adding 1 to correct for zero indexed run number
+            trace_data[element_name]['runs'] = int(run) + 1
+            if squares_summary:
+                trace_data[element_name]['squares'] = trace_values
+                # calculate avg and stdev values
+                runs = trace_data[element_name]['runs']
+                freq_vals = trace_data[element_name]['frequency']
+                avg_vals = freq_vals/runs
+                stdev_vals = np.sqrt(trace_values/runs - avg_vals**2)
+
+                trace_data[element_name]['avg'] = avg_vals
+                trace_data[element_name]['stdev'] = stdev_vals
+                trace_data[element_name]['avg_percent'] = 100*avg_vals/(levels-1)
+                trace_data[element_name]['stdev_percent'] = 100*stdev_vals/(levels-1)
+
+            elif frequency_summary:
+                trace_data[element_name]['frequency'] = trace_values
+            else:
+                if 'traces' in trace_data[element_name]:
+                    trace_data[element_name]['traces'].update({run : trace_values})
                 else:
-                    if 'traces' in trace_data[element_name]:
-                        trace_data[element_name]['traces'].update({run : trace_values})
-                    else:
-                        trace_data[element_name]['traces'] = {run : trace_values}
+                    trace_data[element_name]['traces'] = {run : trace_values}
 
     return trace_data
 
@@ -107,6 +120,10 @@ def plot_average(
     If trace_data_list has more than one item, plots each as a separate scenario
     """
 
+    # plotting libraries are slow to import, so they are only imported to plot
+    import seaborn as sns
+    import matplotlib.pyplot as plt
+
     if not isinstance(trace_data_list, list):
         raise ValueError('Input trace_data_list must be a list')
 
@@ -205,6 +222,8 @@ def plot_average(
 
 def single_plot(d, errorbars=False):
 
+    import matplotlib.pyplot as plt
+
     plt.plot(d['x'], d['y'],
             label=d['label'],
             linewidth=d['linewidth'],
@@ -76,6 +76,7 @@ class MainWindow(QMainWindow):
         self.steps = config.getint('Settings', 'steps', fallback=100)
         self.runs = config.getint('Settings', 'runs', fallback=5)
         self.debug = config.getboolean('Settings', 'debug', fallback=False)
+        self.progress_interval = config.getfloat('Settings', 'progress_interval', fallback=0.2)
 
         # simulation scheme names and simulator input
         self.scheme_mapping = {'Random Sequential': 'ra',
@@ -90,6 +91,12 @@ class MainWindow(QMainWindow):
         # set up GUI window
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
+
+        # simulation progress bar in the status bar
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.progress_bar)
         self.setFixedSize(self.size())
 
         # model table view
@@ -174,6 +181,18 @@ class MainWindow(QMainWindow):
             self.ui.chk_normalize.setEnabled(status)
             self.ui.chk_normalize.repaint()
 
+    def show_progress(self, progress):
+        """Show the progress of a simulation in the status bar, 
+        and process window events while the simulation runs"""
+
+        self.progress_bar.setValue(int(100*progress['fraction']))
+        if progress['done']:
+            self.statusBar().showMessage(f'Simulation done in {progress["seconds"]:.1f} s')
+        elif progress['eta'] is not None:
+            self.statusBar().showMessage(f'Runs completed: {progress["runs_completed"]}/{progress["runs"]}, '
+                    f'{progress["steps_per_second"]:.0f} steps/s, {progress["eta"]:.0f} s remaining')
+        QApplication.processEvents()
+
     def log(self, log_string):
         self.ui.tb_console.append(log_string)
         self.ui.tb_console.repaint()
@@ -416,19 +435,31 @@ class MainWindow(QMainWindow):
                 # save temp model file from table view
                 model_file = self.save_model()
 
-                # instantiate simulator and run simulation
-                model = Simulator(model_file)
-
-                if len(scenarios) > 1:
-                    # append the scenario index to the end of each file name
-                    for this_scenario in scenarios:
-                        this_output_filename = f'{output_basename}_{this_scenario}.txt'
-                        model.run_simulation(sim_scheme, runs, steps, this_output_filename, int(this_scenario), outMode=3)
-                        self.log(f'Simulation scenario {this_scenario} complete')
-                else:
-                    this_output_filename = f'{output_basename}.txt'
-                    model.run_simulation(sim_scheme, runs, steps, this_output_filename, int(scenarios[0]), outMode=3)
-                    self.log(f'Simulation scenario {scenarios[0]} complete')
+                # instantiate simulator and run simulation,
+                # loading the parsed model from the model cache if the model has not changed
+                model = Simulator(model_file, modelCache=True)
+
+                # show the progress while the simulation runs, 
+                # without starting another simulation from the window
+                self.set_sim_controls(False)
+                self.progress_bar.setValue(0)
+                self.progress_bar.setVisible(True)
+                try:
+                    if len(scenarios) > 1:
+                        # simulate the scenarios concurrently, 
+                        # with the scenario index appended to the end of each file name
+                        model.run_scenarios(sim_scheme, runs, steps, [int(this_scenario) for this_scenario in scenarios], 
+                                trace_files, outMode=3, progress=self.show_progress, progressInterval=self.progress_interval)
+                        for this_scenario in scenarios:
+                            self.log(f'Simulation scenario {this_scenario} complete')
+                    else:
+                        this_output_filename = f'{output_basename}.txt'
+                        model.run_simulation(sim_scheme, runs, steps, this_output_filename, int(scenarios[0]), outMode=3,
+                                progress=self.show_progress, progressInterval=self.progress_interval)
+                        self.log(f'Simulation scenario {scenarios[0]} complete')
+                finally:
+                    self.progress_bar.setVisible(False)
+                    self.set_sim_controls(True)
 
                 # remove temp model file
                 os.remove(model_file)
@@ -495,7 +526,7 @@ class MainWindow(QMainWindow):
 
                 # get scenario labels
                 scenario_labels = [self.ui.lw_scenario.item(int(this_scenario)).text() for this_scenario in scenarios]
-                traces_list = [get_traces(this_trace_file) for this_trace_file in trace_files]
+                traces_list = [get_traces(this_trace_file, elements=[plot_element]) for this_trace_file in trace_files]
 
                 if normalize:
                     y_label = 'Level [%]'
@@ -0,0 +1,44 @@
+"""The batch simulator writes the same output files as the Simulator for sync simulations
+"""
+import os
+import filecmp
+
+import pytest
+
+from dish.simulator import Simulator
+from dish.batch import BatchSimulator
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+TCELL_MODEL = os.path.join(EXAMPLES, 'example_model_Tcell.xlsx')
+DELAYS_MODEL = os.path.join(DATA, 'delays_model.csv')
+
+
+def simulate_both(tmp_path, model_file, runs, steps, scenario, outMode):
+    simulator_output = str(tmp_path / 'simulator.txt')
+    batch_output = str(tmp_path / 'batch.txt')
+    Simulator(model_file).run_simulation('sync', runs, steps, simulator_output, scenario, outMode=outMode, seed=0)
+    BatchSimulator(Simulator(model_file)).run_simulation('sync', runs, steps, batch_output, scenario,
+            outMode=outMode, seed=0)
+    return simulator_output, batch_output
+
+
+@pytest.mark.parametrize('outMode', [1, 3])
+def test_same_as_simulator(tmp_path, outMode):
+    simulator_output, batch_output = simulate_both(tmp_path, TCELL_MODEL, 3, 40, 0, outMode)
+    assert filecmp.cmp(simulator_output, batch_output, shallow=False)
+
+
+@pytest.mark.parametrize('scenario', [0, 1])
+def test_same_as_simulator_with_delays(tmp_path, scenario):
+    # transition, spontaneous, and balancing delays
+    simulator_output, batch_output = simulate_both(tmp_path, DELAYS_MODEL, 1, 200, scenario, 1)
+    assert filecmp.cmp(simulator_output, batch_output, shallow=False)
+
+
+def test_runs_with_delays_not_supported(tmp_path):
+    # the delay counters of the Simulator carry over from one run to the next
+    with pytest.raises(ValueError, match='delays'):
+        BatchSimulator(Simulator(DELAYS_MODEL)).run_simulation('sync', 3, 60, str(tmp_path / 'batch.txt'))
@@ -0,0 +1,122 @@
+"""The Boolean simulator writes the same output files as the simulator for Boolean models
+
+Sync simulations are deterministic, so for fixed initial values the Boolean simulator must write
+the same output files as Simulator.run_simulation, including the last word of runs when the number
+of runs is not a multiple of 64. Random initial values are drawn from different random generators,
+so each run with random initial values is compared with the simulator run from the same initial values.
+"""
+import os
+import filecmp
+
+import pandas as pd
+import pytest
+
+from dish.simulator import Simulator
+from dish.boolean import BooleanSimulator, boolean_model_errors, is_boolean_model
+
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+GENE_EXPRESSION_MODEL = os.path.join(EXAMPLES, 'example_model_gene_expression.csv')
+
+STEPS = 10
+
+# truth table for Xrna = Xgene AND TF, with the regulators and the element in the first row
+XRNA_TABLE = pd.DataFrame([
+        ['Xgene', 'TF', 'Xrna', 'regulation delays'],
+        [0, 0, 0, ''],
+        [0, 1, 0, ''],
+        [1, 0, 0, ''],
+        [1, 1, 1, ''],
+        ], columns=['Xrna', 'reset', '', ' '])
+
+
+def model_table(cells=None):
+    """Model table of the gene expression example, with cells changed by element name and column"""
+    table = pd.read_csv(GENE_EXPRESSION_MODEL, dtype=str, keep_default_na=False)
+    for (name, column), value in (cells or dict()).items():
+        table.loc[table['Variable'] == name, column] = value
+    return table
+
+
+def read_runs(file_name):
+    """Read the traces of each run from an output file in output mode 1"""
+    runs = list()
+    with open(file_name) as output_file:
+        for line in output_file:
+            if line.startswith('Run #'):
+                runs.append(dict())
+            elif line.startswith('Frequency Summary'):
+                break
+            else:
+                name, _, values = line.split('|')
+                runs[-1][name] = [int(x) for x in values.split()]
+    return runs
+
+
+def simulate(model, runs, outName, boolean=False, **options):
+    simulator = Simulator(model)
+    if boolean:
+        simulator = BooleanSimulator(simulator)
+    simulator.run_simulation('sync', runs, STEPS, outName, **options)
+
+
+MODELS = {
+    'example' : lambda: GENE_EXPRESSION_MODEL,
+    'toggles' : lambda: model_table({('Inh', 'Scenario 0') : '0,1[4],0[7]', ('TF', 'Scenario 1') : '1,0[2]'}),
+    'truth table' : lambda: {'model' : model_table({('Xrna', 'Positive') : ''}), 'Xrna' : XRNA_TABLE},
+    }
+
+
+@pytest.mark.parametrize('model', list(MODELS))
+@pytest.mark.parametrize('scenario', [0, 1])
+@pytest.mark.parametrize('outMode', [1, 2, 3])
+@pytest.mark.parametrize('runs', [1, 70, 130])
+def test_same_output(tmp_path, model, scenario, outMode, runs):
+    expected = str(tmp_path / 'expected.txt')
+    output = str(tmp_path / 'boolean.txt')
+    simulate(MODELS[model](), runs, expected, scenario=scenario, outMode=outMode)
+    simulate(MODELS[model](), runs, output, boolean=True, scenario=scenario, outMode=outMode)
+    assert filecmp.cmp(expected, output, shallow=False)
+
+
+def test_truth_table_is_parsed():
+    model = Simulator(MODELS['truth table']())
+    assert model.get_elements()['Xrna'].get_act().tolist() == [[0, 0], [0, 1]]
+
+
+def test_random_initial_values(tmp_path):
+    output = str(tmp_path / 'boolean.txt')
+    simulate(model_table({('TF', 'Scenario 0') : 'r', ('Inh', 'Scenario 0') : 'r'}), 70, output,
+            boolean=True, seed=1)
+    runs = read_runs(output)
+    assert len(runs) == 70
+
+    initial_values = set((run['TF'][0], run['Inh'][0]) for run in runs)
+    assert initial_values == set([(0, 0), (0, 1), (1, 0), (1, 1)])
+
+    # each run follows the simulator run from the same initial values
+    for tf, inh in initial_values:
+        expected = str(tmp_path / 'expected_{}_{}.txt'.format(tf, inh))
+        simulate(model_table({('TF', 'Scenario 0') : str(tf), ('Inh', 'Scenario 0') : str(inh)}), 1, expected)
+        expected_run = read_runs(expected)[0]
+        assert all(run == expected_run for run in runs if (run['TF'][0], run['Inh'][0]) == (tf, inh))
+
+
+@pytest.mark.parametrize('cells, error', [
+    ({('Xgene', 'Delay') : '1,1'}, 'Xgene has state transition delays'),
+    ({('Xgene', 'Positive') : '2*TF'}, 'Xgene has weighted regulators'),
+    ({('Xrna', 'Levels') : '3'}, 'Xrna has 3 levels'),
+    ])
+def test_model_errors(cells, error):
+    model = Simulator(model_table(cells))
+    assert error in boolean_model_errors(model)
+    assert not is_boolean_model(model)
+    with pytest.raises(ValueError):
+        BooleanSimulator(model)
+
+
+def test_boolean_model():
+    model = Simulator(GENE_EXPRESSION_MODEL)
+    assert boolean_model_errors(model) == []
+    assert is_boolean_model(model)
@@ -0,0 +1,84 @@
+"""Model cache entries are only loaded if they are signed with the cache key
+"""
+import os
+import pickle
+import shutil
+
+import pytest
+
+import dish.cache
+from dish.cache import ModelCache, DIGEST_SIZE, KEY_SIZE, source_digest
+
+
+class Payload(object):
+    # unpickling this object records that the entry was loaded
+    loaded = False
+
+    def __reduce__(self):
+        return (Payload.mark_loaded, ())
+
+    @staticmethod
+    def mark_loaded():
+        Payload.loaded = True
+        return 'loaded'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ModelCache(str(tmp_path / 'cache'), key_file=str(tmp_path / 'config' / 'cache.key'))
+
+
+def test_store_and_load(cache):
+    cache.store('model', {'elements' : [1, 2, 3]})
+    assert cache.load('model') == {'elements' : [1, 2, 3]}
+    assert cache.load('missing') is None
+
+
+def test_key_file_created(cache):
+    cache.store('model', 1)
+    assert os.path.getsize(cache.get_key_file()) == KEY_SIZE
+    assert os.stat(cache.get_key_file()).st_mode & 0o077 == 0
+
+
+def test_unsigned_entry_not_loaded(cache):
+    cache.store('model', 1)
+    Payload.loaded = False
+    # a pickle written to the cache directory without the key
+    with open(cache.path('model'), 'wb') as cache_file:
+        cache_file.write(bytes(DIGEST_SIZE) + pickle.dumps(Payload()))
+    assert cache.load('model') is None
+    assert not Payload.loaded
+    assert not os.path.exists(cache.path('model'))
+
+
+def test_tampered_entry_not_loaded(cache):
+    cache.store('model', 'original')
+    with open(cache.path('model'), 'rb') as cache_file:
+        digest = cache_file.read(DIGEST_SIZE)
+    with open(cache.path('model'), 'wb') as cache_file:
+        cache_file.write(digest + pickle.dumps('changed'))
+    assert cache.load('model') is None
+
+
+def test_entry_of_other_key_not_loaded(cache, tmp_path):
+    other = ModelCache(cache.get_directory(), key_file=str(tmp_path / 'other.key'))
+    other.store('model', 'other')
+    assert other.load('model') == 'other'
+    assert cache.load('model') is None
+
+
+@pytest.mark.parametrize('module', ['simulator.py', 'rules.py', 'rng.py', 'history.py'])
+def test_source_digest_changes(tmp_path, monkeypatch, module):
+    # cached models contain objects defined in these modules (e.g., WeightedChoice in rng.py
+    # for models with update rates), so changing any of them must change the cache keys
+    package_dir = str(tmp_path / 'dish')
+    shutil.copytree(os.path.dirname(os.path.abspath(dish.cache.__file__)), package_dir,
+            ignore=shutil.ignore_patterns('__pycache__'))
+    monkeypatch.setattr(dish.cache, '__file__', os.path.join(package_dir, 'cache.py'))
+    monkeypatch.setattr(dish.cache, '_source_digest', None)
+    digest = source_digest()
+
+    with open(os.path.join(package_dir, module), 'a') as source_file:
+        source_file.write('\n# changed\n')
+    monkeypatch.setattr(dish.cache, '_source_digest', None)
+    assert source_digest() != digest
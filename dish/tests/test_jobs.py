@@ -0,0 +1,79 @@
+"""Job manifests are expanded into jobs, and the scheduler runs, skips, and seeds them
+"""
+import os
+import random
+import filecmp
+
+import pytest
+
+from dish.jobs import expand_jobs, run_jobs
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+NOTATIONS_MODEL = os.path.join(DATA, 'notations_model.csv')
+
+
+def manifest(**options):
+    job = dict({'model' : NOTATIONS_MODEL, 'scheme' : 'ra', 'output' : 'traces.txt'}, **options)
+    return {'defaults' : {'runs' : 2, 'steps' : 20}, 'jobs' : [job]}
+
+
+def test_expand_lists(tmp_path):
+    jobs = expand_jobs(manifest(scheme=['ra', 'sync'], scenario=[0, 1], output='out/{scheme}_{scenario}.txt'),
+            str(tmp_path))
+    assert [(job['scheme'], job['scenario']) for job in jobs] == [('ra', 0), ('ra', 1), ('sync', 0), ('sync', 1)]
+    assert jobs[1]['output'] == os.path.join(str(tmp_path), 'out', 'ra_1.txt')
+    assert all(job['runs'] == 2 and job['steps'] == 20 for job in jobs)
+
+
+def test_expand_duplicate_outputs():
+    with pytest.raises(ValueError, match='More than one job'):
+        expand_jobs(manifest(scheme=['ra', 'sync']))
+
+
+def test_expand_unknown_options():
+    with pytest.raises(ValueError, match='Unknown options in job 0: sheme'):
+        expand_jobs(manifest(sheme='ra'))
+
+
+def test_skip_existing_outputs(tmp_path):
+    jobs = expand_jobs(manifest(output=['done.txt', 'new.txt']), str(tmp_path))
+    (tmp_path / 'done.txt').write_text('existing')
+    log = run_jobs(jobs, modelCache=None)
+    assert [record['status'] for record in log['jobs']] == ['skipped', 'done']
+    assert (tmp_path / 'done.txt').read_text() == 'existing'
+    assert log['summary'] == {'done' : 1, 'skipped' : 1, 'failed' : 0}
+
+
+def test_failed_job_removes_partial_output(tmp_path):
+    # the scenario does not exist, so the simulation fails after opening its output file
+    jobs = expand_jobs(manifest(scenario=99), str(tmp_path))
+    log = run_jobs(jobs, modelCache=None)
+    assert log['jobs'][0]['status'] == 'failed'
+    assert 'Scenario 99 does not exist' in log['jobs'][0]['error']
+    assert os.listdir(tmp_path) == list()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_unseeded_jobs_differ(tmp_path, workers):
+    # jobs on the same model without a seed get different seeds, drawn in job order
+    jobs = expand_jobs(manifest(output=['a.txt', 'b.txt']), str(tmp_path))
+    random.seed(1)
+    log = run_jobs(jobs, workers=workers, modelCache=None)
+    seeds = [record['seed'] for record in log['jobs']]
+    assert seeds[0] != seeds[1]
+    assert not filecmp.cmp(str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt'), shallow=False)
+
+    # the seeds do not depend on the number of workers
+    random.seed(1)
+    rerun = run_jobs(expand_jobs(manifest(output=['c.txt', 'd.txt']), str(tmp_path)), modelCache=None)
+    assert [record['seed'] for record in rerun['jobs']] == seeds
+    assert filecmp.cmp(str(tmp_path / 'a.txt'), str(tmp_path / 'c.txt'), shallow=False)
+
+
+def test_seeded_jobs(tmp_path):
+    jobs = expand_jobs(manifest(output=['a.txt', 'b.txt'], seed=3), str(tmp_path))
+    log = run_jobs(jobs, workers=2, modelCache=None)
+    assert [record['seed'] for record in log['jobs']] == [3, 3]
+    assert filecmp.cmp(str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt'), shallow=False)
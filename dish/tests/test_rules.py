@@ -0,0 +1,88 @@
+"""Compiled and tabulated regulation functions give the same scores as the rule interpreter (Element.eval_reg)
+"""
+import os
+import itertools
+
+import pytest
+
+from dish.simulator import Simulator
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# model with a rule of each notation type, regulated by A, B, C, and D
+NOTATIONS_MODEL = os.path.join(DATA, 'notations_model.csv')
+
+REGULATORS = ['A', 'B', 'C', 'D']
+
+# notation types of the rules in the notations model
+NOTATIONS = ['single', 'or', 'sum', 'and', 'not', 'target', 'initializer', 'necessary pair',
+        'highest', 'weight', 'delay']
+
+
+@pytest.fixture(scope='module', params=[0, 1000], ids=['compiled', 'tabulated'])
+def model(request):
+    # with a rule table size, all rules without propagation delays are read from lookup tables
+    return Simulator(NOTATIONS_MODEL, ruleTableSize=request.param)
+
+
+def rule_elements(model):
+    return [element for element in model.get_elements().values()
+            if type(element.get_act()) is str and (element.get_act() or element.get_inh())]
+
+
+def regulator_states(model, element):
+    """Every combination of the levels of the regulators and of the regulated element (read by initializers)
+    """
+
+    elements = model.get_elements()
+    names = REGULATORS + [name for name in [element.get_name()] if name not in REGULATORS]
+    for value_indices in itertools.product(*[range(elements[name].get_levels()) for name in names]):
+        yield dict(zip(names, value_indices))
+
+
+def value_history(model, step):
+    """Value indices of each element in steps 0 to step, read by propagation delays
+    """
+
+    return {name : [(position + past_step) % element.get_levels() for past_step in range(step+1)]
+            for position, (name, element) in enumerate(model.get_elements().items())}
+
+
+def test_notations_covered(model):
+    notations = set()
+    for element in rule_elements(model):
+        for label in element.get_notations().values():
+            notations.update(label.replace(' (lookup table)', '').split(', '))
+    assert notations >= set(NOTATIONS)
+
+
+def test_rule_tables(model, request):
+    # with a rule table size, only rules with propagation delays are not tabulated
+    tabulated = request.node.callspec.id == 'tabulated'
+    for element in rule_elements(model):
+        rules = {key for key, rule in [('act', element.get_act()), ('inh', element.get_inh())] if rule}
+        if tabulated and element.get_name() != 'Delay':
+            assert set(element.get_rule_tables()) == rules
+        else:
+            assert element.get_rule_tables() == dict()
+
+
+@pytest.mark.parametrize('step', [1, 3])
+def test_scores_match_interpreter(model, step):
+    elements = model.get_elements()
+    memo = value_history(model, step)
+    rng = model.get_rng()
+    for element in rule_elements(model):
+        for state in regulator_states(model, element):
+            for name, value_index in state.items():
+                elements[name].set_value_index(value_index)
+            for reg_rule, rule_func in [(element.get_act(), element.get_act_func()),
+                    (element.get_inh(), element.get_inh_func())]:
+                # propagation delays draw the same random numbers in both evaluations
+                rng.seed(step)
+                interpreted = element.eval_reg(reg_rule, 0, memo, step)
+                rng.seed(step)
+                compiled = rule_func(memo, step)
+                assert compiled == interpreted and type(compiled) == type(interpreted), \
+                        '{} rule {} at {}'.format(element.get_name(), reg_rule, state)
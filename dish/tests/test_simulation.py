@@ -0,0 +1,139 @@
+"""Simulation outputs match golden outputs of the original simulator
+
+The golden outputs are sync simulations (3 runs) of the T-cell example model (40 steps, which reach
+a fixed point) and of a model with state-transition, spontaneous, and balancing delays (200 steps,
+which reach a cycle), written by the simulator before the compiled rules, rule tables, transition
+cache, streaming mode, and cycle skipping were added. These sync simulations are deterministic,
+so every option must give the same output files.
+"""
+import os
+import copy
+import filecmp
+
+import pytest
+
+from dish.simulator import Simulator
+
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+MODELS = {
+    'tcell' : os.path.join(EXAMPLES, 'example_model_Tcell.xlsx'),
+    'delays' : os.path.join(DATA, 'delays_model.csv'),
+    'notations' : os.path.join(DATA, 'notations_model.csv'),
+    }
+
+# model, scenario, and number of steps of each golden output
+GOLDEN = [('tcell', 0, 40), ('delays', 0, 200), ('delays', 1, 200)]
+
+RUNS = 3
+
+# simulation options (and model options) of each variant, with the output mode of the golden output
+VARIANTS = {
+    'plain' : (1, dict(), dict()),
+    'no cycle skipping' : (1, dict(), dict()),
+    'transition cache' : (1, dict(cacheSize=1000), dict()),
+    'rule tables' : (1, dict(), dict(ruleTableSize=64)),
+    'rule tables and transition cache' : (1, dict(cacheSize=1000), dict(ruleTableSize=64)),
+    'summary' : (3, dict(), dict()),
+    'streaming' : (3, dict(streaming=True), dict()),
+    'streaming chunks' : (3, dict(streaming=True, chunkSteps=7), dict()),
+    'streaming rule tables' : (3, dict(streaming=True, cacheSize=1000), dict(ruleTableSize=64)),
+    }
+
+_models = dict()
+
+
+def load_model(name, ruleTableSize=0):
+    # element delay state is kept between simulations, so every simulation runs on a copy of the loaded model
+    key = (name, ruleTableSize)
+    if key not in _models:
+        _models[key] = Simulator(MODELS[name], ruleTableSize=ruleTableSize)
+    return copy.deepcopy(_models[key])
+
+
+def golden_file(name, scenario, outMode):
+    return os.path.join(DATA, 'golden', '{}_sync_s{}_m{}.txt'.format(name, scenario, outMode))
+
+
+@pytest.mark.parametrize('variant', list(VARIANTS))
+@pytest.mark.parametrize('name, scenario, steps', GOLDEN)
+def test_sync_golden_output(tmp_path, name, scenario, steps, variant):
+    outMode, options, model_options = VARIANTS[variant]
+    model = load_model(name, **model_options)
+    if variant == 'no cycle skipping':
+        model.cycle_steps = lambda simtype: None
+
+    output_file = str(tmp_path / 'traces.txt')
+    model.run_simulation('sync', RUNS, steps, output_file, scenario, outMode=outMode, seed=0, **options)
+
+    assert filecmp.cmp(output_file, golden_file(name, scenario, outMode), shallow=False)
+    if variant == 'plain':
+        # every run reaches a cycle (a fixed point in the T-cell model), so the cycle skipping was used
+        assert sorted(model.get_attractors()) == list(range(RUNS))
+    elif variant == 'no cycle skipping':
+        assert model.get_attractors() == dict()
+
+
+def test_transition_cache_used(tmp_path):
+    model = load_model('tcell')
+    model.run_simulation('sync', RUNS, 40, str(tmp_path / 'traces.txt'), cacheSize=1000, seed=0)
+    cache = model.get_transition_cache()
+    assert cache is not None and cache.get_hits() > 0
+
+
+@pytest.mark.parametrize('outMode', [1, 4])
+@pytest.mark.parametrize('simtype', ['ra', 'round', 'ra_multi', 'sync_multi', 'rand_sync'])
+def test_workers_same_output(tmp_path, simtype, outMode):
+    # each run has its own random number stream, so the runs do not depend on the number of workers
+    outputs = list()
+    for workers in [1, 2]:
+        output_file = str(tmp_path / 'traces_{}.txt'.format(workers))
+        load_model('tcell').run_simulation(simtype, 5, 20, output_file, outMode=outMode, workers=workers, seed=7)
+        outputs.append(output_file)
+    assert filecmp.cmp(*outputs, shallow=False)
+    # the temporary files with the output of each worker are removed
+    assert sorted(os.listdir(tmp_path)) == ['traces_1.txt', 'traces_2.txt']
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('simtype', ['rand_sync', 'rand_sync_gauss'])
+def test_workers_same_output_random_delays(tmp_path, simtype, seed):
+    # the random-delay schemes also randomize balancing delays of 0, which then carry over from one run
+    # to the next, so the runs of elements with activators and inhibitors are simulated in one process
+    assert load_model('notations').delay_counter_elements(simtype)
+    outputs = list()
+    for workers in [1, 3]:
+        output_file = str(tmp_path / 'traces_{}.txt'.format(workers))
+        load_model('notations').run_simulation(simtype, 6, 20, output_file, workers=workers, seed=seed)
+        outputs.append(output_file)
+    assert filecmp.cmp(*outputs, shallow=False)
+
+
+@pytest.mark.parametrize('simtype', ['ra_multi', 'sync_multi'])
+@pytest.mark.parametrize('name', ['tcell', 'delays'])
+def test_default_update_probability(tmp_path, name, simtype):
+    # models without an Update Probability column use the default probability for every element
+    output_file = str(tmp_path / 'traces.txt')
+    load_model(name).run_simulation(simtype, 2, 20, output_file, outMode=3, seed=0)
+    assert os.path.getsize(output_file) > 0
+
+
+def test_extend_same_output(tmp_path):
+    # runs added to a simulation are the same as the runs of a simulation of all runs at once
+    extended_file = str(tmp_path / 'extended.txt')
+    output_file = str(tmp_path / 'traces.txt')
+    model = load_model('tcell')
+    model.run_simulation('ra', 2, 20, extended_file, outMode=3, seed=7)
+    model.run_simulation('ra', 3, 20, extended_file, outMode=3, seed=7, extend=True)
+    load_model('tcell').run_simulation('ra', 5, 20, output_file, outMode=3, seed=7)
+    assert filecmp.cmp(extended_file, output_file, shallow=False)
+
+
+def test_workers_with_delays(tmp_path):
+    # delay counters carry over from one run to the next, so these runs are simulated in one process
+    golden = golden_file('delays', 0, 1)
+    output_file = str(tmp_path / 'traces.txt')
+    load_model('delays').run_simulation('sync', RUNS, 200, output_file, workers=2, seed=0)
+    assert filecmp.cmp(output_file, golden, shallow=False)